@@ -6,6 +6,8 @@ from server import run_web_server, keep_alive
 import threading
 import sys
 from utils.database.mongodb_handler import db_handler
+from utils.database.encryption import encryption_handler
+from services.facebook_async import close_session
 
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -22,7 +24,16 @@ load_dotenv()
 intents = discord.Intents.default()
 intents.message_content = True 
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+class SocialBot(commands.Bot):
+    async def close(self):
+        # session HTTP partagée des appels Graph (services.facebook_async)
+        await close_session()
+        # écrit les logs et statuts encore en tampon (LogWriter, ResultSink)
+        await db_handler.close()
+        await super().close()
+
+
+bot = SocialBot(command_prefix='!', intents=intents)
 
 
 
@@ -51,11 +62,13 @@ async def setup_hook():
         await bot.load_extension('cogs.post_commands')
         await bot.load_extension('cogs.moderation_commands')
         await bot.load_extension('cogs.help_commands')
+        await bot.load_extension('cogs.stats_commands')
         
         print("All cogs loaded successfully!")
         
         await db_handler.connect()
         print("📡 MongoDB connecté")
+        print(f"🔐 Chiffrement : {encryption_handler.diagnostics()}")
     except Exception as e:
         print(f"Error loading cogs: {e}")
         
@@ -1,7 +1,7 @@
 import discord
 from discord import app_commands
 
-from services.facebook import FacebookAPI
+from services.facebook_async import AsyncFacebookAPI
 from utils.database.model import PlatformType
 from .base_command import SocialCommandBase
 
@@ -60,8 +60,8 @@ class AccountCommands(SocialCommandBase):
         
         try:
             
-            fb_api = FacebookAPI(access_token)
-            result = fb_api.get_page_info()
+            fb_api = AsyncFacebookAPI(access_token)
+            result = await fb_api.get_page_info()
             print("RESULT\n", result)
             
             if not result.get("success"):
@@ -124,14 +124,7 @@ class AccountCommands(SocialCommandBase):
         await self.send_loading(interaction, "🔌 Disconnecting account...")
         
         try:
-            accounts = await self.db.get_all_social_accounts()
-            account_to_disconnect = None
-            
-            for account in accounts:
-                if (account.platform.value == platform and 
-                    (str(account.id) == account_id or account.account_id == account_id)):
-                    account_to_disconnect = account
-                    break
+            account_to_disconnect = await self.db.find_social_account(PlatformType(platform), account_id)
             
             if not account_to_disconnect:
                 await interaction.edit_original_response(
@@ -141,10 +134,7 @@ class AccountCommands(SocialCommandBase):
             
             #------------------DB
             #Mark as INACTIVE in database
-            await self.db.db.social_accounts.update_one(
-                {"_id": account_to_disconnect.id},
-                {"$set": {"is_active": False}}
-            )
+            await self.db.deactivate_social_account(str(account_to_disconnect.id))
             
             await self.db.log_activity(
                 discord_id=str(interaction.user.id),
@@ -204,8 +194,8 @@ class AccountCommands(SocialCommandBase):
       
     async def _get_user_pages(self, access_token: str):
         try:
-            fb_api = FacebookAPI(access_token)
-            result = fb_api._make_request("GET", "me/accounts")
+            fb_api = AsyncFacebookAPI(access_token)
+            result = await fb_api.get_user_pages()
             
             if not result.get("success"):
                 return None
@@ -21,12 +21,24 @@ class SocialCommandBase(commands.Cog):
         pass
     
     
+    async def get_user(self, interaction: discord.Interaction):
+        return await self.db.get_or_create_user(str(interaction.user.id), interaction.user.name)
+    
+    
     async def send_success(self, interaction: discord.Interaction, message: str):
-        await interaction.response.send_message(message)
+        await self._reply(interaction, message)
     
     
     async def send_error(self, interaction: discord.Interaction, message: str):
-        await interaction.response.send_message(message)
+        await self._reply(interaction, message)
+    
+    
+    async def _reply(self, interaction: discord.Interaction, message: str):
+        # après send_loading la réponse existe déjà : on remplace le message de chargement
+        if interaction.response.is_done():
+            await interaction.edit_original_response(content=message)
+        else:
+            await interaction.response.send_message(message)
         
     
     async def send_loading(self, interaction: discord.Interaction, message: str):
@@ -10,7 +10,7 @@ class HelpCommands(SocialCommandBase):
         
     
     async def execute(self, interaction: discord.Interaction, **kwargs):
-        commands = await self.db.get_all_bot_commands()
+        commands = await self.db.get_all_bot_commands(fields=("name", "description"))
     
         if not commands:
              await self.send_error(interaction, "No bot commands found in database.")
@@ -28,18 +28,14 @@ class InstagramCommands(SocialCommandBase):
     @app_commands.command(name="disconnect_instagram", description="Disconnect your connected Instagram account")
     async def disconnect_instagram(self, interaction: discord.Interaction):
         """Désactive le compte Instagram lié à ce serveur/utilisateur."""
-        accounts = await self.db.get_all_social_accounts()
-        instas = [a for a in accounts if a.platform == PlatformType.INSTAGRAM and a.is_active]
+        instas = await self.db.get_social_accounts_by_platform(PlatformType.INSTAGRAM)
 
         if not instas:
             await self.send_error(interaction, "No active Instagram account found.")
             return
 
         for acc in instas:
-            await self.db.db.social_accounts.update_one(
-                {"_id": acc.id},
-                {"$set": {"is_active": False}}
-            )
+            await self.db.deactivate_social_account(str(acc.id))
 
         await self.send_success(interaction, "🟠 Instagram account disconnected successfully.")
 
@@ -51,8 +47,7 @@ class InstagramCommands(SocialCommandBase):
         await self.send_loading(interaction, "📤 Uploading to Instagram...")
 
         # Vérifie qu'un compte Instagram est connecté
-        accounts = await self.db.get_all_social_accounts()
-        insta_acc = next((a for a in accounts if a.platform == PlatformType.INSTAGRAM and a.is_active), None)
+        insta_acc = await self.db.find_social_account(PlatformType.INSTAGRAM)
 
         if not insta_acc:
             await self.send_error(interaction, "❌ No connected Instagram account found.")
@@ -76,8 +71,7 @@ class InstagramCommands(SocialCommandBase):
         """Affiche les posts récents du compte connecté."""
         await self.send_loading(interaction, "📊 Fetching your recent Instagram posts...")
 
-        accounts = await self.db.get_all_social_accounts()
-        insta_acc = next((a for a in accounts if a.platform == PlatformType.INSTAGRAM and a.is_active), None)
+        insta_acc = await self.db.find_social_account(PlatformType.INSTAGRAM)
 
         if not insta_acc:
             await self.send_error(interaction, "No connected Instagram account found.")
@@ -104,8 +98,7 @@ class InstagramCommands(SocialCommandBase):
         """Supprime un post Instagram."""
         await self.send_loading(interaction, f"🗑️ Deleting Instagram post `{post_id}`...")
 
-        accounts = await self.db.get_all_social_accounts()
-        insta_acc = next((a for a in accounts if a.platform == PlatformType.INSTAGRAM and a.is_active), None)
+        insta_acc = await self.db.find_social_account(PlatformType.INSTAGRAM)
 
         if not insta_acc:
             await self.send_error(interaction, "No connected Instagram account found.")
@@ -125,8 +118,7 @@ class InstagramCommands(SocialCommandBase):
         """Affiche des statistiques d'engagement pour les 10 derniers posts."""
         await self.send_loading(interaction, "📈 Gathering analytics for your last posts...")
 
-        accounts = await self.db.get_all_social_accounts()
-        insta_acc = next((a for a in accounts if a.platform == PlatformType.INSTAGRAM and a.is_active), None)
+        insta_acc = await self.db.find_social_account(PlatformType.INSTAGRAM)
 
         if not insta_acc:
             await self.send_error(interaction, "No connected Instagram account found.")
@@ -17,13 +17,35 @@ class ModerationCommands(SocialCommandBase):
     async def delete_command(self, interaction: discord.Interaction, platform: str, post_id: str):
         await self.execute(interaction, platform=platform, post_id=post_id)
     
+    @app_commands.command(name="lookup", description="Show a post from its Discord or platform ID")
+    @app_commands.describe(post_id="Discord or platform ID of the post")
+    async def lookup_command(self, interaction: discord.Interaction, post_id: str):
+        await self.execute(interaction, post_id=post_id, lookup=True)
+    
     async def execute(self, interaction: discord.Interaction, **kwargs):
         platform = kwargs.get('platform')
         post_id = kwargs.get('post_id')
         comment = kwargs.get('comment')
         discord_id = str(interaction.user.id)
 
-        if comment:  # Reply
+        if kwargs.get('lookup'):
+            post = await self.db.find_post(post_id)
+            if not post:
+                await self.send_error(interaction, f"No post found for `{post_id}`.")
+                return
+            status = getattr(post, "status", None)
+            await self.send_success(
+                interaction,
+                f"**{post.platform.value.title()} post** `{post.id}`\n"
+                f"Status: {status.value if status else 'published'}\n"
+                f"Content: {post.content[:200]}"
+            )
+
+        elif comment:  # Reply
+            # l'id plateforme est connu si l'utilisateur a donné l'id Discord du post
+            post_ref = await self.db.resolve_post_ref(post_id, PlatformType(platform))
+            if post_ref and post_ref.platform_post_id:
+                post_id = post_ref.platform_post_id
             # -------------------- TODO: ici appeler le vrai service pour répondre sur le réseau --------------------
             await self.db.log_reply_action(
                 platform=PlatformType(platform),
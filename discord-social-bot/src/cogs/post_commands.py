@@ -5,7 +5,7 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.database.model import PublishedPost, PlatformType
-from services.facebook import FacebookAPI
+from services.facebook_async import AsyncFacebookAPI
 
 
 class PostCommands(SocialCommandBase):
@@ -36,6 +36,13 @@ class PostCommands(SocialCommandBase):
         
         
     
+    @app_commands.command(name="recent", description="Show recently published posts")
+    @app_commands.describe(platform="Social media platform (optional)", cursor="Cursor of the next page (optional)")
+    async def recent_command(self, interaction: discord.Interaction, platform: str = None, cursor: str = None):
+        await self.execute(interaction, platform=platform, cursor=cursor, action="recent")
+        
+        
+    
     async def execute(self, interaction: discord.Interaction, **kwargs):
         platform = kwargs.get("platform")
         content = kwargs.get('content')
@@ -48,6 +55,8 @@ class PostCommands(SocialCommandBase):
         
         if action == "post_image":
             await self._post_image(interaction, image_url, account_id, discord_id)
+        elif action == "recent":
+            await self._recent_posts(interaction, platform, kwargs.get('cursor'))
         elif crosspost:
             await self._crosspost(interaction, content, discord_id)
         else:
@@ -59,7 +68,7 @@ class PostCommands(SocialCommandBase):
         await self.send_loading(interaction, "Posting image to Facebook.......")
         
         try:
-            fb_account = await self.get_facebook_account(account_id)
+            fb_account = await self._get_facebook_account(account_id)
             if not fb_account:
                 await interaction.edit_original_response(content="No active facebook account found")
                 return
@@ -71,8 +80,8 @@ class PostCommands(SocialCommandBase):
                 return
             
             
-            fb_api = FacebookAPI(tokens['access_token'])
-            result = fb_api.post_image(image_url, fb_account.account_id)
+            fb_api = AsyncFacebookAPI(tokens['access_token'])
+            result = await fb_api.post_image(image_url, fb_account.account_id)
             
             
             if result.get("success"):
@@ -81,7 +90,9 @@ class PostCommands(SocialCommandBase):
                     requested_by_discord_id=discord_id,
                     platform=PlatformType.FACEBOOK,
                     content=f"Image post: {image_url}",
-                    media_urls=[image_url]
+                    media_urls=[image_url],
+                    # /photos renvoie l'id de la photo et celui du post dans le fil
+                    platform_post_id=result["data"].get("post_id") or result["data"].get("id")
                 )
                 
                 post_id = await self.db.create_published_post(post)
@@ -103,13 +114,38 @@ class PostCommands(SocialCommandBase):
         
         
     
+    async def _recent_posts(self, interaction: discord.Interaction, platform: str, cursor: str):
+        try:
+            posts, next_cursor = await self.db.get_published_posts_page(
+                platform=PlatformType(platform) if platform else None,
+                limit=10,
+                after=cursor,
+                fields=("platform", "content", "published_at")
+            )
+        except ValueError as e:
+            await self.send_error(interaction, str(e))
+            return
+        
+        if not posts:
+            await self.send_error(interaction, "No published posts found.")
+            return
+        
+        message = "**Recent posts:**\n" + "\n".join(
+            f"- {p.published_at:%Y-%m-%d %H:%M} | {p.platform.value} | `{p.id}` | {p.content[:50]}" for p in posts
+        )
+        if next_cursor:
+            platform_arg = f"platform:{platform} " if platform else ""
+            message += f"\nNext page: `/recent {platform_arg}cursor:{next_cursor}`"
+        await self.send_success(interaction, message)
+    
+    
+    
     async def _post_to_platform(self, interaction: discord.Interaction, platform: str, content: str, discord_id):
         if platform == "facebook":
             await self._post_to_facebook(interaction, content, discord_id)
         
         else:
-            accounts = await self.db.get_all_social_accounts()
-            acc = next((a for a in accounts if a.platform.value == platform and a.is_active), None)
+            acc = await self.db.find_social_account(PlatformType(platform))
             if not acc:
                 await self.send_error(interaction, f"No connected {platform} account")
                 return
@@ -145,8 +181,8 @@ class PostCommands(SocialCommandBase):
                 return
             
             #Post using Facebook API
-            fb_api = FacebookAPI(tokens["access_token"])
-            result = fb_api.post_text(content, fb_account.account_id)
+            fb_api = AsyncFacebookAPI(tokens["access_token"])
+            result = await fb_api.post_text(content, fb_account.account_id)
             
             if result.get("success"):
                 #Store in database
@@ -154,7 +190,8 @@ class PostCommands(SocialCommandBase):
                     social_account_id=str(fb_account.id),
                     requested_by_discord_id=discord_id,
                     platform=PlatformType.FACEBOOK,
-                    content=content
+                    content=content,
+                    platform_post_id=result["data"].get("id")
                 )
                 post_id = await self.db.create_published_post(post)
                 
@@ -186,15 +223,19 @@ class PostCommands(SocialCommandBase):
             return
         
         results = []
+        # tous les tokens Facebook déchiffrés en un lot, hors de la boucle
+        tokens_by_account = await self.db.get_tokens_many(
+            str(acc.id) for acc in active_accounts if acc.platform == PlatformType.FACEBOOK
+        )
         
         for acc in active_accounts:
             try:
                 if acc.platform == PlatformType.FACEBOOK:
                     #Use Facebook API for Facebook posts
-                    tokens = await self.db.get_tokens(str(acc.id))
+                    tokens = tokens_by_account.get(str(acc.id))
                     if tokens:
-                        fb_api = FacebookAPI(tokens["access_token"])
-                        result = fb_api.post_text(content, acc.account_id)
+                        fb_api = AsyncFacebookAPI(tokens["access_token"])
+                        result = await fb_api.post_text(content, acc.account_id)
                         
                         if result.get("success"):
                             #Store in database
@@ -202,7 +243,8 @@ class PostCommands(SocialCommandBase):
                                 social_account_id=str(acc.id),
                                 requested_by_discord_id=discord_id,
                                 platform=acc.platform,
-                                content=content
+                                content=content,
+                                platform_post_id=result["data"].get("id")
                             )
                             await self.db.create_published_post(post)
                             results.append(f"- {acc.platform.value.title()}: Posted!")
@@ -230,19 +272,8 @@ class PostCommands(SocialCommandBase):
     
     
     async def _get_facebook_account(self, specific_account_id: str = None):
-        accounts = await self.db.get_all_social_accounts()
-        facebook_accounts = [acc for acc in accounts if acc.platform == PlatformType.FACEBOOK and acc.is_active]
-        
-        if not facebook_accounts:
-            return None
-        
-        if specific_account_id:
-            for acc in facebook_accounts:
-                if str(acc.id) == specific_account_id or acc.account_id == specific_account_id:
-                    return acc
-            return None
-        
-        return facebook_accounts[0] if facebook_accounts else None
+        # lookup dans le registre en mémoire (par _id ou par ID de page)
+        return await self.db.find_social_account(PlatformType.FACEBOOK, specific_account_id)
     
     
     
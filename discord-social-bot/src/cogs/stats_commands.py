@@ -0,0 +1,129 @@
+import discord
+from discord import app_commands
+from .base_command import SocialCommandBase
+from datetime import datetime, timedelta, timezone
+import asyncio
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.database.model import PlatformType
+from services.facebook_async import AsyncFacebookAPI
+
+
+# posts Facebook les plus récents dont on agrège l'engagement (batch Graph de 50 posts par requête)
+FACEBOOK_STATS_MAX_POSTS = int(os.getenv("FACEBOOK_STATS_MAX_POSTS", "200"))
+# au-delà, timedelta(days=...) déborde (OverflowError)
+STATS_MAX_DAYS = 3650
+
+
+class StatsCommands(SocialCommandBase):
+    @app_commands.command(name="stats", description="Show publishing statistics")
+    @app_commands.describe(platform="Social media platform (optional)", days="Period in days (default 7)")
+    @app_commands.choices(platform=[
+        app_commands.Choice(name="Facebook", value="facebook"),
+        app_commands.Choice(name="Instagram", value="instagram"),
+        app_commands.Choice(name="LinkedIn", value="linkedin"),
+        app_commands.Choice(name="TikTok", value="tiktok")
+    ])
+    async def stats_command(self, interaction: discord.Interaction, platform: str = None,
+                            days: app_commands.Range[int, 1, STATS_MAX_DAYS] = 7):
+        await self.execute(interaction, platform=platform, days=days)
+
+
+
+    async def execute(self, interaction: discord.Interaction, **kwargs):
+        platform = PlatformType(kwargs["platform"]) if kwargs.get("platform") else None
+        days = min(max(1, kwargs.get("days") or 7), STATS_MAX_DAYS)
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+
+        # les agrégations et les appels Graph peuvent dépasser les 3 s accordées par Discord
+        await self.send_loading(interaction, "Computing statistics...")
+
+        # toutes les statistiques sont calculées par MongoDB (aggregate), seuls les totaux transitent
+        try:
+            histogram = await self.db.get_status_histogram(platform=platform, since=since)
+            if not histogram:
+                await self.send_error(interaction, f"No posts in the last {days} days.")
+                return
+            failure_rates = await self.db.get_failure_rates(since=since)
+            lateness = await self.db.get_publish_lateness(since=since)
+            per_day = await self.db.get_posts_per_day(platform=platform, since=since)
+        except Exception as e:
+            print(f"Stats aggregation error: {e}")
+            await self.send_error(interaction, f"Error computing statistics: {e}")
+            return
+        if platform:
+            failure_rates = {k: v for k, v in failure_rates.items() if k == platform.value}
+            lateness = {k: v for k, v in lateness.items() if k == platform.value}
+
+        lines = [f"**Stats ({platform.value.title() if platform else 'all platforms'}, last {days} days)**"]
+        lines.append("Posts: " + ", ".join(f"{status}: {count}" for status, count in sorted(histogram.items())))
+
+        for name, rate in sorted(failure_rates.items()):
+            line = f"- {name.title()}: {rate['failure_rate']:.1%} failed ({rate['failed']}/{rate['total']})"
+            if name in lateness:
+                line += f", median delay {lateness[name]['median_seconds']:.0f}s"
+            lines.append(line)
+
+        if platform in (None, PlatformType.FACEBOOK):
+            # l'engagement est un complément : une erreur Graph ne masque pas les statistiques
+            try:
+                engagement = await self._facebook_engagement(since)
+            except Exception as e:
+                print(f"Facebook engagement error: {e}")
+                lines.append("Facebook engagement unavailable.")
+            else:
+                if engagement:
+                    line = (f"Facebook engagement ({engagement['posts']} posts): {engagement['likes']} likes, "
+                            f"{engagement['comments']} comments, {engagement['shares']} shares")
+                    if engagement["unavailable"]:
+                        line += f" ({engagement['unavailable']} unavailable)"
+                    lines.append(line)
+
+        if per_day:
+            lines.append("Published per day and account:")
+            for row in per_day[:10]:
+                lines.append(f"- {row['day']:%Y-%m-%d} | `{row['social_account_id']}` | {row['count']}")
+
+        await interaction.edit_original_response(content="\n".join(lines))
+
+    async def _facebook_engagement(self, since: datetime):
+        """Likes / commentaires / partages des posts Facebook de la période, en batch par compte"""
+        posts, _ = await self.db.get_published_posts_page(
+            platform=PlatformType.FACEBOOK,
+            limit=FACEBOOK_STATS_MAX_POSTS,
+            fields=("social_account_id", "platform_post_id"),
+            since=since
+        )
+        by_account = {}
+        for post in posts:
+            if post.platform_post_id:
+                by_account.setdefault(post.social_account_id, {})[post.platform_post_id] = None
+        if not by_account:
+            return None
+
+        tokens = await self.db.get_tokens_many(by_account)
+        calls = [
+            AsyncFacebookAPI(tokens[account_id]["access_token"]).get_post_stats_many(post_ids)
+            for account_id, post_ids in by_account.items()
+            if tokens.get(account_id) and tokens[account_id].get("access_token")
+        ]
+        totals = {"posts": sum(len(ids) for ids in by_account.values()), "likes": 0, "comments": 0, "shares": 0, "unavailable": 0}
+        reached = 0
+        for results in await asyncio.gather(*calls):
+            for result in results.values():
+                reached += 1
+                if not result.get("success"):
+                    totals["unavailable"] += 1
+                    continue
+                data = result["data"]
+                totals["likes"] += data.get("likes", {}).get("summary", {}).get("total_count", 0)
+                totals["comments"] += data.get("comments", {}).get("summary", {}).get("total_count", 0)
+                totals["shares"] += data.get("shares", {}).get("count", 0)
+        # comptes sans token : leurs posts comptent comme indisponibles
+        totals["unavailable"] += totals["posts"] - reached
+        return totals
+
+
+async def setup(bot):
+    await bot.add_cog(StatsCommands(bot))
@@ -34,13 +34,14 @@ async def init_db():
     ]
 
     accounts = []
-    for a in accounts_data:
+    access_tokens = await encryption_handler.encrypt_many_async([f"{a['id']}_token" for a in accounts_data])
+    for a, access_token in zip(accounts_data, access_tokens):
         account = SocialMediaAccount(
             platform=a["platform"],
             account_name=a["name"],
             account_id=a["id"],
             tokens=PlatformTokens(
-                access_token=encryption_handler.encrypt_token(f"{a['id']}_token"),
+                access_token=access_token,
                 refresh_token=None,
                 expires_at=None
             ),
@@ -50,6 +51,8 @@ async def init_db():
         result = await db_handler.db.social_accounts.insert_one(account.model_dump(by_alias=True, exclude={"id"}))
         account.id = result.inserted_id
         accounts.append(account)
+    # écriture directe sur social_accounts : le registre et les tokens en cache sont périmés
+    db_handler.invalidate_account_caches()
     print(f"Inserted {len(accounts)} social accounts")
 
     # -------------------- Published Posts --------------------
@@ -0,0 +1,89 @@
+import asyncio
+import heapq
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def to_utc(value: datetime) -> datetime:
+    """Mongo renvoie des datetimes naïfs (en UTC) : on les rend explicites."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class DueQueue:
+    """Min-heap des prochaines échéances de publication (post_id -> heure prévue).
+
+    Les suppressions sont paresseuses : une entrée du tas n'est valide que si elle
+    correspond encore à l'heure enregistrée dans `_entries` pour ce post.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, str]] = []
+        self._entries: Dict[str, datetime] = {}
+        self._changed = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, post_id: str) -> bool:
+        return post_id in self._entries
+
+    def push(self, post_id: str, due_at: datetime):
+        """Ajoute ou replanifie un post."""
+        due_at = to_utc(due_at)
+        if self._entries.get(post_id) == due_at:
+            return
+        self._entries[post_id] = due_at
+        heapq.heappush(self._heap, (due_at, post_id))
+        self._compact()
+        self._changed.set()
+
+    def discard(self, post_id: str):
+        """Retire un post (annulé, supprimé ou déjà publié)."""
+        if self._entries.pop(post_id, None) is not None:
+            self._compact()
+            self._changed.set()
+
+    def reset(self, entries: Iterable[Tuple[str, datetime]]):
+        """Remplace tout le contenu (resynchronisation depuis la DB)."""
+        self._entries = {post_id: to_utc(due_at) for post_id, due_at in entries}
+        self._heap = [(due_at, post_id) for post_id, due_at in self._entries.items()]
+        heapq.heapify(self._heap)
+        self._changed.set()
+
+    def next_due(self) -> Optional[datetime]:
+        """Heure de la prochaine échéance valide, ou None si la file est vide."""
+        while self._heap:
+            due_at, post_id = self._heap[0]
+            if self._entries.get(post_id) == due_at:
+                return due_at
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: datetime) -> List[str]:
+        """Retire et renvoie les posts dont l'échéance est atteinte."""
+        now = to_utc(now)
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, post_id = heapq.heappop(self._heap)
+            if self._entries.get(post_id) == due_at:
+                del self._entries[post_id]
+                due.append(post_id)
+        return due
+
+    async def wait_for_change(self, timeout: Optional[float] = None) -> bool:
+        """Attend une modification de la file (ou l'expiration du délai)."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._changed.clear()
+
+    def _compact(self):
+        # Évite que les entrées périmées s'accumulent indéfiniment dans le tas
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(due_at, post_id) for post_id, due_at in self._entries.items()]
+            heapq.heapify(self._heap)
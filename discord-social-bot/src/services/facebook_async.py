@@ -0,0 +1,394 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlencode, urljoin
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+STATS_FIELDS = "id,likes.summary(true),comments.summary(true),shares"
+COMMENT_FIELDS = "id,from,message,created_time"
+PAGE_FIELDS = "id,name,followers_count,fan_count"
+
+# une seule session HTTP par process (et par boucle asyncio) : connexions keep-alive
+# réutilisées, cache DNS, nombre de connexions borné
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        connector = aiohttp.TCPConnector(
+            limit=int(os.getenv("FACEBOOK_HTTP_LIMIT", "100")),
+            limit_per_host=int(os.getenv("FACEBOOK_HTTP_LIMIT_PER_HOST", "50")),
+            ttl_dns_cache=int(os.getenv("FACEBOOK_DNS_CACHE_SECONDS", "300")),
+            keepalive_timeout=float(os.getenv("FACEBOOK_KEEPALIVE_SECONDS", "60")),
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=float(os.getenv("FACEBOOK_HTTP_TIMEOUT_SECONDS", "60")),
+            sock_connect=float(os.getenv("FACEBOOK_CONNECT_TIMEOUT_SECONDS", "10")),
+        )
+        _session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        _session_loop = loop
+    return _session
+
+
+async def close_session():
+    global _session, _session_loop
+    if _session is not None and not _session.closed and _session_loop is asyncio.get_running_loop():
+        await _session.close()
+    _session = None
+    _session_loop = None
+
+
+class FacebookAPIError(Exception):
+    """Échec d'un appel Graph ; status et code sont lus par retry_policy.classify_error."""
+
+    def __init__(self, message: str, status: Optional[int] = None, code: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any]) -> "FacebookAPIError":
+        return cls(result.get("error", "Unknown error"), result.get("status"), result.get("code"))
+
+
+def _graph_error(body: Optional[bytes]) -> Dict[str, Any]:
+    """Objet "error" d'une réponse Graph ({"error": {"message", "code", ...}}), sinon {}."""
+    try:
+        payload = json.loads(body) if body else None
+    except ValueError:
+        return {}
+    return payload["error"] if isinstance(payload, dict) and isinstance(payload.get("error"), dict) else {}
+
+
+class AsyncFacebookAPI:
+    """Équivalent asynchrone de FacebookAPI (mêmes méthodes, mêmes résultats
+    {"success": ..., "data"/"error": ...}) : un appel lent ne bloque plus la boucle du bot."""
+
+    BASE_URL = "https://graph.facebook.com/v18.0/"
+    VIDEO_URL = "https://graph-video.facebook.com/v18.0/"
+
+    def __init__(self, access_token: str, max_retries: int = 1):
+        self.access_token = access_token
+        self.max_retries = max_retries
+
+    async def _make_request(self, method: str, endpoint: str, base_url: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        url = urljoin(base_url or self.BASE_URL, endpoint)
+        params = {key: str(value) for key, value in (kwargs.pop("params", None) or {}).items()}
+        params["access_token"] = self.access_token
+
+        for attempt in range(self.max_retries + 1):
+            status = None
+            body = None
+            try:
+                async with get_session().request(method, url, params=params, **kwargs) as response:
+                    status = response.status
+                    body = await response.read()
+                    response.raise_for_status()
+                    return {"success": True, "data": await response.json(content_type=None)}
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                logger.error(f"[Attempt {attempt+1}] Facebook API error: {e}")
+                # une erreur 4xx ne change pas en réessayant
+                retryable = status is None or status >= 500
+                if attempt < self.max_retries and retryable:
+                    await asyncio.sleep(1)
+                    continue
+                error = _graph_error(body)
+                return {
+                    "success": False,
+                    "error": error.get("message") or str(e) or type(e).__name__,
+                    "status": status,
+                    "code": error.get("code"),
+                    "response": body,
+                }
+
+    # --- Posts ---
+    def batch(self) -> "GraphBatch":
+        return GraphBatch(self)
+
+    async def get_post_stats_many(self, post_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Stats de plusieurs posts en ceil(n / 50) requêtes ; un résultat par post, succès ou échec."""
+        async with self.batch() as batch:
+            pending = {post_id: batch.get_post_stats(post_id) for post_id in dict.fromkeys(post_ids)}
+        return {post_id: future.result() for post_id, future in pending.items()}
+
+    async def get_comments_many(self, post_ids: Iterable[str], limit: int = 10) -> Dict[str, Dict[str, Any]]:
+        async with self.batch() as batch:
+            pending = {post_id: batch.get_comments(post_id, limit) for post_id in dict.fromkeys(post_ids)}
+        return {post_id: future.result() for post_id, future in pending.items()}
+
+    async def post_text(self, message: str, page_id: Optional[str] = None) -> Dict[str, Any]:
+        endpoint = f"{page_id}/feed" if page_id else "me/feed"
+        return await self._make_request("POST", endpoint, data={"message": message})
+
+    async def post_link(self, message: str, link: str, published: bool = True, scheduled_publish_time: Optional[int] = None, page_id: Optional[str] = None) -> Dict[str, Any]:
+        endpoint = f"{page_id}/feed" if page_id else "me/feed"
+        data = {
+            "message": message,
+            "link": link,
+            "published": "true" if published else "false",
+        }
+        if not published:
+            if not scheduled_publish_time:
+                return {"success": False, "error": "scheduled_publish_time required when published=False"}
+            data["scheduled_publish_time"] = str(scheduled_publish_time)
+        return await self._make_request("POST", endpoint, data=data)
+
+    async def post_image(self, image_url: str, page_id: Optional[str] = None, caption: str = "", published: bool = True) -> Dict[str, Any]:
+        endpoint = f"{page_id}/photos" if page_id else "me/photos"
+        data = {"url": image_url, "published": "true" if published else "false"}
+        if caption:
+            data["caption"] = caption
+        return await self._make_request("POST", endpoint, data=data)
+
+    async def post_images(self, message: str, image_urls: List[str], page_id: Optional[str] = None) -> Dict[str, Any]:
+        """Post avec plusieurs photos : chaque photo est envoyée non publiée (en parallèle),
+        puis rattachée à un seul post du fil via attached_media."""
+        uploads = await asyncio.gather(*(self.post_image(url, page_id, published=False) for url in image_urls))
+        for upload in uploads:
+            if not upload["success"]:
+                return upload
+        endpoint = f"{page_id}/feed" if page_id else "me/feed"
+        data = {"message": message}
+        for i, upload in enumerate(uploads):
+            data[f"attached_media[{i}]"] = json.dumps({"media_fbid": upload["data"]["id"]})
+        return await self._make_request("POST", endpoint, data=data)
+
+    async def post_media(self, video_path: str, file_type: str, title: str = "", description: str = "", page_id: Optional[str] = None, chunk_size: int = 10*1024*1024) -> Dict[str, Any]:
+        """Upload résumable (session, envoi par morceaux, publication) comme FacebookAPI.post_media ;
+        la lecture du fichier se fait hors de la boucle."""
+        if not os.path.exists(video_path):
+            return {"success": False, "error": f"File not found: {video_path}"}
+
+        file_name = os.path.basename(video_path)
+        file_size = os.path.getsize(video_path)
+
+        # Step 1: Start upload session
+        app_id = os.getenv("FACEBOOK_APP_ID", "1523680902101746")
+        session_result = await self._make_request(
+            "POST", f"{app_id}/uploads",
+            params={"file_name": file_name, "file_length": file_size, "file_type": file_type}
+        )
+        if not session_result["success"]:
+            return session_result
+        upload_session_id = session_result["data"].get("id")
+        if not upload_session_id:
+            return {"success": False, "error": "No upload session ID received"}
+
+        # Step 2: Upload file data
+        upload_url = f"{self.BASE_URL}{upload_session_id}"  # "upload:..." : pas d'urljoin
+        session = get_session()
+        file_offset = 0
+        file_handle = None
+        try:
+            with open(video_path, "rb") as video_file:
+                while file_offset < file_size:
+                    video_file.seek(file_offset)
+                    chunk = await asyncio.to_thread(video_file.read, chunk_size)
+                    if not chunk:
+                        break
+                    headers = {
+                        "Authorization": f"OAuth {self.access_token}",
+                        "file_offset": str(file_offset),
+                        "Content-Type": "application/octet-stream",
+                    }
+                    async with session.post(upload_url, headers=headers, data=chunk) as response:
+                        if response.status == 413:
+                            chunk_size //= 2
+                            print(f"Chunk too large, reducing to {chunk_size} bytes")
+                            continue
+                        if response.status == 400:
+                            return {"success": False, "error": f"Upload failed: {await response.text()}"}
+                        response.raise_for_status()
+                        result_data = await response.json(content_type=None)
+                    if isinstance(result_data, dict) and result_data.get("h"):
+                        file_handle = result_data["h"].split("\n")[0].strip()
+                        break
+                    file_offset += len(chunk)
+
+            if not file_handle:
+                await asyncio.sleep(3)
+                headers = {"Authorization": f"OAuth {self.access_token}"}
+                for attempt in range(3):
+                    try:
+                        async with session.get(upload_url, headers=headers) as response:
+                            response.raise_for_status()
+                            raw_handle = (await response.json(content_type=None)).get("h")
+                        if raw_handle:
+                            file_handle = raw_handle.split("\n")[0].strip()
+                            break
+                        print(f"Attempt {attempt + 1}: No file handle in response, waiting...")
+                    except Exception as e:
+                        print(f"Attempt {attempt + 1}: Error getting file handle: {e}")
+                    await asyncio.sleep(2)
+        except Exception as e:
+            return {"success": False, "error": f"Upload failed: {str(e)}"}
+
+        if not file_handle:
+            return {"success": False, "error": "No file handle received"}
+
+        # Step 3: Publish the video
+        if file_type == "video/mp4":
+            endpoint = f"{page_id}/videos" if page_id else "me/videos"
+            return await self._make_request("POST", endpoint, base_url=self.VIDEO_URL, data={
+                "title": title,
+                "description": description,
+                "fbuploader_video_file_chunk": file_handle,
+            })
+        return await self._make_request("POST", f"{page_id}/photos", data={
+            "message": description,
+            "fbuploader_video_file_chunk": file_handle,
+            "published": "true",
+        })
+
+    async def delete_post(self, post_id: str) -> Dict[str, Any]:
+        return await self._make_request("DELETE", post_id)
+
+    # --- Get Posts ---
+    async def get_posts(self, page_id: Optional[str] = None) -> Dict[str, Any]:
+        endpoint = f"{page_id}/feed" if page_id else "me/feed"
+        return await self._make_request("GET", endpoint)
+
+    # --- Post Stats ---
+    async def get_post_stats(self, post_id: str) -> Dict[str, Any]:
+        return await self._make_request("GET", post_id, params={"fields": STATS_FIELDS})
+
+    # --- Comments ---
+    async def get_comments(self, post_id: str, limit: int = 10) -> Dict[str, Any]:
+        params = {"limit": limit, "fields": COMMENT_FIELDS}
+        return await self._make_request("GET", f"{post_id}/comments", params=params)
+
+    async def reply_to_comment(self, comment_id: str, message: str) -> Dict[str, Any]:
+        return await self._make_request("POST", f"{comment_id}/comments", data={"message": message})
+
+    # --- Comment Moderation ---
+    async def hide_comment(self, comment_id: str) -> Dict[str, Any]:
+        return await self._make_request("POST", comment_id, data={"is_hidden": "true"})
+
+    async def delete_comment(self, comment_id: str) -> Dict[str, Any]:
+        return await self._make_request("DELETE", comment_id)
+
+    # --- Page Info ---
+    async def get_page_info(self, page_id: Optional[str] = None) -> Dict[str, Any]:
+        endpoint = page_id if page_id else "me"
+        return await self._make_request("GET", endpoint, params={"fields": PAGE_FIELDS})
+
+    async def get_user_pages(self) -> Dict[str, Any]:
+        return await self._make_request("GET", "me/accounts")
+
+
+class GraphBatch:
+    """Regroupe des appels Graph en requêtes batch (50 sous-requêtes max par POST).
+
+        async with fb_api.batch() as batch:
+            stats = [batch.get_post_stats(post_id) for post_id in post_ids]
+        results = [future.result() for future in stats]
+
+    Chaque appel renvoie un Future résolu avec le même dict qu'un appel isolé
+    ({"success": True, "data": ...} ou {"success": False, "error": ...}) : l'échec
+    d'une sous-requête n'affecte pas les autres.
+    """
+
+    MAX_SIZE = 50
+
+    def __init__(self, api: AsyncFacebookAPI):
+        self.api = api
+        self._items: List[Dict[str, Any]] = []
+        self._futures: List[asyncio.Future] = []
+        self.requests_sent = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, method: str, endpoint: str, params: Optional[Dict[str, Any]] = None,
+            data: Optional[Dict[str, Any]] = None) -> asyncio.Future:
+        item: Dict[str, Any] = {"method": method, "relative_url": endpoint}
+        if params:
+            item["relative_url"] += "?" + urlencode(params)
+        if data:
+            item["body"] = urlencode(data)
+        future = asyncio.get_running_loop().create_future()
+        self._items.append(item)
+        self._futures.append(future)
+        return future
+
+    # --- mêmes appels que AsyncFacebookAPI ---
+    def get_post_stats(self, post_id: str) -> asyncio.Future:
+        return self.add("GET", post_id, params={"fields": STATS_FIELDS})
+
+    def get_comments(self, post_id: str, limit: int = 10) -> asyncio.Future:
+        return self.add("GET", f"{post_id}/comments", params={"limit": limit, "fields": COMMENT_FIELDS})
+
+    def hide_comment(self, comment_id: str) -> asyncio.Future:
+        return self.add("POST", comment_id, data={"is_hidden": "true"})
+
+    def delete_comment(self, comment_id: str) -> asyncio.Future:
+        return self.add("DELETE", comment_id)
+
+    def get_page_info(self, page_id: Optional[str] = None) -> asyncio.Future:
+        return self.add("GET", page_id or "me", params={"fields": PAGE_FIELDS})
+
+    async def execute(self):
+        """Envoie les appels en attente, par paquets de MAX_SIZE envoyés en parallèle."""
+        items, futures = self._items, self._futures
+        self._items, self._futures = [], []
+        chunks = [
+            (items[i:i + self.MAX_SIZE], futures[i:i + self.MAX_SIZE])
+            for i in range(0, len(items), self.MAX_SIZE)
+        ]
+        await asyncio.gather(*(self._send(chunk_items, chunk_futures) for chunk_items, chunk_futures in chunks))
+
+    async def _send(self, items: List[Dict[str, Any]], futures: List[asyncio.Future]):
+        self.requests_sent += 1
+        result = await self.api._make_request(
+            "POST", "", data={"batch": json.dumps(items), "include_headers": "false"}
+        )
+        responses = result.get("data") if result.get("success") else None
+        if not isinstance(responses, list):
+            # la requête batch elle-même a échoué : même erreur pour chaque appel
+            for future in futures:
+                future.set_result({**result, "success": False})
+            return
+        for future, response in zip(futures, responses):
+            future.set_result(_batch_item_result(response))
+        for future in futures[len(responses):]:
+            future.set_result({"success": False, "error": "Missing batch response", "status": None, "code": None})
+
+    async def __aenter__(self) -> "GraphBatch":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.execute()
+        else:
+            for future in self._futures:
+                future.cancel()
+
+
+def _batch_item_result(response: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Convertit une réponse de sous-requête ({"code", "body"} ou null) au format des appels isolés."""
+    if response is None:
+        # Graph renvoie null pour les sous-requêtes non traitées (délai dépassé)
+        return {"success": False, "error": "Batch item timed out", "status": None, "code": None}
+    status = response.get("code")
+    body = response.get("body")
+    if status is not None and 200 <= status < 300:
+        try:
+            return {"success": True, "data": json.loads(body) if body else {}}
+        except ValueError:
+            return {"success": True, "data": {"raw": body}}
+    error = _graph_error(body.encode() if isinstance(body, str) else body)
+    return {
+        "success": False,
+        "error": error.get("message") or f"HTTP {status}",
+        "status": status,
+        "code": error.get("code"),
+        "response": body,
+    }
@@ -0,0 +1,171 @@
+import asyncio
+import os
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.database.model import PlatformType, ScheduledPost
+
+
+def parse_platform_limits(raw: Optional[str]) -> Dict[str, int]:
+    """Lit une config du type "facebook=4,instagram=2"."""
+    limits = {}
+    for item in (raw or "").split(","):
+        if "=" not in item:
+            continue
+        platform, value = item.split("=", 1)
+        limits[platform.strip().lower()] = int(value)
+    return limits
+
+
+class _PlatformLane:
+    """État d'une plateforme : une sous-file par compte et la rotation des comptes prêts."""
+
+    def __init__(self, capacity: int):
+        self.accounts: Dict[str, Deque[ScheduledPost]] = {}
+        self.running: Dict[str, int] = {}
+        # comptes ayant un post en attente et une place libre ; chacun y figure au plus une fois
+        self.ready: asyncio.Queue = asyncio.Queue()
+        self.ready_set: Set[str] = set()
+        self.capacity = asyncio.Semaphore(capacity)  # backpressure sur submit
+        self.queued = 0
+        self.in_flight = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+
+class PublishWorkerPool:
+    """Pool de workers de publication.
+
+    Chaque plateforme a ses propres workers (sa limite de concurrence) : une
+    plateforme lente ne bloque pas les autres. Dans une plateforme, chaque
+    social_account_id a sa sous-file ; les workers servent à tour de rôle les
+    comptes prêts, si bien qu'un compte à sa limite (account_limit) n'occupe
+    aucun worker et ne retarde pas les autres comptes.
+    """
+
+    def __init__(
+        self,
+        publish: Callable[[ScheduledPost], Awaitable[None]],
+        platform_limits: Optional[Dict[str, int]] = None,
+        default_limit: Optional[int] = None,
+        account_limit: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        prefetch: Optional[int] = None,
+        on_slot_free: Optional[Callable[[], None]] = None
+    ):
+        self._publish = publish
+        # appelé à chaque fin de publication : le scheduler peut réclamer la suite
+        self.on_slot_free = on_slot_free
+        self.platform_limits = platform_limits if platform_limits is not None else \
+            parse_platform_limits(os.getenv("PUBLISH_PLATFORM_CONCURRENCY"))
+        self.default_limit = default_limit or int(os.getenv("PUBLISH_DEFAULT_CONCURRENCY", "4"))
+        self.account_limit = account_limit or int(os.getenv("PUBLISH_ACCOUNT_CONCURRENCY", "1"))
+        self.queue_size = queue_size or int(os.getenv("PUBLISH_QUEUE_SIZE", "1000"))
+        # posts réclamés d'avance au-delà des workers (None = autant que de workers)
+        self.prefetch = prefetch if prefetch is not None else \
+            (int(os.getenv("PUBLISH_PREFETCH")) if os.getenv("PUBLISH_PREFETCH") else None)
+
+        self._lanes: Dict[str, _PlatformLane] = {}
+        self._workers: List[asyncio.Task] = []
+        self._pending: Set[str] = set()  # posts en file ou en cours, pour éviter les doublons
+
+    def start(self):
+        if self._workers:
+            return
+        for platform in PlatformType:
+            self._lanes[platform.value] = _PlatformLane(self.queue_size)
+            for _ in range(self.platform_limit(platform.value)):
+                self._workers.append(asyncio.create_task(self._worker(platform.value)))
+
+    def stop(self):
+        for task in self._workers:
+            task.cancel()
+        self._workers = []
+        self._lanes = {}
+        self._pending.clear()
+
+    def platform_limit(self, platform: str) -> int:
+        return self.platform_limits.get(platform, self.default_limit)
+
+    def capacity(self) -> int:
+        """Posts que le pool accepte d'avoir réclamés : les workers plus une petite avance,
+        pour qu'un post ne reste pas en file au-delà de son bail."""
+        workers = sum(self.platform_limit(platform.value) for platform in PlatformType)
+        return workers + (workers if self.prefetch is None else self.prefetch)
+
+    def free_slots(self) -> int:
+        """Nombre de posts que le scheduler peut encore réclamer."""
+        return max(0, self.capacity() - len(self._pending))
+
+    def pending_ids(self) -> Set[str]:
+        """Posts en file ou en cours (dont le bail doit être prolongé)."""
+        return set(self._pending)
+
+    async def join(self):
+        """Attend que toutes les files soient vidées."""
+        for lane in list(self._lanes.values()):
+            await lane.idle.wait()
+
+    async def submit(self, post: ScheduledPost) -> bool:
+        """Met un post en file. Renvoie False s'il y est déjà (ou en cours de publication)."""
+        post_id = str(post.id)
+        if post_id in self._pending:
+            return False
+        self._pending.add(post_id)
+        lane = self._lanes[post.platform.value]
+        # bloque si la file de la plateforme est pleine (backpressure)
+        await lane.capacity.acquire()
+        lane.accounts.setdefault(post.social_account_id, deque()).append(post)
+        lane.queued += 1
+        lane.idle.clear()
+        self._mark_ready(lane, post.social_account_id)
+        return True
+
+    def _mark_ready(self, lane: _PlatformLane, account_id: str):
+        if (account_id not in lane.ready_set and lane.accounts.get(account_id)
+                and lane.running.get(account_id, 0) < self.account_limit):
+            lane.ready_set.add(account_id)
+            lane.ready.put_nowait(account_id)
+
+    def stats(self) -> Dict[str, object]:
+        queue_depth = {platform: lane.queued for platform, lane in self._lanes.items()}
+        in_flight = {platform: lane.in_flight for platform, lane in self._lanes.items()}
+        return {
+            "queue_depth": queue_depth,
+            "in_flight": in_flight,
+            "total_queued": sum(queue_depth.values()),
+            "total_in_flight": sum(in_flight.values()),
+            "active_accounts": sum(len(set(lane.accounts) | set(lane.running)) for lane in self._lanes.values()),
+        }
+
+    async def _worker(self, platform: str):
+        lane = self._lanes[platform]
+        while True:
+            account_id = await lane.ready.get()
+            lane.ready_set.discard(account_id)
+            subqueue = lane.accounts[account_id]
+            post = subqueue.popleft()
+            if not subqueue:
+                del lane.accounts[account_id]
+            lane.queued -= 1
+            lane.capacity.release()
+            lane.running[account_id] = lane.running.get(account_id, 0) + 1
+            lane.in_flight += 1
+            # encore des posts et une place pour ce compte : il repasse en fin de rotation
+            self._mark_ready(lane, account_id)
+            try:
+                await self._publish(post)
+            except Exception as e:
+                print(f" erreur worker {platform}: {e}")
+            finally:
+                lane.in_flight -= 1
+                lane.running[account_id] -= 1
+                if not lane.running[account_id]:
+                    del lane.running[account_id]
+                self._pending.discard(str(post.id))
+                self._mark_ready(lane, account_id)
+                if not lane.queued and not lane.in_flight:
+                    lane.idle.set()
+                if self.on_slot_free:
+                    self.on_slot_free()
@@ -0,0 +1,74 @@
+import random
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Dict, Optional, Tuple
+
+
+class ErrorClass(str, Enum):
+    RATE_LIMIT = "rate_limit"
+    SERVER = "server"
+    AUTH = "auth"
+    UNKNOWN = "unknown"
+
+
+# (délai de base, délai max) en secondes ; None = ne pas réessayer
+DEFAULT_BACKOFF: Dict[ErrorClass, Optional[Tuple[float, float]]] = {
+    ErrorClass.RATE_LIMIT: (60, 3600),
+    ErrorClass.SERVER: (10, 900),
+    ErrorClass.AUTH: None,  # un token invalide ne se répare pas tout seul
+    ErrorClass.UNKNOWN: (30, 1800),
+}
+
+# codes d'erreur Graph API liés au throttling
+GRAPH_RATE_LIMIT_CODES = {4, 17, 32, 613}
+
+
+def _status_code(error) -> Optional[int]:
+    for attr in ("status_code", "status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def classify_error(error) -> ErrorClass:
+    """Range une erreur de publication (exception ou message) dans une classe de backoff."""
+    status = None if isinstance(error, str) else _status_code(error)
+    code = getattr(error, "code", None)
+    message = str(error).lower()
+
+    if status == 429 or code in GRAPH_RATE_LIMIT_CODES or "rate limit" in message or "too many" in message:
+        return ErrorClass.RATE_LIMIT
+    if status in (401, 403) or "oauth" in message or "token" in message or "permission" in message:
+        return ErrorClass.AUTH
+    if (status is not None and status >= 500) or "timeout" in message or "unavailable" in message:
+        return ErrorClass.SERVER
+    return ErrorClass.UNKNOWN
+
+
+class RetryPolicy:
+    """Backoff exponentiel avec jitter, paramétré par classe d'erreur."""
+
+    def __init__(self, backoff: Optional[Dict[ErrorClass, Optional[Tuple[float, float]]]] = None, rng: Optional[random.Random] = None):
+        self.backoff = dict(DEFAULT_BACKOFF)
+        if backoff:
+            self.backoff.update(backoff)
+        self._rng = rng or random.Random()
+
+    def delay(self, error_class: ErrorClass, attempts: int) -> Optional[float]:
+        """Délai avant la prochaine tentative (attempts = nombre d'échecs déjà subis, >= 1)."""
+        params = self.backoff.get(error_class)
+        if params is None:
+            return None
+        base, cap = params
+        ceiling = min(cap, base * (2 ** max(attempts - 1, 0)))
+        # "equal jitter" : au moins la moitié du délai, le reste aléatoire pour étaler les reprises
+        return ceiling / 2 + self._rng.uniform(0, ceiling / 2)
+
+    def next_attempt_at(self, error_class: ErrorClass, attempts: int, now: datetime) -> Optional[datetime]:
+        delay = self.delay(error_class, attempts)
+        if delay is None:
+            return None
+        return now + timedelta(seconds=delay)
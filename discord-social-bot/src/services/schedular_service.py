@@ -2,11 +2,18 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime, UTC, timedelta
 from typing import Optional
+import asyncio
+import socket
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.database.mongodb_handler import db_handler
+from utils.database.encryption import encryption_handler
 from utils.database.model import PlatformType, PostStatus, ScheduledPost
+from services.due_queue import DueQueue
+from services.publish_pool import PublishWorkerPool
+from services.retry_policy import RetryPolicy, classify_error
+from services.facebook_async import AsyncFacebookAPI, FacebookAPIError
  #test
 class SchedulerService:
     
@@ -14,6 +21,29 @@ class SchedulerService:
         self.scheduler = AsyncIOScheduler()
         self.is_running = False
         self._db_handler = None
+        # File des prochaines échéances : on dort exactement jusqu'au prochain post
+        self.due_queue = DueQueue()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._watch_task: Optional[asyncio.Task] = None
+        # Resynchronisation grossière avec la DB (posts créés par un autre process)
+        self.resync_seconds = int(os.getenv("SCHEDULER_RESYNC_SECONDS", "300"))
+        # Bails sur les posts réclamés : plusieurs instances peuvent tourner en parallèle
+        self.instance_id = os.getenv("SCHEDULER_INSTANCE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = int(os.getenv("SCHEDULER_LEASE_SECONDS", "300"))
+        self.reaper_seconds = int(os.getenv("SCHEDULER_REAPER_SECONDS", "60"))
+        self.claim_batch_size = int(os.getenv("SCHEDULER_CLAIM_BATCH", "50"))
+        # délai laissé aux publications en cours à l'arrêt
+        self.stop_timeout = float(os.getenv("SCHEDULER_STOP_TIMEOUT_SECONDS", "30"))
+        # Publication concurrente, limitée par plateforme et par compte social
+        self.publish_pool = PublishWorkerPool(self._publish_from_pool, on_slot_free=self._on_pool_slot_free)
+        # on ne réclame que ce que le pool peut absorber ; le reste attend une place libre
+        self._claim_lock = asyncio.Lock()
+        self._claim_backlog = False
+        self._claim_task: Optional[asyncio.Task] = None
+        # Délai entre deux tentatives selon le type d'erreur (rate limit, 5xx, auth...)
+        self.retry_policy = RetryPolicy()
+        # "live" : publication réelle via l'API Graph asynchrone ; sinon simulation (mode test)
+        self.facebook_live = os.getenv("FACEBOOK_PUBLISH_MODE", "simulate") == "live"
         print("Scheduler initialisé")
     
     def start(self, db_handler_instance=None):
@@ -24,35 +54,174 @@ class SchedulerService:
             else:
                 self._db_handler = db_handler
             
-            # Check for pending posts every minute
-            #self.scheduler.add_job(
-            #    self.process_pending_posts,
-            #    CronTrigger(minute="*"),  # Every minute
-            #    id="process_pending_posts",
-            #    replace_existing=True
-            #)
+            # Les insertions / annulations locales mettent à jour la file immédiatement
+            self._db_handler.add_schedule_listener(self._on_schedule_change)
             
-            # Optional: Check every 10 seconds (for testing)
             self.scheduler.add_job(
-                self.process_pending_posts,
+                self.refresh_schedule,
                 'interval',
-                seconds=10,
-                id="process_pending_posts_fast",
+                seconds=self.resync_seconds,
+                id="refresh_schedule",
+                replace_existing=True
+            )
+            
+            self.scheduler.add_job(
+                self.renew_leases,
+                'interval',
+                seconds=max(1, self.lease_seconds // 3),
+                id="renew_leases",
+                replace_existing=True
+            )
+            
+            self.scheduler.add_job(
+                self.reap_expired_leases,
+                'interval',
+                seconds=self.reaper_seconds,
+                id="reap_expired_leases",
                 replace_existing=True
             )
             
             self.scheduler.start()
             self.is_running = True
-            print(" scheduler démarré - vérifie toutes les 10 secondes")
-            print("   prochain check:", datetime.now(UTC).strftime('%H:%M:%S'))
+            self.publish_pool.start()
+            self._loop_task = asyncio.get_running_loop().create_task(self._run_due_loop())
+            self._watch_task = asyncio.get_running_loop().create_task(self._watch_schedule())
+            print(f" scheduler démarré ({self.instance_id}) - resynchronisation toutes les {self.resync_seconds} secondes")
     
-    def stop(self):
-        """Stop the scheduler"""
+    async def stop(self):
+        """Stop the scheduler
+
+        Les publications en cours se terminent (au plus stop_timeout secondes), puis leurs
+        statuts sont écrits : sinon ces posts repartiraient à l'expiration de leur bail.
+        """
         if self.is_running:
             self.scheduler.shutdown()
             self.is_running = False
+            if self._db_handler:
+                self._db_handler.remove_schedule_listener(self._on_schedule_change)
+            for task in (self._loop_task, self._watch_task, self._claim_task):
+                if task:
+                    task.cancel()
+            self._loop_task = None
+            self._watch_task = None
+            self._claim_task = None
+            try:
+                await asyncio.wait_for(self.publish_pool.join(), self.stop_timeout)
+            except asyncio.TimeoutError:
+                print(f" publications encore en cours après {self.stop_timeout}s : abandon (leurs baux expireront)")
+            self.publish_pool.stop()
+            handler = self._db_handler if self._db_handler else db_handler
+            try:
+                await handler.result_sink.flush()
+            except Exception as e:
+                print(f" erreur à l'écriture des statuts: {e}")
             print(" scheduler arrêté")
     
+    def _on_schedule_change(self, post_id: str, scheduled_time: Optional[datetime]):
+        if scheduled_time is None:
+            self.due_queue.discard(post_id)
+        else:
+            self.due_queue.push(post_id, scheduled_time)
+    
+    async def refresh_schedule(self):
+        """Recharge les échéances depuis la DB (une requête, uniquement les ids et les heures)"""
+        try:
+            handler = self._db_handler if self._db_handler else db_handler
+            if handler.db is None:
+                await handler.connect()
+            if not handler.allow_request():
+                return
+            entries = await handler.get_schedule_entries()
+            handler.record_success()
+            self.due_queue.reset(entries)
+        except Exception as e:
+            handler.record_error(e)
+            print(f" erreur dans refresh_schedule: {e}")
+    
+    async def _watch_schedule(self):
+        """Change stream sur scheduled_posts ; sans replica set on garde la resynchronisation périodique"""
+        handler = self._db_handler if self._db_handler else db_handler
+        try:
+            if handler.db is None:
+                await handler.connect()
+            if not await handler.supports_change_streams():
+                print(" change streams indisponibles (mongod standalone) - resynchronisation périodique")
+                return
+        except Exception as e:
+            print(f" erreur dans _watch_schedule: {e}")
+            return
+        
+        while self.is_running:
+            # Le change stream remplace la resynchronisation périodique tant qu'il tourne
+            self.scheduler.pause_job("refresh_schedule")
+            try:
+                print(" change stream actif sur scheduled_posts")
+                await handler.watch_scheduled_posts(self._on_schedule_change)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f" change stream interrompu: {e}")
+            self.scheduler.resume_job("refresh_schedule")
+            await asyncio.sleep(handler.watch_retry_seconds)
+            # rattraper ce qui a pu changer pendant la coupure (y compris quand le jeton
+            # de reprise est perdu : le stream est alors rouvert sans resume_after)
+            await self.refresh_schedule()
+    
+    async def reap_expired_leases(self):
+        """Remet en file les posts dont l'instance propriétaire n'a pas conclu à temps"""
+        try:
+            handler = self._db_handler if self._db_handler else db_handler
+            if not handler.allow_request():
+                return
+            released = await handler.release_expired_leases()
+            handler.record_success()
+            if released:
+                print(f" {released} bail(s) expiré(s) remis en file")
+                await self.process_pending_posts()
+        except Exception as e:
+            handler.record_error(e)
+            print(f" erreur dans reap_expired_leases: {e}")
+    
+    async def renew_leases(self):
+        """Prolonge les baux des posts en file ou en cours : un post qui attend un worker ne doit pas être repris"""
+        handler = self._db_handler if self._db_handler else db_handler
+        post_ids = self.publish_pool.pending_ids()
+        if not post_ids or not handler.allow_request():
+            return
+        try:
+            lost = await handler.renew_leases(post_ids, self.instance_id, self.lease_seconds)
+            handler.record_success()
+            if lost:
+                print(f" {len(lost)} bail(s) perdu(s) : ces posts ne seront pas publiés par cette instance")
+        except Exception as e:
+            handler.record_error(e)
+            print(f" erreur dans renew_leases: {e}")
+    
+    def _on_pool_slot_free(self):
+        """Une publication vient de finir : s'il reste des posts dus non réclamés, on en réclame d'autres
+        (dès que la moitié du pool est libre, pour garder des réclamations par lots)"""
+        if self.publish_pool.free_slots() * 2 < self.publish_pool.capacity():
+            return
+        if self._claim_backlog and self.is_running and (self._claim_task is None or self._claim_task.done()):
+            self._claim_task = asyncio.get_running_loop().create_task(self.process_pending_posts())
+    
+    async def _run_due_loop(self):
+        """Dort jusqu'à la prochaine échéance, ou jusqu'à ce que le planning change"""
+        await self.refresh_schedule()
+        while self.is_running:
+            next_due = self.due_queue.next_due()
+            if next_due is None:
+                await self.due_queue.wait_for_change()
+                continue
+            
+            delay = (next_due - datetime.now(UTC)).total_seconds()
+            if delay > 0:
+                await self.due_queue.wait_for_change(delay)
+                continue
+            
+            if self.due_queue.pop_due(datetime.now(UTC)):
+                await self.process_pending_posts()
+    
     async def process_pending_posts(self):
         """Process posts that are ready to be published"""
         try:
@@ -68,12 +237,18 @@ class SchedulerService:
                     print(f" Échec de reconnexion: {conn_error}")
                     return
             
+            # Disjoncteur ouvert : MongoDB injoignable, on ne martèle pas le serveur
+            if not handler.allow_request():
+                self._retry_when_available(handler)
+                return
+            
             current_time = datetime.now(UTC)
             
-            # Get posts scheduled before now
-            pending_posts = await handler.get_pending_posts(current_time)
+            async with self._claim_lock:
+                queued = await self._claim_into_pool(handler)
+            handler.record_success()
             
-            if not pending_posts:
+            if not queued:
                 # Afficher uniquement lors du premier check
                 if not hasattr(self, '_first_check_done'):
                     print(f"aucun post en attente (vérifié à {current_time.strftime('%H:%M:%S')})")
@@ -84,21 +259,74 @@ class SchedulerService:
             self._first_check_done = False
             
             print("\n" + "="*70)
-            print(f" {len(pending_posts)} post(s) en attente de publication")
+            print(f" {queued} post(s) réclamé(s) pour publication")
             print(f" heure actuelle: {current_time.strftime('%Y-%m-%d %H:%M:%S')} UTC")
             print("="*70)
             
-            for post in pending_posts:
-                await self.publish_post(post, handler)
+            stats = self.publish_pool.stats()
+            print(f" {queued} post(s) mis en file - en file: {stats['total_queued']}, en cours: {stats['total_in_flight']}")
         
         except Exception as e:
+            if handler.record_error(e):
+                print(f" MongoDB injoignable dans process_pending_posts: {e}")
+                self._retry_when_available(handler)
+                return
             print(f" erreur dans process_pending_posts: {e}")
             import traceback
             traceback.print_exc()
     
+    async def _claim_into_pool(self, handler) -> int:
+        """Réclame les posts dus par lots, sans dépasser la capacité libre du pool.
+        
+        Un post réclamé mais bloqué en file perdrait son bail ; ceux qui ne tiennent pas
+        restent SCHEDULED et seront réclamés quand un worker se libère (_on_pool_slot_free).
+        """
+        queued = 0
+        while True:
+            limit = min(self.claim_batch_size, self.publish_pool.free_slots())
+            if limit <= 0:
+                self._claim_backlog = True
+                return queued
+            # Réclamer les posts dus : aucune autre instance ne pourra les publier
+            posts = await handler.claim_pending_posts(
+                datetime.now(UTC), self.instance_id,
+                lease_seconds=self.lease_seconds, limit=limit
+            )
+            for post in posts:
+                if await self.publish_pool.submit(post):
+                    queued += 1
+            if len(posts) < limit:
+                self._claim_backlog = False
+                return queued
+    
+    def _retry_when_available(self, handler):
+        """Les échéances déjà dépilées seraient perdues jusqu'à la resynchronisation : on replanifie un passage"""
+        delay = max(1.0, handler.connection.breaker.seconds_until_retry() if handler.connection else 0.0)
+        self.due_queue.push("__db_retry__", datetime.now(UTC) + timedelta(seconds=delay))
+    
+    def get_stats(self):
+        """Profondeur des files et publications en cours, par plateforme"""
+        stats = self.publish_pool.stats()
+        stats["scheduled_in_memory"] = len(self.due_queue)
+        handler = self._db_handler if self._db_handler else db_handler
+        if handler.connection:
+            stats["mongodb"] = handler.connection.stats()
+        stats["encryption"] = encryption_handler.diagnostics()
+        return stats
+    
+    async def _publish_from_pool(self, post: ScheduledPost):
+        handler = self._db_handler if self._db_handler else db_handler
+        await self.publish_post(post, handler)
+    
     async def publish_post(self, post: ScheduledPost, handler):
         """Publish a single post (TEST MODE - affichage dans le terminal)"""
         try:
+            # Le bail a pu expirer pendant l'attente (et le post être repris ailleurs) :
+            # on le vérifie et le prolonge juste avant l'appel plateforme
+            if post.claimed_by and not await handler.confirm_lease(str(post.id), post.claimed_by, self.lease_seconds):
+                print(f"   bail perdu pour {post.id} : publication abandonnée par cette instance")
+                return
+            
             print(f"\n PUBLICATION EN COURS...")
             print(f"   ID Post      : {post.id}")
             print(f"   Plateforme   : {post.platform.value.upper()}")
@@ -122,18 +350,22 @@ class SchedulerService:
             
             # Update post status
             if platform_post_id:
-                await handler.update_post_status(
+                # Statut tamponné (bulk_write via handler.result_sink), log via handler.log_writer
+                handler.record_post_status(
                     post_id=str(post.id),
+                    claimed_by=post.claimed_by,
                     status=PostStatus.PUBLISHED
                 )
+                # l'id plateforme devient utilisable par /delete, /reply, /lookup
+                await handler.add_post_refs("scheduled_posts", post.id, post.platform, str(platform_post_id))
                 
                 # Log activity
                 await handler.log_activity(
                     discord_id=post.requested_by_discord_id,
-                    action="post_published",
                     social_account_id=post.social_account_id,
-                    platform=post.platform,
                     details={
+                        "action": "post_published",
+                        "platform": post.platform.value,
                         "post_id": str(post.id),
                         "platform_post_id": platform_post_id,
                         "scheduled_time": post.scheduled_time.isoformat(),
@@ -144,22 +376,35 @@ class SchedulerService:
                 print(f"   PUBLIÉ avec succès!")
                 print(f"    ID Plateforme: {platform_post_id}")
             else:
-                # Mark as failed
-                await handler.update_post_status(
-                    post_id=str(post.id),
-                    status=PostStatus.FAILED,
-                    error_message="Échec de publication (mode test)"
-                )
                 print(f"    ÉCHEC de publication")
+                await self._handle_failure(post, handler, "Échec de publication (mode test)")
         
         except Exception as e:
             print(f"    ERREUR: {e}")
-            
-            # Update with error
-            await handler.update_post_status(
+            await self._handle_failure(post, handler, e)
+    
+    async def _handle_failure(self, post: ScheduledPost, handler, error):
+        """Replanifie le post avec un backoff adapté à l'erreur, ou le marque FAILED"""
+        error_class = classify_error(error)
+        failures = post.attempts + 1
+        next_attempt_at = None
+        if failures < post.max_attempts:
+            next_attempt_at = self.retry_policy.next_attempt_at(error_class, failures, datetime.now(UTC))
+        
+        if next_attempt_at:
+            handler.record_retry(
+                post_id=str(post.id),
+                next_attempt_at=next_attempt_at,
+                error_message=str(error),
+                claimed_by=post.claimed_by
+            )
+            print(f"    nouvelle tentative ({error_class.value}) à {next_attempt_at.strftime('%H:%M:%S')}")
+        else:
+            handler.record_post_status(
                 post_id=str(post.id),
                 status=PostStatus.FAILED,
-                error_message=str(e)
+                error_message=str(error),
+                claimed_by=post.claimed_by
             )
     
     
@@ -208,8 +453,10 @@ class SchedulerService:
         """
         Publish to Facebook
         
-        TODO: Implémenter le service Facebook
+        Simulation tant que FACEBOOK_PUBLISH_MODE != "live"
         """
+        if self.facebook_live:
+            return await self._publish_to_facebook_live(post)
         print("\n      SIMULATION FACEBOOK:")
         print(f"         Message: {post.content[:100]}{'...' if len(post.content) > 100 else ''}")
         if post.media_urls:
@@ -220,6 +467,27 @@ class SchedulerService:
         
         return f"facebook_test_{datetime.now(UTC).timestamp()}"
     
+    async def _publish_to_facebook_live(self, post: ScheduledPost) -> Optional[str]:
+        """Publie via AsyncFacebookAPI ; un échec lève FacebookAPIError (classé par la politique de retry)"""
+        handler = self._db_handler if self._db_handler else db_handler
+        tokens = await handler.get_tokens(post.social_account_id)
+        if not tokens or not tokens.get("access_token"):
+            raise FacebookAPIError("No access token for this account (oauth)", status=401)
+        account = await handler.get_social_account(post.social_account_id)
+        page_id = account.account_id if account else None
+        
+        fb_api = AsyncFacebookAPI(tokens["access_token"])
+        if len(post.media_urls) > 1:
+            result = await fb_api.post_images(post.content, post.media_urls, page_id)
+        elif post.media_urls:
+            result = await fb_api.post_image(post.media_urls[0], page_id, caption=post.content)
+        else:
+            result = await fb_api.post_text(post.content, page_id)
+        if not result.get("success"):
+            raise FacebookAPIError.from_result(result)
+        # /photos renvoie l'id de la photo et celui du post dans le fil
+        return result["data"].get("post_id") or result["data"].get("id")
+    
     async def _publish_to_instagram(self, post: ScheduledPost) -> Optional[str]:
         """
         Publish to Instagram
@@ -48,7 +48,7 @@ class SocialCommands(SocialCommandBase):
     # ----- /help -----
     @app_commands.command(name="help", description="Show all available commands")
     async def help_command(self, interaction: discord.Interaction):
-        commands = await self.db.get_all_bot_commands()
+        commands = await self.db.get_all_bot_commands(fields=("name", "description"))
         if not commands:
             await self.send_error(interaction, "No bot commands found in database.")
             return
@@ -0,0 +1,68 @@
+import os
+import time
+from typing import Dict, List, Optional
+
+from .model import PlatformType, SocialMediaAccount
+
+
+class AccountRegistry:
+    """Cache en mémoire des comptes sociaux actifs, indexé par _id, plateforme et account_id.
+
+    Le cache est invalidé par les écritures du handler et par le change stream de
+    social_accounts ; sans change stream, il expire au bout de `ttl` secondes.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else float(os.getenv("ACCOUNT_REGISTRY_TTL_SECONDS", "60"))
+        self._by_id: Dict[str, SocialMediaAccount] = {}
+        self._by_platform: Dict[PlatformType, List[SocialMediaAccount]] = {}
+        self._by_account_id: Dict[str, SocialMediaAccount] = {}
+        self._accounts: List[SocialMediaAccount] = []
+        self._loaded_at: Optional[float] = None
+        self.generation = 0
+
+    @property
+    def loaded(self) -> bool:
+        if self._loaded_at is None:
+            return False
+        return not self.ttl or time.monotonic() - self._loaded_at < self.ttl
+
+    def load(self, accounts: List[SocialMediaAccount], generation: int):
+        """Remplit le cache, sauf s'il a été invalidé pendant la lecture en DB."""
+        if generation != self.generation:
+            return
+        self._accounts = list(accounts)
+        self._by_id = {}
+        self._by_platform = {}
+        self._by_account_id = {}
+        for acc in self._accounts:
+            self._by_id[str(acc.id)] = acc
+            self._by_platform.setdefault(acc.platform, []).append(acc)
+            if acc.account_id:
+                self._by_account_id.setdefault(acc.account_id, acc)
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        self.generation += 1
+        self._loaded_at = None
+
+    def all(self) -> List[SocialMediaAccount]:
+        return list(self._accounts)
+
+    def get(self, account_id: str) -> Optional[SocialMediaAccount]:
+        return self._by_id.get(account_id)
+
+    def by_platform(self, platform: PlatformType) -> List[SocialMediaAccount]:
+        return list(self._by_platform.get(platform, []))
+
+    def find(self, platform: Optional[PlatformType] = None, account_ref: Optional[str] = None) -> Optional[SocialMediaAccount]:
+        """Premier compte actif correspondant ; account_ref est l'_id en base ou l'ID sur la plateforme."""
+        if account_ref:
+            acc = self._by_id.get(account_ref) or self._by_account_id.get(account_ref)
+            if acc and (platform is None or acc.platform == platform):
+                return acc
+            return None
+        if platform is not None:
+            accounts = self._by_platform.get(platform)
+            return accounts[0] if accounts else None
+        return self._accounts[0] if self._accounts else None
@@ -0,0 +1,71 @@
+"""Archivage des anciens posts publiés dans published_posts_archive (documents compactés)."""
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from bson import Binary
+from pymongo import UpdateOne
+
+
+ARCHIVE_COLLECTION = "published_posts_archive"
+
+# champs conservés dans l'archive ; les autres (error_message...) sont abandonnés
+ARCHIVED_FIELDS = ("platform", "social_account_id", "requested_by_discord_id", "published_at", "platform_post_id", "media_urls")
+
+
+def archive_after() -> timedelta:
+    return timedelta(days=float(os.getenv("PUBLISHED_ARCHIVE_AFTER_DAYS", "90")))
+
+
+def compact_post(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Document d'archive : champs essentiels non vides, contenu compressé (zlib) s'il y gagne."""
+    compact = {"_id": doc["_id"]}
+    for field in ARCHIVED_FIELDS:
+        if doc.get(field):
+            compact[field] = doc[field]
+    content = doc.get("content") or ""
+    compressed = zlib.compress(content.encode("utf-8"), 6)
+    if len(compressed) < len(content.encode("utf-8")):
+        compact["content_z"] = Binary(compressed)
+    else:
+        compact["content"] = content
+    return compact
+
+
+def expand_post(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse de compact_post : document utilisable par PublishedPost(**doc)."""
+    doc = dict(doc)
+    compressed = doc.pop("content_z", None)
+    if compressed is not None:
+        doc["content"] = zlib.decompress(compressed).decode("utf-8")
+    doc.setdefault("content", "")
+    doc.setdefault("media_urls", [])
+    return doc
+
+
+async def archive_published_posts(
+    db, older_than: Optional[timedelta] = None,
+    now: Optional[datetime] = None, batch_size: int = 1000
+) -> int:
+    """Déplace les posts publiés avant now - older_than vers l'archive, par lots.
+
+    Chaque lot est d'abord écrit dans l'archive (upsert, donc rejouable après un
+    arrêt), puis les références post_refs sont redirigées, enfin les originaux
+    sont supprimés.
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - (older_than or archive_after())
+    moved = 0
+    while True:
+        docs = await db.published_posts.find({"published_at": {"$lt": cutoff}}).sort("published_at", 1).limit(batch_size).to_list(None)
+        if not docs:
+            return moved
+        ops = []
+        for doc in docs:
+            compact = compact_post(doc)
+            ops.append(UpdateOne({"_id": compact.pop("_id")}, {"$set": compact}, upsert=True))
+        await db[ARCHIVE_COLLECTION].bulk_write(ops, ordered=False)
+        ids = [doc["_id"] for doc in docs]
+        await db.post_refs.update_many({"target_id": {"$in": ids}}, {"$set": {"collection": ARCHIVE_COLLECTION}})
+        await db.published_posts.delete_many({"_id": {"$in": ids}})
+        moved += len(docs)
@@ -0,0 +1,242 @@
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+from pymongo import monitoring
+from pymongo.errors import AutoReconnect, ConnectionFailure, NetworkTimeout, ServerSelectionTimeoutError
+
+
+CONNECTION_ERRORS = (AutoReconnect, ConnectionFailure, NetworkTimeout, ServerSelectionTimeoutError)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Compteurs du pool de connexions Motor/pymongo (checkouts, attente, échecs)."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_wait_total = 0.0
+        self.checkout_wait_max = 0.0
+        self.in_use = 0
+        self.opened = 0
+        self.closed = 0
+        self.pool_cleared = 0
+
+    def _record_wait(self, event):
+        duration = getattr(event, "duration", None)  # secondes, pymongo >= 4.7
+        if duration is not None:
+            self.checkout_wait_total += duration
+            self.checkout_wait_max = max(self.checkout_wait_max, duration)
+
+    def connection_checked_out(self, event):
+        self.checkouts += 1
+        self.in_use += 1
+        self._record_wait(event)
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures += 1
+        self._record_wait(event)
+
+    def connection_checked_in(self, event):
+        self.in_use = max(0, self.in_use - 1)
+
+    def connection_created(self, event):
+        self.opened += 1
+
+    def connection_closed(self, event):
+        self.closed += 1
+
+    def pool_cleared(self, event):
+        self.pool_cleared += 1
+
+    def connection_check_out_started(self, event): pass
+    def connection_ready(self, event): pass
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_closed(self, event): pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "checkouts": self.checkouts,
+            "checkout_failures": self.checkout_failures,
+            "checkout_wait_avg_ms": round(1000 * self.checkout_wait_total / self.checkouts, 3) if self.checkouts else 0.0,
+            "checkout_wait_max_ms": round(1000 * self.checkout_wait_max, 3),
+            "connections_in_use": self.in_use,
+            "connections_open": self.opened - self.closed,
+            "pool_cleared": self.pool_cleared,
+        }
+
+
+class CircuitBreaker:
+    """Coupe les accès à MongoDB après `threshold` échecs de connexion consécutifs.
+
+    Ouvert : les appelants sont refusés jusqu'à la prochaine tentative, repoussée de
+    façon exponentielle (base_delay, 2*base_delay... plafonné à max_delay).
+    Semi-ouvert : une seule opération (la sonde) est admise par allow() ; son succès
+    referme le circuit, son échec le rouvre. `available` ne fait que lire l'état.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: Optional[int] = None, base_delay: Optional[float] = None, max_delay: Optional[float] = None):
+        self.threshold = threshold or int(os.getenv("MONGODB_BREAKER_THRESHOLD", "3"))
+        self.base_delay = base_delay or float(os.getenv("MONGODB_RECONNECT_BASE_SECONDS", "1"))
+        self.max_delay = max_delay or float(os.getenv("MONGODB_RECONNECT_MAX_SECONDS", "60"))
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_count = 0
+        self.retry_at = 0.0
+        self._probe_deadline: Optional[float] = None  # sonde en cours (semi-ouvert)
+
+    def _probe_in_flight(self) -> bool:
+        # une sonde qui ne rend jamais compte (tâche annulée) ne bloque pas le circuit
+        return self._probe_deadline is not None and time.monotonic() < self._probe_deadline
+
+    @property
+    def available(self) -> bool:
+        """Un appel serait admis maintenant (sans rien réserver ni changer d'état)."""
+        if self.state == self.CLOSED:
+            return True
+        if self._probe_in_flight():
+            return False
+        return self.state == self.HALF_OPEN or time.monotonic() >= self.retry_at
+
+    def allow(self) -> bool:
+        """Admet une opération réelle. Circuit ouvert et échéance passée : passe en
+        semi-ouvert et réserve l'unique sonde, les autres appelants sont refusés."""
+        if self.state == self.CLOSED:
+            return True
+        if not self.available:
+            return False
+        self.state = self.HALF_OPEN
+        self._probe_deadline = time.monotonic() + self.max_delay
+        return True
+
+    def next_delay(self) -> float:
+        return min(self.max_delay, self.base_delay * 2 ** max(0, self.failures - self.threshold))
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_deadline = None
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_deadline = None
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+            if self.state != self.OPEN:
+                self.opened_count += 1
+            self.state = self.OPEN
+            self.retry_at = time.monotonic() + self.next_delay()
+
+    def seconds_until_retry(self) -> float:
+        return max(0.0, self.retry_at - time.monotonic()) if self.state == self.OPEN else 0.0
+
+
+class ConnectionManager:
+    """Client MongoDB configuré (pool, timeouts), sonde ping périodique et disjoncteur.
+
+    Les options viennent des variables d'environnement MONGODB_* ; le pool garde
+    MONGODB_MIN_POOL_SIZE connexions ouvertes pour absorber les rafales sans attendre
+    l'établissement de nouvelles connexions.
+    """
+
+    def __init__(self, client_factory: Callable[..., Any]):
+        self._client_factory = client_factory
+        self.metrics = PoolMetrics()
+        self.breaker = CircuitBreaker()
+        self.probe_interval = float(os.getenv("MONGODB_HEALTH_INTERVAL_SECONDS", "10"))
+        self.client = None
+        self._probe_task: Optional[asyncio.Task] = None
+        self.last_probe_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @staticmethod
+    def client_options() -> Dict[str, Any]:
+        return {
+            "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "100")),
+            "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "10")),
+            "maxConnecting": int(os.getenv("MONGODB_MAX_CONNECTING", "4")),
+            "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_MS", "300000")),
+            "waitQueueTimeoutMS": int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+            "serverSelectionTimeoutMS": int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+            "connectTimeoutMS": int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000")),
+            "socketTimeoutMS": int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "20000")),
+        }
+
+    def create_client(self, url: Optional[str] = None):
+        if url is None:
+            self.client = self._client_factory()
+        else:
+            self.client = self._client_factory(url, event_listeners=[self.metrics], **self.client_options())
+        return self.client
+
+    def start(self):
+        if self._probe_task is None and self.probe_interval > 0:
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+
+    async def stop(self):
+        if self._probe_task:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    @property
+    def available(self) -> bool:
+        """False tant que le disjoncteur est ouvert (lecture seule)."""
+        return self.breaker.available
+
+    def allow(self) -> bool:
+        """À appeler avant une opération réelle, qui rendra compte par record_success / record_error."""
+        return self.breaker.allow()
+
+    def record_success(self):
+        if self.breaker.state != CircuitBreaker.CLOSED:
+            print("MongoDB reachable again")
+        self.breaker.record_success()
+
+    def record_error(self, error: BaseException) -> bool:
+        """Compte l'erreur si c'est une erreur de connexion ; renvoie True dans ce cas.
+        Toute autre erreur vient du serveur, qui a donc répondu : c'est un succès pour le disjoncteur."""
+        if isinstance(error, CONNECTION_ERRORS):
+            self.last_error = str(error)
+            self.breaker.record_failure()
+            return True
+        self.record_success()
+        return False
+
+    async def ping(self) -> bool:
+        start = time.perf_counter()
+        try:
+            await self.client.admin.command("ping")
+        except Exception as e:
+            self.last_error = str(e)
+            self.breaker.record_failure()
+            return False
+        self.last_probe_ms = round(1000 * (time.perf_counter() - start), 3)
+        self.record_success()
+        return True
+
+    async def _probe_loop(self):
+        while True:
+            # disjoncteur ouvert : pas de sonde avant l'échéance du backoff
+            await asyncio.sleep(self.breaker.seconds_until_retry() or self.probe_interval)
+            if self.breaker.allow() and not await self.ping():
+                print(f"MongoDB health probe failed ({self.breaker.state}, retry in "
+                      f"{self.breaker.seconds_until_retry():.0f}s): {self.last_error}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics.stats(),
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "breaker_opened": self.breaker.opened_count,
+            "last_probe_ms": self.last_probe_ms,
+            "last_error": self.last_error,
+        }
@@ -5,15 +5,122 @@ from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 import secrets
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+import asyncio
 import base64
+import hashlib
+import json
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 load_dotenv()
+KDF_ITERATIONS = 100000
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# en dessous, un lot est traité directement : le passage par le pool coûterait plus cher
+BATCH_CHUNK_SIZE = int(os.getenv("ENCRYPTION_BATCH_CHUNK", "256"))
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def crypto_executor() -> ThreadPoolExecutor:
+    """Pool partagé des opérations de chiffrement en lot (les primitives OpenSSL relâchent le GIL)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = int(os.getenv("ENCRYPTION_THREADS", str(min(4, os.cpu_count() or 1))))
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crypto")
+    return _executor
+
+
+def _chunks(items: Sequence[T], size: int) -> List[Sequence[T]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def map_in_pool(fn: Callable[[T], R], items: Sequence[T], chunk_size: Optional[int] = None) -> List[R]:
+    """[fn(x) for x in items], par tranches réparties sur le pool ; l'ordre est conservé."""
+    size = chunk_size or BATCH_CHUNK_SIZE
+    if len(items) <= size:
+        return [fn(item) for item in items]
+    parts = crypto_executor().map(lambda chunk: [fn(item) for item in chunk], _chunks(items, size))
+    return [result for part in parts for result in part]
+
+
+async def map_in_pool_async(fn: Callable[[T], R], items: Sequence[T], chunk_size: Optional[int] = None) -> List[R]:
+    """Comme map_in_pool sans bloquer la boucle asyncio (heartbeats Discord) pendant le calcul."""
+    if not items:
+        return []
+    size = chunk_size or BATCH_CHUNK_SIZE
+    loop = asyncio.get_running_loop()
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(crypto_executor(), lambda chunk=chunk: [fn(item) for item in chunk])
+        for chunk in _chunks(items, size)
+    ))
+    return [result for part in parts for result in part]
+
+
+def _kdf_fingerprint(secret: bytes, salt: bytes, iterations: int) -> str:
+    """Identifie (secret, sel, itérations) dans le fichier cache sans y écrire le secret."""
+    return hashlib.sha256(b"pbkdf2-sha256|%d|" % iterations + salt + b"|" + secret).hexdigest()
+
+
+def _load_key_cache_file(path: str) -> Optional[Dict[str, str]]:
+    """Contenu du fichier cache, ou None s'il est absent ou lisible par d'autres utilisateurs."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if st.st_mode & (stat.S_IRWXG | stat.S_IRWXO) or (hasattr(os, "getuid") and st.st_uid != os.getuid()):
+        print(f"Encryption: key cache {path} ignored (must be owned by this user with mode 600)")
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Encryption: key cache {path} unreadable: {e}")
+        return None
+
+
+def _read_key_cache(path: str, fingerprint: str) -> Optional[bytes]:
+    value = (_load_key_cache_file(path) or {}).get(fingerprint)
+    return base64.b64decode(value) if value else None
+
+
+def _write_key_cache(path: str, fingerprint: str, key: bytes):
+    entries = _load_key_cache_file(path) or {}
+    entries[fingerprint] = base64.b64encode(key).decode()
+    tmp = f"{path}.tmp"
+    try:
+        if os.path.exists(tmp):
+            os.unlink(tmp)  # le mode 600 ne s'applique qu'à la création
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Encryption: cannot write key cache {path}: {e}")
+
+
 class EncryptionHandler:
-    def __init__(self, method: str = "fernet"):
+    def __init__(
+        self,
+        method: str = "fernet",
+        key: Optional[str] = None,
+        salt: Optional[str] = None,
+        fallbacks: Optional[List["EncryptionHandler"]] = None
+    ):
 
+        start = time.perf_counter()
         self.method = method
-        encryption_key = os.getenv("ENCRYPTION_KEY")
+        self.salt = salt
+        # anciennes clés acceptées en lecture pendant une rotation (jamais utilisées pour chiffrer)
+        self.fallbacks = fallbacks or []
+        encryption_key = key or os.getenv("ENCRYPTION_KEY")
         
         if not encryption_key:
             raise ValueError(
@@ -22,12 +129,15 @@ class EncryptionHandler:
                 "python -c \"from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())\""
             )
         
+        self.key_source: Optional[str] = None
+        self.derive_ms: Optional[float] = None
         if self.method == "fernet":
             self._init_fernet(encryption_key)
         elif self.method == "aes-gcm":
             self._init_aes_gcm(encryption_key)
         else:
             raise ValueError(f"Unknown encryption method: {method}")
+        self.init_ms = round(1000 * (time.perf_counter() - start), 3)
     
     def _init_fernet(self, encryption_key: str):
 
@@ -35,26 +145,69 @@ class EncryptionHandler:
             encryption_key = encryption_key.encode()
         
         self.cipher = Fernet(encryption_key)
+        self.key_source = "fernet"
         print("Encryption: Fernet (AES-128-CBC + HMAC-SHA256)")
     
     def _init_aes_gcm(self, encryption_key: str):
 
-        # Derive a proper 32-byte key using PBKDF2
-        salt = os.getenv("ENCRYPTION_SALT", "default_salt_change_me").encode()
-        
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,  # AES-256
-            salt=salt,
-            iterations=100000,
-            backend=default_backend()
-        )
-        
+        # la dérivation PBKDF2 (coûteuse) n'a lieu qu'au premier chiffrement/déchiffrement
         if isinstance(encryption_key, str):
             encryption_key = encryption_key.encode()
-        
-        self.key = kdf.derive(encryption_key)
-        print("Encryption: AES-256-GCM with PBKDF2 (100k iterations)")
+        self._secret = encryption_key
+        self._key: Optional[bytes] = None
+        self._aead: Optional[AESGCM] = None
+        self._derive_lock = threading.Lock()
+
+    @property
+    def key(self) -> bytes:
+        if self._key is None:
+            with self._derive_lock:
+                if self._key is None:
+                    self._derive_aes_gcm()
+        return self._key
+
+    @property
+    def aead(self) -> AESGCM:
+        if self._aead is None:
+            self.key
+        return self._aead
+
+    def _derive_aes_gcm(self):
+        start = time.perf_counter()
+        # Derive a proper 32-byte key using PBKDF2
+        salt = (self.salt or os.getenv("ENCRYPTION_SALT", "default_salt_change_me")).encode()
+        cache_file = os.getenv("ENCRYPTION_KEY_CACHE_FILE")
+        fingerprint = _kdf_fingerprint(self._secret, salt, KDF_ITERATIONS)
+        key = _read_key_cache(cache_file, fingerprint) if cache_file else None
+        if key is not None:
+            self.key_source = "cache-file"
+        else:
+            kdf = PBKDF2HMAC(
+                algorithm=hashes.SHA256(),
+                length=32,  # AES-256
+                salt=salt,
+                iterations=KDF_ITERATIONS,
+                backend=default_backend()
+            )
+            key = kdf.derive(self._secret)
+            self.key_source = "pbkdf2"
+            if cache_file:
+                _write_key_cache(cache_file, fingerprint, key)
+        self._aead = AESGCM(key)  # réutilisé par tous les appels
+        self._key = key
+        self.derive_ms = round(1000 * (time.perf_counter() - start), 3)
+        print(f"Encryption: AES-256-GCM with PBKDF2 ({KDF_ITERATIONS // 1000}k iterations, "
+              f"key from {self.key_source} in {self.derive_ms} ms)")
+
+    def diagnostics(self) -> Dict[str, Any]:
+        """Coût d'initialisation ; derive_ms reste None tant que la clé n'a pas servi."""
+        return {
+            "method": self.method,
+            "init_ms": self.init_ms,
+            "derive_ms": self.derive_ms,
+            "key_source": self.key_source,
+            "fallbacks": len(self.fallbacks),
+        }
 
     def encrypt(self, data: str) -> str:
 
@@ -77,11 +230,8 @@ class EncryptionHandler:
         # Generate random 96-bit nonce (recommended for GCM)
         nonce = secrets.token_bytes(12)
         
-        # Create cipher
-        cipher = AESGCM(self.key)
-        
         # Encrypt (automatically includes authentication tag)
-        ciphertext = cipher.encrypt(nonce, data.encode(), None)
+        ciphertext = self.aead.encrypt(nonce, data.encode(), None)
         
         # Combine nonce + ciphertext
         combined = nonce + ciphertext
@@ -95,13 +245,22 @@ class EncryptionHandler:
             return None
         
         try:
-            if self.method == "fernet":
-                return self._decrypt_fernet(encrypted_data)
-            else:
-                return self._decrypt_aes_gcm(encrypted_data)
+            return self.decrypt_raw(encrypted_data)
         except Exception as e:
-            print(f"Decryption error: {e}")
-            return None
+            error = e
+        for fallback in self.fallbacks:
+            try:
+                return fallback.decrypt_raw(encrypted_data)
+            except Exception:
+                continue
+        print(f"Decryption error: {error}")
+        return None
+    
+    def decrypt_raw(self, encrypted_data: str) -> str:
+        """Déchiffre avec cette clé seulement ; lève une exception si elle ne convient pas."""
+        if self.method == "fernet":
+            return self._decrypt_fernet(encrypted_data)
+        return self._decrypt_aes_gcm(encrypted_data)
     
     def _decrypt_fernet(self, encrypted_data: str) -> Optional[str]:
         
@@ -118,11 +277,8 @@ class EncryptionHandler:
         nonce = combined[:12]
         ciphertext = combined[12:]
         
-        # Create cipher
-        cipher = AESGCM(self.key)
-        
         # Decrypt and verify authentication tag
-        plaintext = cipher.decrypt(nonce, ciphertext, None)
+        plaintext = self.aead.decrypt(nonce, ciphertext, None)
         
         return plaintext.decode()
 
@@ -134,17 +290,36 @@ class EncryptionHandler:
         
         return self.decrypt(encrypted_token)
     
-    def rotate_key(self, old_key: str, new_key: str, encrypted_data: str) -> Optional[str]:
+    def encrypt_many(self, values: Sequence[str]) -> List[str]:
+        return map_in_pool(self.encrypt, values)
+
+    def decrypt_many(self, values: Sequence[Optional[str]]) -> List[Optional[str]]:
+        return map_in_pool(self.decrypt, values)
+
+    async def encrypt_many_async(self, values: Sequence[str]) -> List[str]:
+        return await map_in_pool_async(self.encrypt, values)
+
+    async def decrypt_many_async(self, values: Sequence[Optional[str]]) -> List[Optional[str]]:
+        return await map_in_pool_async(self.decrypt, values)
+
+    def rotate_key(self, old_key: str, new_key: Optional[str], encrypted_data: str, old_method: str = "fernet", old_salt: Optional[str] = None) -> Optional[str]:
+        # une seule valeur ; pour toute la base voir key_rotation.rotate_account_tokens
+        old = EncryptionHandler(old_method, key=old_key, salt=old_salt)
+        new = EncryptionHandler(self.method, key=new_key, salt=self.salt) if new_key else self
+        return new.encrypt(old.decrypt_raw(encrypted_data))
+
 
-       
-        old_cipher = Fernet(old_key.encode() if isinstance(old_key, str) else old_key)
-        
-       
-        decrypted = old_cipher.decrypt(encrypted_data.encode()).decode()
-        
-        
-        return self.encrypt(decrypted)
 
+def create_old_encryption_handler() -> Optional[EncryptionHandler]:
+    """Handler de l'ancienne clé (ENCRYPTION_OLD_KEY) pendant une rotation, sinon None."""
+    old_key = os.getenv("ENCRYPTION_OLD_KEY")
+    if not old_key:
+        return None
+    return EncryptionHandler(
+        method=os.getenv("ENCRYPTION_OLD_METHOD", "fernet"),
+        key=old_key,
+        salt=os.getenv("ENCRYPTION_OLD_SALT")
+    )
 
 
 def create_encryption_handler(method: str = None) -> EncryptionHandler:
@@ -152,10 +327,12 @@ def create_encryption_handler(method: str = None) -> EncryptionHandler:
     if method is None:
         method = os.getenv("ENCRYPTION_METHOD", "fernet")
     
-    return EncryptionHandler(method=method)
+    old = create_old_encryption_handler()
+    return EncryptionHandler(method=method, fallbacks=[old] if old else None)
 
 
 
+# peu coûteux : en aes-gcm la clé n'est dérivée qu'au premier usage
 encryption_handler = create_encryption_handler()
 
 
@@ -0,0 +1,84 @@
+import base64
+import os
+import secrets
+from typing import Optional
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from .encryption import EncryptionHandler
+from .ttl_cache import TTLCache
+
+
+# préfixe des tokens chiffrés par une clé de compte ; les autres le sont par la clé maître
+ENVELOPE_PREFIX = "env1:"
+
+
+def envelope_enabled() -> bool:
+    return os.getenv("ENCRYPTION_ENVELOPE", "0") == "1"
+
+
+def is_envelope(value: Optional[str]) -> bool:
+    return bool(value) and value.startswith(ENVELOPE_PREFIX)
+
+
+class DataKeyCache(TTLCache):
+    """Cache LRU borné des clés de compte déchiffrées (objets AESGCM prêts à l'emploi).
+
+    Indexé par la clé chiffrée elle-même : après une rotation de la clé maître la
+    valeur stockée change, l'ancienne entrée n'est donc plus jamais lue et finit évincée.
+    """
+
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[float] = None):
+        super().__init__(
+            max_size or int(os.getenv("DATA_KEY_CACHE_SIZE", "1024")),
+            ttl if ttl is not None else float(os.getenv("DATA_KEY_CACHE_TTL_SECONDS", "3600"))
+        )
+
+    def put(self, wrapped_key: str, cipher: AESGCM):
+        self.set(wrapped_key, cipher)
+
+
+class EnvelopeEncryption:
+    """Chiffrement par enveloppe : chaque compte a sa clé AES-256-GCM (data key),
+    stockée chiffrée par la clé maître dans tokens.data_key.
+
+    Une rotation de la clé maître ne rechiffre que ces petites clés, pas les tokens.
+    """
+
+    def __init__(self, master: EncryptionHandler, cache: Optional[DataKeyCache] = None):
+        self.master = master
+        self.cache = cache if cache is not None else DataKeyCache()
+
+    def new_data_key(self) -> str:
+        """Nouvelle clé de compte, renvoyée chiffrée par la clé maître (à stocker)."""
+        return self.master.encrypt(base64.urlsafe_b64encode(AESGCM.generate_key(bit_length=256)).decode())
+
+    def _cipher(self, wrapped_key: str) -> AESGCM:
+        cipher = self.cache.get(wrapped_key)
+        if cipher is None:
+            raw = self.master.decrypt(wrapped_key)
+            if raw is None:
+                raise ValueError("data key cannot be unwrapped with the master key")
+            cipher = AESGCM(base64.urlsafe_b64decode(raw.encode()))
+            self.cache.put(wrapped_key, cipher)
+        return cipher
+
+    def encrypt(self, data: str, wrapped_key: str) -> str:
+        if not data:
+            return ""
+        nonce = secrets.token_bytes(12)
+        ciphertext = self._cipher(wrapped_key).encrypt(nonce, data.encode(), None)
+        return ENVELOPE_PREFIX + base64.urlsafe_b64encode(nonce + ciphertext).decode()
+
+    def decrypt(self, value: str, wrapped_key: Optional[str]) -> Optional[str]:
+        """Déchiffre un token de compte ; les tokens sans préfixe passent par la clé maître."""
+        if not value:
+            return None
+        if not is_envelope(value):
+            return self.master.decrypt(value)
+        try:
+            combined = base64.urlsafe_b64decode(value[len(ENVELOPE_PREFIX):].encode())
+            return self._cipher(wrapped_key).decrypt(combined[:12], combined[12:], None).decode()
+        except Exception as e:
+            print(f"Decryption error: {e}")
+            return None
@@ -0,0 +1,197 @@
+"""Plan d'index MongoDB par forme de requête, et vérification par explain()."""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from .model import PostStatus
+
+
+class IndexPlanError(Exception):
+    """Une requête chaude n'est pas servie par un index (COLLSCAN ou tri en mémoire)."""
+
+
+INDEX_PLAN: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("discord_id", ASCENDING)], unique=True),
+    ],
+    "social_accounts": [
+        IndexModel([("platform", ASCENDING)]),
+        IndexModel([("account_name", ASCENDING)]),
+    ],
+    "scheduled_posts": [
+        IndexModel([("status", ASCENDING)]),
+        IndexModel([("scheduled_time", ASCENDING)]),
+        # get_pending_posts / claim_pending_posts / get_schedule_entries
+        IndexModel(
+            [("status", ASCENDING), ("next_attempt_at", ASCENDING)],
+            name="due_posts",
+            partialFilterExpression={"status": PostStatus.SCHEDULED.value},
+        ),
+        # release_expired_leases
+        IndexModel(
+            [("status", ASCENDING), ("lease_expires_at", ASCENDING)],
+            name="expired_leases",
+            partialFilterExpression={"status": PostStatus.PROCESSING.value},
+        ),
+    ],
+    "published_posts": [
+        # pagination keyset (published_at, _id), avec ou sans filtre plateforme
+        IndexModel([("platform", ASCENDING), ("published_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("published_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "published_posts_archive": [
+        IndexModel([("published_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "post_refs": [
+        # resolve_post_ref(ref) et resolve_post_ref(ref, platform)
+        IndexModel([("ref", ASCENDING), ("platform", ASCENDING)], unique=True),
+        # nettoyage des références à la suppression d'un post
+        IndexModel([("target_id", ASCENDING)]),
+    ],
+    "bot_commands": [
+        IndexModel([("name", ASCENDING)], unique=True),
+        IndexModel([("created_at", ASCENDING)]),
+    ],
+    "reply_actions": [
+        IndexModel([("post_id", ASCENDING), ("executed_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "delete_actions": [
+        IndexModel([("post_id", ASCENDING)]),
+    ],
+    # l'index timestamp (TTL) des logs est géré par retention.provision_log_collections
+    "activity_logs": [
+        IndexModel([("discord_id", ASCENDING)]),
+    ],
+    "command_logs": [
+        IndexModel([("discord_id", ASCENDING)]),
+    ],
+    "activity_stats_daily": [
+        IndexModel([("_id.discord_id", ASCENDING), ("_id.day", DESCENDING)]),
+        IndexModel([("_id.bot_command_id", ASCENDING), ("_id.day", DESCENDING)]),
+    ],
+    "command_stats_daily": [
+        IndexModel([("_id.discord_id", ASCENDING), ("_id.day", DESCENDING)]),
+        IndexModel([("_id.bot_command_id", ASCENDING), ("_id.day", DESCENDING)]),
+    ],
+}
+
+
+def hot_queries(now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Les requêtes fréquentes du handler, telles qu'elles sont envoyées à MongoDB."""
+    now = now or datetime.now(timezone.utc)
+    return [
+        {
+            "name": "due_posts",
+            "collection": "scheduled_posts",
+            "filter": {
+                "status": PostStatus.SCHEDULED.value,
+                "next_attempt_at": {"$lte": now},
+                "attempts": {"$lt": 3},
+            },
+            "sort": [("next_attempt_at", ASCENDING)],
+        },
+        {
+            "name": "expired_leases",
+            "collection": "scheduled_posts",
+            "filter": {
+                "status": PostStatus.PROCESSING.value,
+                "lease_expires_at": {"$lt": now},
+            },
+            "sort": None,
+        },
+        {
+            "name": "published_by_platform",
+            "collection": "published_posts",
+            "filter": {"platform": "facebook"},
+            "sort": [("published_at", DESCENDING), ("_id", DESCENDING)],
+        },
+        {
+            "name": "published_all",
+            "collection": "published_posts",
+            "filter": {},
+            "sort": [("published_at", DESCENDING), ("_id", DESCENDING)],
+        },
+        {
+            "name": "replies_by_post",
+            "collection": "reply_actions",
+            "filter": {"post_id": "0"},
+            "sort": [("executed_at", DESCENDING), ("_id", DESCENDING)],
+        },
+        {
+            "name": "post_ref",
+            "collection": "post_refs",
+            "filter": {"ref": "0"},
+            "sort": None,
+        },
+        {
+            "name": "bot_commands",
+            "collection": "bot_commands",
+            "filter": {},
+            "sort": [("created_at", ASCENDING)],
+        },
+        {
+            "name": "user_by_discord_id",
+            "collection": "users",
+            "filter": {"discord_id": "0"},
+            "sort": None,
+        },
+    ]
+
+
+async def ensure_indexes(db, plan: Optional[Dict[str, List[IndexModel]]] = None):
+    """Crée les index du plan. Un conflit avec un index existant est signalé sans bloquer le démarrage."""
+    for collection, models in (plan or INDEX_PLAN).items():
+        for model in models:
+            try:
+                await db[collection].create_indexes([model])
+            except OperationFailure as e:
+                print(f"Index {collection}.{model.document['name']} not created: {e}")
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+async def verify_query_plans(db, queries: Optional[List[Dict[str, Any]]] = None) -> Dict[str, List[str]]:
+    """Lance explain() sur chaque requête chaude ; lève IndexPlanError en cas de COLLSCAN ou de SORT."""
+    plans = {}
+    problems = []
+    for query in queries or hot_queries():
+        cursor = db[query["collection"]].find(query["filter"])
+        if query["sort"]:
+            cursor = cursor.sort(query["sort"])
+        explain = await cursor.explain()
+        stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        plans[query["name"]] = stages
+        for bad_stage in ("COLLSCAN", "SORT"):
+            if bad_stage in stages:
+                problems.append(f"{query['name']} ({query['collection']}): {bad_stage}")
+    if problems:
+        raise IndexPlanError("Hot queries not served by an index: " + ", ".join(problems))
+    return plans
+
+
+if __name__ == "__main__":
+    import asyncio
+    from .mongodb_handler import db_handler
+
+    async def main():
+        await db_handler.connect()
+        try:
+            for name, stages in (await verify_query_plans(db_handler.db)).items():
+                print(f"{name}: {' <- '.join(stages)}")
+        finally:
+            await db_handler.close()
+
+    asyncio.run(main())
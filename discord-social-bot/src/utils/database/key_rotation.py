@@ -0,0 +1,134 @@
+"""Rotation de la clé de chiffrement des tokens stockés dans social_accounts.
+
+En mode enveloppe (ENCRYPTION_ENVELOPE=1) seules les clés de compte (tokens.data_key)
+sont rechiffrées ; les tokens "env1:" ne changent pas.
+
+Procédure :
+  1. déployer le bot avec ENCRYPTION_KEY = nouvelle clé et ENCRYPTION_OLD_KEY = ancienne
+     (ENCRYPTION_OLD_METHOD / ENCRYPTION_OLD_SALT si besoin) : les lectures acceptent
+     les deux clés, les écritures utilisent la nouvelle ;
+  2. lancer `python -m src.utils.database.key_rotation` (reprend où il s'est arrêté) ;
+  3. retirer ENCRYPTION_OLD_KEY une fois la rotation terminée.
+"""
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from .encryption import EncryptionHandler, map_in_pool_async
+from .envelope import is_envelope
+
+
+STATE_COLLECTION = "key_rotation_state"
+TOKEN_FIELDS = ("access_token", "refresh_token", "data_key")
+
+
+def _reencrypt(value: str, old: EncryptionHandler, new: EncryptionHandler) -> Tuple[Optional[str], str]:
+    """(nouveau chiffré, statut) ; statut = rotated, already (déjà sous la nouvelle clé) ou failed."""
+    try:
+        return new.encrypt(old.decrypt_raw(value)), "rotated"
+    except Exception:
+        pass
+    try:
+        new.decrypt_raw(value)
+        return None, "already"
+    except Exception:
+        return None, "failed"
+
+
+def _reencrypt_doc(doc: Dict[str, Any], old: EncryptionHandler, new: EncryptionHandler) -> Tuple[Optional[UpdateOne], List[str]]:
+    """Partie CPU pour un compte, exécutée sur le pool de threads : (mise à jour, statuts)."""
+    tokens = doc.get("tokens") or {}
+    update = {}
+    statuses = []
+    for field in TOKEN_FIELDS:
+        value = tokens.get(field)
+        if not value or is_envelope(value):
+            continue  # chiffré par la clé du compte, elle-même rechiffrée via data_key
+        encrypted, status = _reencrypt(value, old, new)
+        statuses.append(status)
+        if encrypted:
+            update[f"tokens.{field}"] = encrypted
+    if not update:
+        return None, statuses
+    # filtre sur les anciens chiffrés : un update_tokens concurrent (déjà sous la
+    # nouvelle clé) n'est pas écrasé
+    query = {"_id": doc["_id"]}
+    for key in update:
+        query[key] = tokens[key.split(".", 1)[1]]
+    return UpdateOne(query, {"$set": update}), statuses
+
+
+async def rotate_account_tokens(
+    db, old: EncryptionHandler, new: EncryptionHandler,
+    batch_size: int = 500, job_id: str = "social_accounts", restart: bool = False
+) -> Dict[str, Any]:
+    """Rechiffre tous les tokens de social_accounts de `old` vers `new`, par lots d'_id croissants.
+
+    Après chaque lot, le dernier _id traité est enregistré dans key_rotation_state :
+    relancé après un arrêt, le job repart de là (restart=True pour tout reprendre).
+    Rejouer un lot est sans effet : les tokens déjà sous la nouvelle clé sont ignorés.
+    """
+    state = None if restart else await db[STATE_COLLECTION].find_one({"_id": job_id})
+    if state and state.get("finished_at"):
+        state = None  # rotation précédente terminée : nouvelle passe complète
+    last_id = state.get("last_id") if state else None
+    totals = {key: (state or {}).get(key, 0) for key in ("accounts", "rotated", "already", "failed")}
+    started_at = (state or {}).get("started_at") or datetime.now(timezone.utc)
+    projection = {f"tokens.{field}": 1 for field in TOKEN_FIELDS}
+
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        docs = await db.social_accounts.find(query, projection).sort("_id", 1).limit(batch_size).to_list(None)
+        if not docs:
+            break
+        results = await map_in_pool_async(lambda doc: _reencrypt_doc(doc, old, new), docs)
+        ops = [op for op, _ in results if op is not None]
+        if ops:
+            await db.social_accounts.bulk_write(ops, ordered=False)
+        last_id = docs[-1]["_id"]
+        totals["accounts"] += len(docs)
+        for _, statuses in results:
+            for status in statuses:
+                totals[status] += 1
+        await db[STATE_COLLECTION].update_one(
+            {"_id": job_id},
+            {"$set": {"last_id": last_id, "started_at": started_at, "finished_at": None,
+                      "updated_at": datetime.now(timezone.utc), **totals}},
+            upsert=True
+        )
+
+    finished_at = datetime.now(timezone.utc)
+    await db[STATE_COLLECTION].update_one(
+        {"_id": job_id},
+        {"$set": {"last_id": last_id, "started_at": started_at, "finished_at": finished_at,
+                  "updated_at": finished_at, **totals}},
+        upsert=True
+    )
+    return {**totals, "seconds": round((finished_at - started_at).total_seconds(), 3)}
+
+
+if __name__ == "__main__":
+    import sys
+    from .encryption import create_old_encryption_handler, encryption_handler
+    from .mongodb_handler import db_handler
+
+    async def main():
+        old = create_old_encryption_handler()
+        if old is None:
+            print("ENCRYPTION_OLD_KEY manquante : rien à faire")
+            return
+        await db_handler.connect()
+        try:
+            result = await db_handler.rotate_encryption_key(
+                old, encryption_handler,
+                batch_size=int(os.getenv("KEY_ROTATION_BATCH_SIZE", "500")),
+                restart="--restart" in sys.argv
+            )
+            print(f"Rotation terminée : {result}")
+        finally:
+            await db_handler.close()
+
+    asyncio.run(main())
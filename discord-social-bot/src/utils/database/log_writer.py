@@ -0,0 +1,115 @@
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+
+
+class LogWriter:
+    """Écriture asynchrone des logs (command_logs, activity_logs...).
+
+    Les appelants déposent les documents dans une asyncio.Queue bornée ; une tâche de
+    fond les regroupe et les écrit avec insert_many(ordered=False). Quand le tampon est
+    plein, la politique "drop" abandonne le log, "block" fait attendre l'appelant.
+    """
+
+    def __init__(
+        self,
+        handler,
+        max_buffer: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        policy: Optional[str] = None
+    ):
+        self._handler = handler
+        self.max_buffer = max_buffer or int(os.getenv("LOG_BUFFER_SIZE", "10000"))
+        self.batch_size = batch_size or int(os.getenv("LOG_BATCH_SIZE", "500"))
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.getenv("LOG_FLUSH_SECONDS", "0.5"))
+        self.policy = policy or os.getenv("LOG_BUFFER_POLICY", "drop")
+        if self.policy not in ("drop", "block"):
+            raise ValueError(f"Unknown log buffer policy: {self.policy}")
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self.written = 0
+        self.dropped = 0
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_buffer)
+            self._stopping = asyncio.Event()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def write(self, collection: str, doc: Dict[str, Any]):
+        self._ensure_started()
+        if self.policy == "block":
+            await self._queue.put((collection, doc))
+            return
+        try:
+            self._queue.put_nowait((collection, doc))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "buffered": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            batch: List[Tuple[str, Dict[str, Any]]] = []
+            if item is None:
+                stopping = True
+            else:
+                batch.append(item)
+                # laisser le lot se remplir, sauf si la file en contient déjà assez
+                # (ou si close() attend : l'arrêt n'a pas à patienter flush_interval)
+                if self.flush_interval and self._queue.qsize() < self.batch_size:
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+                    except asyncio.TimeoutError:
+                        pass
+            while len(batch) < self.batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    continue
+                batch.append(item)
+            await self._write(batch)
+
+    async def _write(self, batch: List[Tuple[str, Dict[str, Any]]]):
+        by_collection: Dict[str, List[Dict[str, Any]]] = {}
+        for collection, doc in batch:
+            by_collection.setdefault(collection, []).append(doc)
+        for collection, docs in by_collection.items():
+            try:
+                await self._handler.db[collection].insert_many(docs, ordered=False)
+                self.written += len(docs)
+            except BulkWriteError as e:
+                self.written += e.details.get("nInserted", 0)
+                print(f"LogWriter {collection} write errors: {e.details.get('writeErrors', [])[:3]}")
+            except Exception as e:
+                print(f"LogWriter {collection} write error: {e}")
+
+    async def close(self):
+        """Écrit tout ce qui reste dans le tampon puis arrête la tâche de fond."""
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        self._stopping.clear()
+        # logs éventuellement déposés après le signal d'arrêt
+        remaining = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                remaining.append(item)
+        if remaining:
+            await self._write(remaining)
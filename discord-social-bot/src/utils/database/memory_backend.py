@@ -0,0 +1,813 @@
+"""Backend MongoDB en mémoire, sélectionné par MONGODB_BACKEND=memory.
+
+Implémente dans le processus le sous-ensemble de l'API Motor utilisé par
+MongoDBHandler (find/sort/limit, find_one_and_update, insert, update, delete,
+bulk_write, index), pour les benchmarks et les tests sans mongod. Les index
+déclarés (y compris partiels et uniques) sont réellement maintenus et utilisés
+par find et find_one_and_update. Pas de persistance, pas d'agrégation ni de
+change streams : ces appels lèvent OperationFailure, comme un serveur qui ne
+les supporte pas.
+"""
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+from enum import Enum
+from itertools import count
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from pymongo.results import (
+    BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+)
+
+
+_MISSING = object()
+_IMMUTABLE = {str, int, float, bool, type(None), ObjectId}
+
+
+# ************************ Valeurs BSON ************************
+
+def _normalize(value: Any) -> Any:
+    """Copie une valeur comme si elle faisait l'aller-retour par BSON (dates UTC naïves à la ms)."""
+    if type(value) in _IMMUTABLE:
+        return value
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+
+def _rank(value: Any) -> int:
+    # ordre de comparaison BSON entre types
+    if value is None:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    rank = _rank(value)
+    if rank == 1:
+        return (1, 0)
+    if rank in (4, 5, 10):
+        return (rank, repr(value))
+    return (rank, value)
+
+
+class _Desc:
+    """Inverse l'ordre d'une clé (champ d'index ou de tri descendant)."""
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __eq__(self, other):
+        return isinstance(other, _Desc) and self.key == other.key
+
+    def __lt__(self, other):
+        if other is _TOP:
+            return True
+        return other.key < self.key
+
+    def __gt__(self, other):
+        if other is _TOP:
+            return False
+        return self.key < other.key
+
+
+class _Top:
+    """Plus grand que toute clé : borne haute d'un préfixe."""
+
+    def __eq__(self, other):
+        return other is self
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return other is not self
+
+
+_TOP = _Top()
+
+
+def _get(doc: Dict[str, Any], path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _set(doc: Dict[str, Any], path: str, value: Any):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def _unset(doc: Dict[str, Any], path: str) -> bool:
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return False
+    return doc.pop(last, _MISSING) is not _MISSING
+
+
+# ************************ Filtres ************************
+
+def _equals(value: Any, expected: Any) -> bool:
+    if expected is None:
+        return value is _MISSING or value is None
+    if value is _MISSING:
+        return False
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return _rank(value) == _rank(expected) and value == expected
+
+
+def _compare(value: Any, bound: Any, op: str) -> bool:
+    if value is _MISSING or _rank(value) != _rank(bound):
+        return False
+    if value is None:
+        return op in ("$lte", "$gte")
+    if op == "$lt":
+        return value < bound
+    if op == "$lte":
+        return value <= bound
+    if op == "$gt":
+        return value > bound
+    return value >= bound
+
+
+def _match_operator(value: Any, op: str, arg: Any) -> bool:
+    if op in ("$lt", "$lte", "$gt", "$gte"):
+        return _compare(value, arg, op)
+    if op == "$eq":
+        return _equals(value, arg)
+    if op == "$ne":
+        return not _equals(value, arg)
+    if op == "$in":
+        return any(_equals(value, a) for a in arg)
+    if op == "$nin":
+        return not any(_equals(value, a) for a in arg)
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    raise OperationFailure(f"Unsupported query operator for the memory backend: {op}")
+
+
+def _is_operator_dict(cond: Any) -> bool:
+    return isinstance(cond, dict) and bool(cond) and all(k.startswith("$") for k in cond)
+
+
+def matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for key, cond in query.items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in cond):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, q) for q in cond):
+                return False
+        else:
+            value = _get(doc, key)
+            if _is_operator_dict(cond):
+                if not all(_match_operator(value, op, arg) for op, arg in cond.items()):
+                    return False
+            elif not _equals(value, cond):
+                return False
+    return True
+
+
+def _equalities(query: Dict[str, Any]) -> Dict[str, Any]:
+    """Champs contraints à une valeur unique (égalité simple ou $eq), y compris dans $and."""
+    eq = {}
+    for key, cond in query.items():
+        if key == "$and":
+            for sub in cond:
+                eq.update(_equalities(sub))
+        elif key.startswith("$"):
+            continue
+        elif _is_operator_dict(cond):
+            if "$eq" in cond:
+                eq[key] = cond["$eq"]
+        else:
+            eq[key] = cond
+    return eq
+
+
+# ************************ Mises à jour ************************
+
+def _resolve(doc: Dict[str, Any], expr: Any) -> Any:
+    # pipeline de mise à jour : seules les références "$champ" et les littéraux sont gérés
+    if isinstance(expr, str) and expr.startswith("$"):
+        value = _get(doc, expr[1:])
+        return None if value is _MISSING else value
+    return expr
+
+
+def apply_update(doc: Dict[str, Any], update: Any, inserting: bool = False) -> bool:
+    """Applique `update` à `doc` (sur place). Renvoie True si le document a changé."""
+    modified = False
+    if isinstance(update, list):
+        for stage in update:
+            for op, spec in stage.items():
+                if op in ("$set", "$addFields"):
+                    for path, expr in spec.items():
+                        value = _resolve(doc, expr)
+                        if _get(doc, path) != value:
+                            _set(doc, path, value)
+                            modified = True
+                elif op == "$unset":
+                    for path in [spec] if isinstance(spec, str) else spec:
+                        modified |= _unset(doc, path)
+                else:
+                    raise OperationFailure(f"Unsupported update stage for the memory backend: {op}")
+        return modified
+
+    for op, spec in update.items():
+        spec = _normalize(spec)
+        if op == "$set" or (op == "$setOnInsert" and inserting):
+            for path, value in spec.items():
+                if _get(doc, path) != value:
+                    _set(doc, path, value)
+                    modified = True
+        elif op == "$setOnInsert":
+            continue
+        elif op == "$unset":
+            for path in spec:
+                modified |= _unset(doc, path)
+        elif op == "$inc":
+            for path, amount in spec.items():
+                current = _get(doc, path)
+                _set(doc, path, (0 if current is _MISSING else current) + amount)
+                modified |= amount != 0
+        elif op == "$push":
+            for path, value in spec.items():
+                current = _get(doc, path)
+                items = [] if current is _MISSING else list(current)
+                items.extend(value["$each"] if isinstance(value, dict) and "$each" in value else [value])
+                _set(doc, path, items)
+                modified = True
+        elif op in ("$min", "$max"):
+            for path, value in spec.items():
+                current = _get(doc, path)
+                better = _compare(value, current, "$lt" if op == "$min" else "$gt") if current is not _MISSING else True
+                if better:
+                    _set(doc, path, value)
+                    modified = True
+        else:
+            raise OperationFailure(f"Unsupported update operator for the memory backend: {op}")
+    return modified
+
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    doc = _normalize(doc)
+    if not projection:
+        return doc
+    include_id = projection.get("_id", 1)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if fields and all(fields.values()):
+        out = {}
+        for path in fields:
+            value = _get(doc, path)
+            if value is not _MISSING:
+                _set(out, path, value)
+        if include_id and "_id" in doc:
+            out = {"_id": doc["_id"], **out}
+        return out
+    out = {k: v for k, v in doc.items() if k not in fields}
+    if not include_id:
+        out.pop("_id", None)
+    return out
+
+
+# ************************ Index ************************
+
+class _SortedList:
+    """Liste triée par tranches : insertion et suppression en O(log n + taille de tranche)."""
+
+    LOAD = 512
+
+    def __init__(self):
+        self._lists: List[List[Any]] = []
+        self._maxes: List[Any] = []
+
+    def __len__(self) -> int:
+        return sum(len(part) for part in self._lists)
+
+    def add(self, item: Any):
+        if not self._lists:
+            self._lists.append([item])
+            self._maxes.append(item)
+            return
+        i = bisect_left(self._maxes, item)
+        if i == len(self._maxes):
+            i -= 1
+            self._lists[i].append(item)
+            self._maxes[i] = item
+        else:
+            insort(self._lists[i], item)
+        if len(self._lists[i]) > 2 * self.LOAD:
+            part = self._lists[i]
+            self._lists[i:i + 1] = [part[:self.LOAD], part[self.LOAD:]]
+            self._maxes[i:i + 1] = [part[self.LOAD - 1], part[-1]]
+
+    def remove(self, item: Any):
+        i = bisect_left(self._maxes, item)
+        part = self._lists[i]
+        del part[bisect_left(part, item)]
+        if part:
+            self._maxes[i] = part[-1]
+        else:
+            del self._lists[i]
+            del self._maxes[i]
+
+    def _locate(self, key: Any, right: bool) -> Tuple[int, int]:
+        bisect = bisect_right if right else bisect_left
+        i = bisect(self._maxes, key)
+        if i == len(self._maxes):
+            return i, 0
+        return i, bisect(self._lists[i], key)
+
+    def iter_from(self, key: Any) -> Iterator[Any]:
+        """Éléments >= key, dans l'ordre croissant."""
+        i, j = self._locate(key, right=False)
+        while i < len(self._lists):
+            part = self._lists[i]
+            yield from part[j:]
+            i, j = i + 1, 0
+
+    def iter_before(self, key: Any) -> Iterator[Any]:
+        """Éléments < key, dans l'ordre décroissant."""
+        i, j = self._locate(key, right=False)
+        if i == len(self._lists):
+            i, j = i - 1, len(self._lists[-1]) if self._lists else 0
+        while i >= 0:
+            part = self._lists[i]
+            yield from reversed(part[:j])
+            i -= 1
+            if i >= 0:
+                j = len(self._lists[i])
+
+
+class MemoryIndex:
+    def __init__(self, name: str, keys: List[Tuple[str, int]], unique: bool = False,
+                 partial: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.keys = keys
+        self.unique = unique
+        self.partial = partial or {}
+        self._entries = _SortedList()
+        self._by_id: Dict[Any, Tuple] = {}
+
+    def key_for(self, values: List[Any]) -> Tuple:
+        return tuple(
+            _Desc(_sort_key(value)) if direction < 0 else _sort_key(value)
+            for value, (_, direction) in zip(values, self.keys)
+        )
+
+    def _doc_key(self, doc: Dict[str, Any]) -> Optional[Tuple]:
+        if self.partial and not matches(doc, self.partial):
+            return None
+        values = [_get(doc, field) for field, _ in self.keys]
+        return self.key_for([None if v is _MISSING else v for v in values])
+
+    def check(self, doc: Dict[str, Any], doc_id: Any):
+        if not self.unique:
+            return
+        key = self._doc_key(doc)
+        if key is None:
+            return
+        for other_key, _, other_id in self._entries.iter_from((key,)):
+            if other_key != key:
+                break
+            if other_id != doc_id:
+                raise DuplicateKeyError(f"E11000 duplicate key error index: {self.name}", 11000)
+
+    def add(self, doc: Dict[str, Any], seq: int):
+        key = self._doc_key(doc)
+        if key is not None:
+            entry = (key, seq, doc["_id"])
+            self._entries.add(entry)
+            self._by_id[doc["_id"]] = entry
+
+    def remove(self, doc_id: Any):
+        entry = self._by_id.pop(doc_id, None)
+        if entry is not None:
+            self._entries.remove(entry)
+
+    def update(self, doc: Dict[str, Any], seq: int):
+        old = self._by_id.get(doc["_id"])
+        new_key = self._doc_key(doc)
+        if old is not None and new_key == old[0]:
+            return
+        self.remove(doc["_id"])
+        if new_key is not None:
+            entry = (new_key, seq, doc["_id"])
+            self._entries.add(entry)
+            self._by_id[doc["_id"]] = entry
+
+    def scan(self, prefix: Tuple, reverse: bool) -> Iterator[Any]:
+        """_id des documents dont la clé commence par `prefix`, dans l'ordre de l'index (ou inverse)."""
+        n = len(prefix)
+        if reverse:
+            entries = self._entries.iter_before((prefix + (_TOP,),))
+        else:
+            entries = self._entries.iter_from((prefix,))
+        for key, _, doc_id in entries:
+            if key[:n] != prefix:
+                break
+            yield doc_id
+
+
+# ************************ Collections ************************
+
+class MemoryCursor:
+    def __init__(self, collection: "MemoryCollection", query: Dict[str, Any],
+                 projection: Optional[Dict[str, Any]] = None):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction: Optional[int] = None) -> "MemoryCursor":
+        self._sort = _sort_spec(key_or_list, direction)
+        return self
+
+    def skip(self, skip: int) -> "MemoryCursor":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> "MemoryCursor":
+        return self
+
+    def _docs(self) -> Iterator[Dict[str, Any]]:
+        docs = self._collection._select(self._query, self._sort)
+        taken = 0
+        for i, doc in enumerate(docs):
+            if i < self._skip:
+                continue
+            if self._limit and taken >= self._limit:
+                return
+            taken += 1
+            yield _project(doc, self._projection)
+
+    async def __aiter__(self):
+        for doc in self._docs():
+            yield doc
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        docs = []
+        for doc in self._docs():
+            docs.append(doc)
+            if length and len(docs) >= length:
+                break
+        return docs
+
+    async def explain(self) -> Dict[str, Any]:
+        if "_id" in _equalities(self._query):
+            return {"queryPlanner": {"winningPlan": {"stage": "IDHACK"}}}
+        index, sorted_by_index, _ = self._collection._plan(_normalize(self._query), self._sort)
+        stage = {"stage": "COLLSCAN"} if index is None else {
+            "stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": index.name}
+        }
+        if self._sort and not sorted_by_index:
+            stage = {"stage": "SORT", "inputStage": stage}
+        return {"queryPlanner": {"winningPlan": stage}}
+
+
+class _ListCursor:
+    def __init__(self, items: List[Dict[str, Any]]):
+        self._items = items
+
+    async def __aiter__(self):
+        for item in self._items:
+            yield item
+
+
+def _sort_spec(key_or_list, direction: Optional[int] = None) -> List[Tuple[str, int]]:
+    if key_or_list is None:
+        return []
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [(key, d) for key, d in key_or_list]
+
+
+def _doc_sort_key(doc: Dict[str, Any], sort: List[Tuple[str, int]]) -> Tuple:
+    key = []
+    for field, direction in sort:
+        value = _get(doc, field)
+        value = _sort_key(None if value is _MISSING else value)
+        key.append(_Desc(value) if direction < 0 else value)
+    return tuple(key)
+
+
+def _index_spec(keys) -> List[Tuple[str, int]]:
+    if isinstance(keys, str):
+        return [(keys, 1)]
+    return [(k, d) for k, d in keys]
+
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self._docs: Dict[Any, Dict[str, Any]] = {}
+        self._seq: Dict[Any, int] = {}
+        self._counter = count()
+        self._indexes: Dict[str, MemoryIndex] = {}
+
+    # --- index ---
+    def _add_index(self, keys, name: Optional[str] = None, unique: bool = False,
+                   partialFilterExpression: Optional[Dict[str, Any]] = None, **_) -> str:
+        spec = _index_spec(keys)
+        name = name or "_".join(f"{field}_{direction}" for field, direction in spec)
+        existing = self._indexes.get(name)
+        if existing:
+            if existing.keys != spec or existing.unique != unique:
+                raise OperationFailure(f"Index with name: {name} already exists with different options", 85)
+            return name
+        index = MemoryIndex(name, spec, unique, _normalize(partialFilterExpression) if partialFilterExpression else None)
+        for doc_id, doc in self._docs.items():
+            index.check(doc, doc_id)
+            index.add(doc, self._seq[doc_id])
+        self._indexes[name] = index
+        return name
+
+    async def create_index(self, keys, **kwargs) -> str:
+        return self._add_index(keys, **kwargs)
+
+    async def create_indexes(self, models) -> List[str]:
+        names = []
+        for model in models:
+            document = dict(model.document)
+            keys = list(document.pop("key").items())
+            names.append(self._add_index(keys, **document))
+        return names
+
+    # --- plan de requête ---
+    def _plan(self, query: Dict[str, Any], sort: List[Tuple[str, int]]):
+        """Choisit l'index qui sert le mieux la requête : (index, tri fourni par l'index, préfixe, sens)."""
+        eq = _equalities(query)
+        best, best_score = None, (False, 0)
+        for index in self._indexes.values():
+            if any(not _equals(eq.get(k, _MISSING), v) for k, v in index.partial.items()):
+                continue
+            prefix = 0
+            while prefix < len(index.keys) and index.keys[prefix][0] in eq:
+                prefix += 1
+            rest = index.keys[prefix:prefix + len(sort)]
+            forward = bool(sort) and rest == sort
+            backward = bool(sort) and rest == [(f, -d) for f, d in sort]
+            if not (prefix or forward or backward or index.partial):
+                continue
+            score = (forward or backward, prefix)
+            if best is None or score > best_score:
+                best, best_score = (index, forward or backward, prefix, backward), score
+        if best is None:
+            return None, False, None
+        index, sorted_by_index, prefix, backward = best
+        values = [_normalize(eq[field]) for field, _ in index.keys[:prefix]]
+        return index, sorted_by_index, (index.key_for(values), backward)
+
+    def _select(self, query: Dict[str, Any], sort: List[Tuple[str, int]]) -> Iterator[Dict[str, Any]]:
+        query = _normalize(query)
+        doc_id = _equalities(query).get("_id", _MISSING)
+        if doc_id is not _MISSING:
+            # lookup direct par _id
+            doc = self._docs.get(doc_id)
+            return iter([doc] if doc is not None and matches(doc, query) else [])
+        id_cond = query.get("_id")
+        if _is_operator_dict(id_cond) and isinstance(id_cond.get("$in"), list):
+            # lookup direct par liste de _id (réclamation par lots, refs...)
+            sorted_by_index = False
+            candidates = [self._docs.get(doc_id) for doc_id in dict.fromkeys(id_cond["$in"])]
+        else:
+            index, sorted_by_index, scan = self._plan(query, sort)
+            if index is None:
+                candidates = list(self._docs.values())
+            else:
+                prefix, backward = scan
+                candidates = (self._docs.get(doc_id) for doc_id in index.scan(prefix, backward))
+        docs = (doc for doc in candidates if doc is not None and matches(doc, query))
+        if not sort or sorted_by_index:
+            return docs
+        return iter(sorted(docs, key=lambda doc: _doc_sort_key(doc, sort)))
+
+    # --- lecture ---
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> MemoryCursor:
+        return MemoryCursor(self, query or {}, projection)
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None,
+                       sort=None) -> Optional[Dict[str, Any]]:
+        doc = next(self._select(query or {}, _sort_spec(sort)), None)
+        return _project(doc, projection) if doc is not None else None
+
+    async def count_documents(self, query: Dict[str, Any]) -> int:
+        return sum(1 for _ in self._select(query, []))
+
+    async def estimated_document_count(self) -> int:
+        return len(self._docs)
+
+    # --- écriture ---
+    def _insert(self, doc: Dict[str, Any]) -> Any:
+        doc = _normalize(doc)
+        doc.setdefault("_id", ObjectId())
+        if doc["_id"] in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error index: _id_ dup key: {doc['_id']}", 11000)
+        for index in self._indexes.values():
+            index.check(doc, doc["_id"])
+        seq = next(self._counter)
+        self._docs[doc["_id"]] = doc
+        self._seq[doc["_id"]] = seq
+        for index in self._indexes.values():
+            index.add(doc, seq)
+        return doc["_id"]
+
+    def _update(self, doc: Dict[str, Any], update: Any) -> bool:
+        changed = _normalize(doc)
+        if not apply_update(changed, update):
+            return False
+        for index in self._indexes.values():
+            index.check(changed, doc["_id"])
+        doc.clear()
+        doc.update(changed)
+        for index in self._indexes.values():
+            index.update(doc, self._seq[doc["_id"]])
+        return True
+
+    def _upsert(self, query: Dict[str, Any], update: Any) -> Any:
+        doc = {k: v for k, v in _equalities(_normalize(query)).items() if not _is_operator_dict(v)}
+        apply_update(doc, update, inserting=True)
+        return self._insert(doc)
+
+    def _delete(self, doc_id: Any):
+        for index in self._indexes.values():
+            index.remove(doc_id)
+        del self._docs[doc_id]
+        del self._seq[doc_id]
+
+    def _update_docs(self, query: Dict[str, Any], update: Any, upsert: bool, many: bool) -> Dict[str, Any]:
+        targets = list(self._select(query, []))
+        if not many:
+            targets = targets[:1]
+        modified = sum(1 for doc in targets if self._update(doc, update))
+        result = {"n": len(targets), "nModified": modified}
+        if not targets and upsert:
+            result["upserted"] = self._upsert(query, update)
+            result["n"] = 1
+        return result
+
+    def _delete_docs(self, query: Dict[str, Any], many: bool) -> int:
+        targets = [doc["_id"] for doc in self._select(query, [])]
+        if not many:
+            targets = targets[:1]
+        for doc_id in targets:
+            self._delete(doc_id)
+        return len(targets)
+
+    async def insert_one(self, doc: Dict[str, Any]) -> InsertOneResult:
+        return InsertOneResult(self._insert(doc), True)
+
+    async def insert_many(self, docs: List[Dict[str, Any]], ordered: bool = True) -> InsertManyResult:
+        return InsertManyResult([self._insert(doc) for doc in docs], True)
+
+    async def update_one(self, query: Dict[str, Any], update: Any, upsert: bool = False) -> UpdateResult:
+        return UpdateResult(self._update_docs(query, update, upsert, many=False), True)
+
+    async def update_many(self, query: Dict[str, Any], update: Any, upsert: bool = False) -> UpdateResult:
+        return UpdateResult(self._update_docs(query, update, upsert, many=True), True)
+
+    async def delete_one(self, query: Dict[str, Any]) -> DeleteResult:
+        return DeleteResult({"n": self._delete_docs(query, many=False)}, True)
+
+    async def delete_many(self, query: Dict[str, Any]) -> DeleteResult:
+        return DeleteResult({"n": self._delete_docs(query, many=True)}, True)
+
+    async def find_one_and_update(self, query: Dict[str, Any], update: Any, projection=None, sort=None,
+                                  upsert: bool = False, return_document: bool = ReturnDocument.BEFORE):
+        doc = next(self._select(query, _sort_spec(sort)), None)
+        if doc is None:
+            if not upsert:
+                return None
+            doc_id = self._upsert(query, update)
+            return _project(self._docs[doc_id], projection) if return_document == ReturnDocument.AFTER else None
+        before = _project(doc, projection)
+        self._update(doc, update)
+        return _project(doc, projection) if return_document == ReturnDocument.AFTER else before
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True) -> BulkWriteResult:
+        result = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []}
+        for i, op in enumerate(requests):
+            kind = type(op).__name__
+            if kind == "InsertOne":
+                self._insert(op._doc)
+                result["nInserted"] += 1
+            elif kind in ("UpdateOne", "UpdateMany"):
+                outcome = self._update_docs(op._filter, op._doc, bool(op._upsert), many=kind == "UpdateMany")
+                if "upserted" in outcome:
+                    result["nUpserted"] += 1
+                    result["upserted"].append({"index": i, "_id": outcome["upserted"]})
+                else:
+                    result["nMatched"] += outcome["n"]
+                    result["nModified"] += outcome["nModified"]
+            elif kind in ("DeleteOne", "DeleteMany"):
+                result["nRemoved"] += self._delete_docs(op._filter, many=kind == "DeleteMany")
+            else:
+                raise OperationFailure(f"Unsupported bulk operation for the memory backend: {kind}")
+        return BulkWriteResult(result, True)
+
+    # --- non supporté ---
+    def aggregate(self, pipeline: List[Dict[str, Any]], **_):
+        raise OperationFailure("aggregate is not supported by the memory backend")
+
+    def watch(self, pipeline=None, **_):
+        raise OperationFailure("change streams are not supported by the memory backend")
+
+
+class MemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = MemoryCollection(self, name)
+        return collection
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def command(self, command, *args, **kwargs) -> Dict[str, Any]:
+        if command in ("hello", "ismaster", "isMaster"):
+            # standalone : pas de setName, donc pas de change streams
+            return {"isWritablePrimary": True, "ok": 1.0}
+        if command == "ping":
+            return {"ok": 1.0}
+        raise OperationFailure(f"Command {command} is not supported by the memory backend")
+
+    async def create_collection(self, name: str, **kwargs) -> MemoryCollection:
+        if kwargs.get("timeseries"):
+            raise OperationFailure("time-series collections are not supported by the memory backend")
+        return self[name]
+
+    async def list_collections(self, filter: Optional[Dict[str, Any]] = None) -> _ListCursor:
+        infos = [{"name": name, "type": "collection"} for name in self._collections]
+        return _ListCursor([info for info in infos if matches(info, filter or {})])
+
+    async def drop_collection(self, name: str):
+        self._collections.pop(name, None)
+
+
+class MemoryClient:
+    """Remplace AsyncIOMotorClient : une base par nom, tout en mémoire."""
+
+    def __init__(self):
+        self._databases: Dict[str, MemoryDatabase] = {}
+        self.admin = self["admin"]
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        database = self._databases.get(name)
+        if database is None:
+            database = self._databases[name] = MemoryDatabase(name)
+        return database
+
+    def close(self):
+        pass
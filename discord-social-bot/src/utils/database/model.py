@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Type, Union, get_args, get_origin
 from enum import Enum
 from pydantic import BaseModel, Field, ConfigDict
 from bson import ObjectId
@@ -43,6 +43,7 @@ class PostStatus(str, Enum):
     PUBLISHED = "published"
     FAILED = "failed"
     CANCELLED = "cancelled"
+    PROCESSING = "processing"  # réclamé par une instance du scheduler (bail en cours)
 
 
 
@@ -52,6 +53,7 @@ class PlatformTokens(BaseModel):
     refresh_token: Optional[str] = None  # encrypted
     expires_at: Optional[datetime] = None
     scope: Optional[str] = None
+    data_key: Optional[str] = None  # clé du compte chiffrée par la clé maître (mode enveloppe)
 
     model_config = ConfigDict(json_encoders={ObjectId: str})
 
@@ -98,6 +100,23 @@ class PublishedPost(BaseModel):
     media_urls: List[str] = []
     published_at: datetime = Field(default_factory=datetime.utcnow)
     error_message: Optional[str] = None
+    platform_post_id: Optional[str] = None  # id renvoyé par la plateforme
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+        json_encoders={ObjectId: str}
+    )
+
+class PostRef(BaseModel):
+    """Un id visible (id Discord ou id plateforme) -> le document du post qu'il désigne."""
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    ref: str
+    platform: PlatformType
+    collection: str  # "published_posts", "published_posts_archive" ou "scheduled_posts"
+    target_id: PyObjectId
+    platform_post_id: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
 
     model_config = ConfigDict(
         populate_by_name=True,
@@ -119,6 +138,9 @@ class ScheduledPost(BaseModel):
     error_message: Optional[str] = None
     attempts: int = 0
     max_attempts: int = 3
+    next_attempt_at: Optional[datetime] = None  # scheduled_time, puis repoussé par le backoff après un échec
+    claimed_by: Optional[str] = None  # instance du scheduler qui détient le bail
+    lease_expires_at: Optional[datetime] = None
 
     model_config = ConfigDict(
         populate_by_name=True,
@@ -193,6 +215,72 @@ class ReplyAction(BaseModel):
     )
 
 
+# ************************ Lecture rapide ************************
+
+_view_specs_cache: Dict[type, Dict[str, tuple]] = {}
+
+
+def _view_converter(annotation) -> Optional[Callable[[Any], Any]]:
+    if get_origin(annotation) is Union:
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        annotation = args[0] if len(args) == 1 else None
+    if isinstance(annotation, type):
+        if issubclass(annotation, Enum):
+            members = annotation._value2member_map_
+            return lambda value: members.get(value) or annotation(value)
+        if issubclass(annotation, BaseModel):
+            return lambda value: ModelView(annotation, value) if isinstance(value, dict) else value
+    return None
+
+
+def _view_specs(model_cls: type) -> Dict[str, tuple]:
+    specs = _view_specs_cache.get(model_cls)
+    if specs is None:
+        specs = {
+            name: (field.alias or name, _view_converter(field.annotation), field)
+            for name, field in model_cls.model_fields.items()
+        }
+        _view_specs_cache[model_cls] = specs
+    return specs
+
+
+class ModelView:
+    """Vue en lecture seule sur un document MongoDB de confiance (déjà validé à l'écriture).
+
+    Pas de validation ni de copie à la construction : les enums et sous-modèles sont
+    convertis à l'accès, les champs absents prennent leur valeur par défaut. Un champ
+    obligatoire exclu par une projection lève AttributeError. to_model() construit le
+    modèle pydantic complet.
+    """
+
+    __slots__ = ("_model", "_doc")
+
+    def __init__(self, model_cls: Type[BaseModel], doc: Dict[str, Any]):
+        object.__setattr__(self, "_model", model_cls)
+        object.__setattr__(self, "_doc", doc)
+
+    def __getattr__(self, name: str):
+        spec = _view_specs(self._model).get(name)
+        if spec is None:
+            raise AttributeError(f"{self._model.__name__} has no field {name!r}")
+        key, convert, field = spec
+        if key in self._doc:
+            value = self._doc[key]
+            return convert(value) if convert and value is not None else value
+        if field.is_required():
+            raise AttributeError(f"{self._model.__name__}.{name} was not loaded (projection)")
+        return field.get_default(call_default_factory=True)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"{self._model.__name__} view is read-only")
+
+    def to_model(self) -> BaseModel:
+        return self._model(**self._doc)
+
+    def __repr__(self) -> str:
+        return f"{self._model.__name__}View({self._doc!r})"
+
+
 """""
 from datetime import datetime
 from typing import Optional, List, Dict, Any
@@ -1,56 +1,288 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Optional, List, Dict, Any
-from datetime import datetime,timezone
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from typing import Optional, List, Dict, Any, AsyncIterator, Callable, Iterable, Set, Tuple, Type, Union
+from datetime import datetime,timezone,timedelta
+import asyncio
 import os
 from bson import ObjectId
 
 from .model import (
     User, SocialMediaAccount, ScheduledPost, PublishedPost,
-    CommandLog, ActivityLog, BotCommand, ReplyAction,
-    PlatformType, PostStatus
+    CommandLog, ActivityLog, BotCommand, ReplyAction, PostRef,
+    PlatformType, PostStatus, ModelView
+)
+from .encryption import EncryptionHandler, encryption_handler, map_in_pool_async
+from .result_sink import ResultSink
+from .log_writer import LogWriter
+from .indexes import ensure_indexes, verify_query_plans
+from .account_registry import AccountRegistry
+from .token_cache import TokenCache
+from .user_cache import UserCache
+from .retention import provision_log_collections, rollup_all_logs
+from .memory_backend import MemoryClient
+from .connection import ConnectionManager
+from .key_rotation import rotate_account_tokens
+from .envelope import EnvelopeEncryption, envelope_enabled
+from .archive import ARCHIVE_COLLECTION, archive_published_posts, expand_post
+from .stats import (
+    status_histogram_pipeline, posts_per_day_pipeline,
+    failure_rate_pipeline, publish_lateness_pipeline
 )
-from .encryption import encryption_handler
 
 
 class MongoDBHandler:
     def __init__(self):
-        self.client: Optional[AsyncIOMotorClient] = None
+        self.client: Optional[Union[AsyncIOMotorClient, MemoryClient]] = None
         self.db = None
+        # pool, sonde ping et disjoncteur ; créé par connect()
+        self.connection: Optional[ConnectionManager] = None
+        # callbacks (post_id, scheduled_time | None) appelés quand le planning change
+        self._schedule_listeners: List[Callable[[str, Optional[datetime]], None]] = []
+        self.change_streams_enabled = os.getenv("MONGODB_CHANGE_STREAMS", "1") == "1"
+        self._resume_tokens: Dict[str, Any] = {}
+        # pause avant de rouvrir un change stream interrompu
+        self.watch_retry_seconds = float(os.getenv("MONGODB_WATCH_RETRY_SECONDS", "5"))
+        # écritures de résultats du scheduler, regroupées en bulk_write
+        self.result_sink = ResultSink(self)
+        # command_logs / activity_logs écrits en tâche de fond, hors du chemin des commandes
+        self.log_writer = LogWriter(self)
+        # comptes sociaux actifs en mémoire (lookups par _id / plateforme / account_id)
+        self.account_registry = AccountRegistry()
+        self._accounts_lock = asyncio.Lock()
+        self._accounts_watch_task: Optional[asyncio.Task] = None
+        # tokens déchiffrés, par id de compte (jamais persistés)
+        self.token_cache = TokenCache()
+        # lit toujours les tokens "env1:" ; n'en écrit que si ENCRYPTION_ENVELOPE=1
+        self.envelope = EnvelopeEncryption(encryption_handler)
+        self.envelope_writes = envelope_enabled()
+        self._token_loads: Dict[str, asyncio.Task] = {}
+        # utilisateurs par discord_id : zéro aller-retour pour les commandes suivantes
+        self.user_cache = UserCache()
+        # compaction périodique des logs bruts en compteurs journaliers
+        self.rollup_interval = float(os.getenv("LOG_ROLLUP_INTERVAL_SECONDS", "3600"))
+        self._rollup_task: Optional[asyncio.Task] = None
+        # déplacement périodique des vieux posts publiés vers published_posts_archive
+        self.archive_interval = float(os.getenv("PUBLISHED_ARCHIVE_INTERVAL_SECONDS", "86400"))
+        self._archive_task: Optional[asyncio.Task] = None
+        # lectures en liste rendues en vues sans validation (documents écrits par ce handler) ;
+        # par défaut des modèles validés, les vues restant réservées aux lectures projetées
+        self.fast_reads = os.getenv("MONGODB_FAST_READS", "0") == "1"
 
     # ************************ Connection Mongo **************************
+    def _hydrate(self, model_cls: Type[Any], doc: Dict[str, Any], projected: bool = False) -> Union[Any, ModelView]:
+        """Modèle validé, ou vue si la lecture est projetée (document partiel) ou en mode fast_reads."""
+        return ModelView(model_cls, doc) if projected or self.fast_reads else model_cls(**doc)
+
+    @staticmethod
+    def _projection(fields: Optional[Iterable[str]]) -> Optional[Dict[str, int]]:
+        return {field: 1 for field in fields} if fields else None
+
+    # ************************ Pagination (keyset) ************************
+    @staticmethod
+    def encode_cursor(timestamp: datetime, doc_id: ObjectId) -> str:
+        return f"{timestamp.isoformat()}_{doc_id}"
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+        try:
+            timestamp, doc_id = cursor.rsplit("_", 1)
+            return datetime.fromisoformat(timestamp), ObjectId(doc_id)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid page cursor: {cursor}") from e
+
+    async def _iter_newest_first(
+        self, collection: str, query: Dict[str, Any], time_field: str,
+        model_cls: Type[Any], batch_size: int, fields: Optional[Iterable[str]],
+        after: Optional[str] = None, limit: int = 0
+    ) -> AsyncIterator[Any]:
+        """Parcourt `collection` du plus récent au plus ancien, trié sur (time_field, _id).
+
+        `after` est le curseur du dernier élément déjà vu : la reprise se fait par
+        comparaison sur la clé de tri (pas de skip), servie par l'index.
+        """
+        if after:
+            timestamp, doc_id = self.decode_cursor(after)
+            query = {"$and": [query, {"$or": [
+                {time_field: {"$lt": timestamp}},
+                {time_field: timestamp, "_id": {"$lt": doc_id}},
+            ]}]}
+        projection = self._projection(fields)
+        if projection:
+            projection[time_field] = 1
+        cursor = self.db[collection].find(query, projection).sort([(time_field, -1), ("_id", -1)])
+        cursor = cursor.batch_size(batch_size)
+        if limit:
+            cursor = cursor.limit(limit)
+        async for doc in cursor:
+            yield self._hydrate(model_cls, doc, projected=bool(fields))
+
+    async def _page(self, items: AsyncIterator[Any], limit: int, time_field: str) -> Tuple[List[Any], Optional[str]]:
+        page = [item async for item in items]
+        if len(page) <= limit:
+            return page, None
+        page = page[:limit]
+        last = page[-1]
+        return page, self.encode_cursor(getattr(last, time_field), last.id)
+
     async def connect(self):
-        mongo_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-        self.client = AsyncIOMotorClient(mongo_url)
+        if os.getenv("MONGODB_BACKEND", "mongo") == "memory":
+            # stockage en mémoire (benchmarks, tests sans mongod) : rien n'est persisté
+            self.connection = ConnectionManager(MemoryClient)
+            self.client = self.connection.create_client()
+        else:
+            mongo_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+            self.connection = ConnectionManager(AsyncIOMotorClient)
+            self.client = self.connection.create_client(mongo_url)
         self.db = self.client[os.getenv("MONGODB_DATABASE", "media_tracker")]
         await self._create_indexes()
+        await self._backfill_next_attempt_at()
+        await self._backfill_post_refs()
+        if await self.supports_change_streams():
+            self._accounts_watch_task = asyncio.get_running_loop().create_task(self._watch_social_accounts())
+        if self.rollup_interval > 0:
+            self._rollup_task = asyncio.get_running_loop().create_task(self._rollup_logs_periodically())
+        if self.archive_interval > 0:
+            self._archive_task = asyncio.get_running_loop().create_task(self._archive_periodically())
+        self.connection.start()
         print("Connected to MongoDB")
 
     async def close(self):
         if self.client:
-            self.client.close()
+            if self._accounts_watch_task:
+                self._accounts_watch_task.cancel()
+                self._accounts_watch_task = None
+            if self._rollup_task:
+                self._rollup_task.cancel()
+                self._rollup_task = None
+            if self._archive_task:
+                self._archive_task.cancel()
+                self._archive_task = None
+            try:
+                await self.connection.stop()
+                # un flush en échec ne doit pas empêcher de libérer le reste
+                try:
+                    await self.result_sink.close()
+                except Exception as e:
+                    # statuts non écrits : les baux expireront et le reaper remettra les posts en file
+                    print(f"ResultSink flush error on close: {e}")
+                try:
+                    await self.log_writer.close()
+                except Exception as e:
+                    print(f"LogWriter flush error on close: {e}")
+            finally:
+                self.client.close()
             print("MongoDB connection closed")
 
+    @property
+    def available(self) -> bool:
+        """Connecté et disjoncteur fermé (ou sonde possible). Lecture seule."""
+        return self.db is not None and self.connection is not None and self.connection.available
+
+    def allow_request(self) -> bool:
+        """Comme `available`, mais réserve la sonde si le disjoncteur est semi-ouvert :
+        l'appelant doit ensuite appeler record_success() ou record_error()."""
+        return self.db is not None and self.connection is not None and self.connection.allow()
+
+    def record_success(self):
+        if self.connection is not None:
+            self.connection.record_success()
+
+    def record_error(self, error: BaseException) -> bool:
+        """Signale une erreur au disjoncteur ; True si c'est une erreur de connexion."""
+        return self.connection is not None and self.connection.record_error(error)
+
+    async def _rollup_logs_periodically(self):
+        while True:
+            try:
+                await rollup_all_logs(self.db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Log rollup error: {e}")
+            await asyncio.sleep(self.rollup_interval)
+
+    async def _archive_periodically(self):
+        while True:
+            try:
+                moved = await archive_published_posts(self.db)
+                if moved:
+                    print(f"Archived {moved} published posts")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Published posts archival error: {e}")
+            await asyncio.sleep(self.archive_interval)
+
+    async def supports_change_streams(self) -> bool:
+        """Les change streams exigent un replica set ou un cluster shardé (pas un mongod standalone)."""
+        if not self.change_streams_enabled:
+            return False
+        try:
+            hello = await self.db.command("hello")
+        except Exception:
+            return False
+        return bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+
+    async def watch_collection(self, collection_name: str, on_change: Callable[[Dict[str, Any]], None], pipeline: Optional[List[Dict[str, Any]]] = None):
+        """Relaie les événements du change stream de la collection. Reprend après le dernier événement vu."""
+        options = {"full_document": "updateLookup"}
+        if collection_name in self._resume_tokens:
+            options["resume_after"] = self._resume_tokens[collection_name]
+        try:
+            async with self.db[collection_name].watch(pipeline or [], **options) as stream:
+                async for change in stream:
+                    self._resume_tokens[collection_name] = stream.resume_token
+                    on_change(change)
+        except OperationFailure:
+            # jeton sorti de l'oplog (ChangeStreamHistoryLost) ou invalide : reprendre dessus
+            # échouerait à chaque tentative. L'appelant resynchronise puis rouvre sans resume_after.
+            self._resume_tokens.pop(collection_name, None)
+            raise
+
     async def _create_indexes(self):
-        await self.db.users.create_index("discord_id", unique=True)
-        await self.db.social_accounts.create_index("platform")
-        await self.db.social_accounts.create_index("account_name")
-        await self.db.scheduled_posts.create_index("status")
-        await self.db.scheduled_posts.create_index("scheduled_time")
-        await self.db.activity_logs.create_index("discord_id")
-        await self.db.activity_logs.create_index("timestamp")
-        await self.db.bot_commands.create_index("name", unique=True)
-        await self.db.published_posts.create_index("platform")
-        await self.db.reply_actions.create_index("post_id")
-        await self.db.delete_actions.create_index("post_id")  # actions de suppression
+        # avant les index : une collection time-series doit être créée explicitement
+        await provision_log_collections(self.db)
+        # plan d'index par forme de requête : voir indexes.INDEX_PLAN
+        await ensure_indexes(self.db)
+        if os.getenv("MONGODB_VERIFY_INDEXES") == "1":
+            await self.verify_indexes()
+
+    async def verify_indexes(self) -> Dict[str, List[str]]:
+        """explain() des requêtes chaudes ; lève IndexPlanError si l'une fait un COLLSCAN ou un tri en mémoire."""
+        return await verify_query_plans(self.db)
+
+    async def _backfill_next_attempt_at(self):
+        # les posts créés avant l'introduction du backoff n'ont pas de next_attempt_at
+        await self.db.scheduled_posts.update_many(
+            {"status": PostStatus.SCHEDULED.value, "next_attempt_at": {"$exists": False}},
+            [{"$set": {"next_attempt_at": "$scheduled_time"}}]
+        )
 
     # ************************ Users ************************
     async def get_or_create_user(self, discord_id: str, discord_username: str) -> User:
-        user_dict = await self.db.users.find_one({"discord_id": discord_id})
-        if user_dict:
-            return User(**user_dict)
-        user = User(discord_id=discord_id, discord_username=discord_username)
-        result = await self.db.users.insert_one(user.model_dump(by_alias=True, exclude={"id"}))
-        user.id = result.inserted_id
+        """Un seul find_one_and_update(upsert) au premier contact, puis le cache."""
+        user = self.user_cache.get(discord_id)
+        if user and user.discord_username == discord_username:
+            return user
+
+        defaults = User(discord_id=discord_id, discord_username=discord_username)
+        update = {
+            "$set": {"discord_username": discord_username},
+            "$setOnInsert": defaults.model_dump(by_alias=True, exclude={"id", "discord_id", "discord_username"}),
+        }
+        try:
+            doc = await self.db.users.find_one_and_update(
+                {"discord_id": discord_id}, update,
+                upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # upsert concurrent pour le même utilisateur : le document existe maintenant
+            doc = await self.db.users.find_one_and_update(
+                {"discord_id": discord_id}, update, return_document=ReturnDocument.AFTER
+            )
+        user = User(**doc)
+        self.user_cache.put(user)
         return user
 
     # ************************ Social Accounts ************************
@@ -63,8 +295,9 @@ class MongoDBHandler:
         account_id: Optional[str] = None,
         expires_at: Optional[datetime] = None
     ) -> str:
-        encrypted_access = encryption_handler.encrypt_token(access_token)
-        encrypted_refresh = encryption_handler.encrypt_token(refresh_token) if refresh_token else None
+        data_key = self.envelope.new_data_key() if self.envelope_writes else None
+        encrypted_access = self._encrypt_token(access_token, data_key)
+        encrypted_refresh = self._encrypt_token(refresh_token, data_key) if refresh_token else None
 
         account = SocialMediaAccount(
             platform=platform,
@@ -74,77 +307,497 @@ class MongoDBHandler:
                 "access_token": encrypted_access,
                 "refresh_token": encrypted_refresh,
                 "expires_at": expires_at,
+                "data_key": data_key,
             }
         )
         result = await self.db.social_accounts.insert_one(account.model_dump(by_alias=True, exclude={"id"}))
+        self.account_registry.invalidate()
         return str(result.inserted_id)
 
+    async def deactivate_social_account(self, account_id: str) -> bool:
+        result = await self.db.social_accounts.update_one(
+            {"_id": ObjectId(account_id)},
+            {"$set": {"is_active": False}}
+        )
+        self.invalidate_account_caches(account_id)
+        return result.modified_count > 0
+
+    async def connect_social_account(
+        self,
+        platform: PlatformType,
+        account_id: str,
+        account_name: str,
+        access_token: str,
+        refresh_token: Optional[str] = None,
+        expires_at: Optional[datetime] = None
+    ) -> str:
+        """Connexion OAuth : met à jour les tokens du compte (même plateforme, même ID plateforme)
+        s'il existe déjà, sinon le crée. Renvoie l'_id du compte."""
+        doc = await self.db.social_accounts.find_one(
+            {"platform": PlatformType(platform).value, "account_id": account_id}, {"_id": 1}
+        )
+        if doc is None:
+            return await self.add_social_account(platform, account_name, access_token, refresh_token, account_id, expires_at)
+        await self.update_tokens(str(doc["_id"]), access_token, refresh_token, expires_at)
+        return str(doc["_id"])
+
+    async def update_tokens(
+        self,
+        account_id: str,
+        access_token: str,
+        refresh_token: Optional[str] = None,
+        expires_at: Optional[datetime] = None
+    ) -> bool:
+        """Enregistre des tokens rafraîchis (ou une reconnexion) pour un compte existant."""
+        query: Dict[str, Any] = {"_id": ObjectId(account_id)}
+        data_key = None
+        if self.envelope_writes:
+            doc = await self.db.social_accounts.find_one(query, {"tokens.data_key": 1})
+            data_key = ((doc or {}).get("tokens") or {}).get("data_key")
+            if data_key is None:
+                # première clé du compte : ne l'écrire que si aucun appel concurrent ne l'a fait
+                data_key = self.envelope.new_data_key()
+                query["tokens.data_key"] = None
+        update = {
+            "tokens.access_token": self._encrypt_token(access_token, data_key),
+            "tokens.expires_at": expires_at,
+            "last_refresh": datetime.now(timezone.utc),
+            "is_active": True,
+        }
+        if refresh_token:
+            update["tokens.refresh_token"] = self._encrypt_token(refresh_token, data_key)
+        if "tokens.data_key" in query:
+            update["tokens.data_key"] = data_key
+        result = await self.db.social_accounts.update_one(query, {"$set": update})
+        if "tokens.data_key" in query and result.matched_count == 0 and doc:
+            return await self.update_tokens(account_id, access_token, refresh_token, expires_at)
+        self.invalidate_account_caches(account_id)
+        return result.modified_count > 0
+
+    def invalidate_account_caches(self, account_id: Optional[str] = None):
+        """Vide le registre des comptes et les tokens en cache (d'un compte, ou de tous).
+        À appeler après toute écriture sur social_accounts faite hors de ce handler."""
+        self.account_registry.invalidate()
+        self.token_cache.invalidate(account_id)
+
+    def _on_social_account_change(self, change: Dict[str, Any]):
+        self.invalidate_account_caches(str(change["documentKey"]["_id"]))
+
+    async def _load_accounts(self):
+        if self.account_registry.loaded:
+            return
+        async with self._accounts_lock:
+            if self.account_registry.loaded:
+                return
+            generation = self.account_registry.generation
+            accounts = []
+            async for acc in self.db.social_accounts.find({"is_active": True}):
+                accounts.append(SocialMediaAccount(**acc))
+            self.account_registry.load(accounts, generation)
+
+    async def _watch_social_accounts(self):
+        """Invalide le registre à chaque écriture sur social_accounts (y compris depuis le serveur OAuth)."""
+        ttl = self.account_registry.ttl
+        while True:
+            try:
+                self.account_registry.ttl = 0  # pas d'expiration tant que le stream tourne
+                # resynchronisation complète : des écritures ont pu être manquées pendant la coupure
+                self.invalidate_account_caches()
+                await self.watch_collection("social_accounts", self._on_social_account_change)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"social_accounts change stream error: {e}")
+            self.account_registry.ttl = ttl
+            await asyncio.sleep(self.watch_retry_seconds)
+
     async def get_social_account(self, account_id: str) -> Optional[SocialMediaAccount]:
+        await self._load_accounts()
+        acc = self.account_registry.get(account_id)
+        if acc:
+            return acc
+        # comptes inactifs : pas dans le registre
         acc = await self.db.social_accounts.find_one({"_id": ObjectId(account_id)})
         return SocialMediaAccount(**acc) if acc else None
 
     async def get_all_social_accounts(self) -> List[SocialMediaAccount]:
-        accounts = []
-        async for acc in self.db.social_accounts.find({"is_active": True}):
-            accounts.append(SocialMediaAccount(**acc))
-        return accounts
+        await self._load_accounts()
+        return self.account_registry.all()
+
+    async def get_social_accounts_by_platform(self, platform: PlatformType) -> List[SocialMediaAccount]:
+        await self._load_accounts()
+        return self.account_registry.by_platform(platform)
+
+    async def find_social_account(
+        self, platform: Optional[PlatformType] = None, account_ref: Optional[str] = None
+    ) -> Optional[SocialMediaAccount]:
+        """Premier compte actif de la plateforme, ou celui dont l'_id / l'ID plateforme vaut account_ref."""
+        await self._load_accounts()
+        return self.account_registry.find(platform, account_ref)
 
     async def get_tokens(self, account_id: str) -> Optional[Dict[str, Any]]:
-        
+        tokens = self.token_cache.get(account_id)
+        if tokens:
+            return tokens
+        # un seul chargement par compte même si 200 posts le demandent en même temps
+        load = self._token_loads.get(account_id)
+        if load is None:
+            load = asyncio.ensure_future(self._load_tokens(account_id))
+            self._token_loads[account_id] = load
+            load.add_done_callback(lambda _: self._token_loads.pop(account_id, None))
+        tokens = await asyncio.shield(load)
+        return dict(tokens) if tokens else None
+
+    async def _load_tokens(self, account_id: str) -> Optional[Dict[str, Any]]:
+        generation = self.token_cache.generation
         account = await self.get_social_account(account_id)
         if not account:
             return None
-        return {
-            "access_token": encryption_handler.decrypt_token(account.tokens.access_token),
-            "refresh_token": encryption_handler.decrypt_token(account.tokens.refresh_token)
+        data_key = account.tokens.data_key
+        tokens = {
+            "access_token": self.envelope.decrypt(account.tokens.access_token, data_key),
+            "refresh_token": self.envelope.decrypt(account.tokens.refresh_token, data_key)
             if account.tokens.refresh_token else None,
             "expires_at": account.tokens.expires_at
         }
+        if tokens["access_token"]:
+            self.token_cache.put(account_id, tokens, generation)
+        return tokens
+
+    async def get_tokens_many(self, account_ids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Tokens de plusieurs comptes (crosspost, préchauffage) : les déchiffrements
+        manquants partent en un seul lot sur le pool de threads, hors de la boucle asyncio."""
+        result: Dict[str, Optional[Dict[str, Any]]] = {}
+        missing = []
+        for account_id in dict.fromkeys(account_ids):
+            tokens = self.token_cache.get(account_id)
+            if tokens:
+                result[account_id] = tokens
+            else:
+                missing.append(account_id)
+        if not missing:
+            return result
+        generation = self.token_cache.generation
+        accounts = [await self.get_social_account(account_id) for account_id in missing]
+        jobs = []
+        for account in accounts:
+            if account:
+                jobs.append((account.tokens.access_token, account.tokens.data_key))
+                jobs.append((account.tokens.refresh_token, account.tokens.data_key))
+        plain = iter(await map_in_pool_async(lambda job: self.envelope.decrypt(*job), jobs))
+        for account_id, account in zip(missing, accounts):
+            if not account:
+                result[account_id] = None
+                continue
+            tokens = {"access_token": next(plain), "refresh_token": next(plain), "expires_at": account.tokens.expires_at}
+            if tokens["access_token"]:
+                self.token_cache.put(account_id, tokens, generation)
+            result[account_id] = tokens
+        return result
+
+    def _encrypt_token(self, token: str, data_key: Optional[str]) -> str:
+        if data_key:
+            return self.envelope.encrypt(token, data_key)
+        return encryption_handler.encrypt_token(token)
+
+    async def rotate_encryption_key(
+        self, old: EncryptionHandler, new: Optional[EncryptionHandler] = None,
+        batch_size: int = 500, restart: bool = False
+    ) -> Dict[str, Any]:
+        """Rechiffre les tokens (ou seulement les clés de compte en mode enveloppe) puis vide les caches."""
+        result = await rotate_account_tokens(self.db, old, new or encryption_handler, batch_size=batch_size, restart=restart)
+        self.account_registry.invalidate()
+        self.token_cache.invalidate()
+        self.envelope.cache.clear()
+        return result
 
     # ************************ Scheduled Posts ************************
+    def add_schedule_listener(self, callback: Callable[[str, Optional[datetime]], None]):
+        self._schedule_listeners.append(callback)
+
+    def remove_schedule_listener(self, callback: Callable[[str, Optional[datetime]], None]):
+        if callback in self._schedule_listeners:
+            self._schedule_listeners.remove(callback)
+
+    def _notify_schedule(self, post_id: str, scheduled_time: Optional[datetime]):
+        """Prévient le scheduler qu'un post a été (re)planifié, ou retiré si scheduled_time est None."""
+        for callback in list(self._schedule_listeners):
+            try:
+                callback(post_id, scheduled_time)
+            except Exception as e:
+                print(f"Schedule listener error: {e}")
+
     async def create_scheduled_post(self, post: ScheduledPost) -> str:
+        if post.next_attempt_at is None:
+            post.next_attempt_at = post.scheduled_time
         result = await self.db.scheduled_posts.insert_one(post.model_dump(by_alias=True, exclude={"id"}))
-        return str(result.inserted_id)
+        post_id = str(result.inserted_id)
+        await self.add_post_refs("scheduled_posts", result.inserted_id, post.platform)
+        self._notify_schedule(post_id, post.next_attempt_at)
+        return post_id
 
-    async def get_pending_posts(self, before_time: datetime) -> List[ScheduledPost]:
+    async def cancel_scheduled_post(self, post_id: str) -> bool:
+        result = await self.db.scheduled_posts.update_one(
+            {"_id": ObjectId(post_id), "status": PostStatus.SCHEDULED.value},
+            {"$set": {"status": PostStatus.CANCELLED.value}}
+        )
+        if result.modified_count > 0:
+            self._notify_schedule(post_id, None)
+            return True
+        return False
+
+    async def watch_scheduled_posts(self, on_change: Callable[[str, Optional[datetime]], None]):
+        """Pousse les insertions / modifications / suppressions de scheduled_posts vers on_change(post_id, scheduled_time | None)."""
+        def relay(change: Dict[str, Any]):
+            post_id = str(change["documentKey"]["_id"])
+            doc = change.get("fullDocument")
+            if change["operationType"] == "delete" or not doc or doc.get("status") != PostStatus.SCHEDULED.value:
+                on_change(post_id, None)
+            else:
+                on_change(post_id, doc.get("next_attempt_at") or doc["scheduled_time"])
+
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+        await self.watch_collection("scheduled_posts", relay, pipeline)
+
+    async def get_schedule_entries(self) -> List[Tuple[str, datetime]]:
+        """(id, next_attempt_at) de tous les posts encore planifiés, sans charger leur contenu."""
         query = {
             "status": PostStatus.SCHEDULED.value,
-            "scheduled_time": {"$lte": before_time},
+            "attempts": {"$lt": 3},
+        }
+        entries = []
+        async for doc in self.db.scheduled_posts.find(query, {"next_attempt_at": 1}):
+            entries.append((str(doc["_id"]), doc["next_attempt_at"]))
+        return entries
+
+    async def get_pending_posts(
+        self, before_time: datetime, fields: Optional[Iterable[str]] = None
+    ) -> List[Union[ScheduledPost, ModelView]]:
+        query = {
+            "status": PostStatus.SCHEDULED.value,
+            "next_attempt_at": {"$lte": before_time},
             "attempts": {"$lt": 3},
         }
         posts = []
-        async for post in self.db.scheduled_posts.find(query).sort("scheduled_time", 1):
-            posts.append(ScheduledPost(**post))
+        async for post in self.db.scheduled_posts.find(query, self._projection(fields)).sort("next_attempt_at", 1):
+            posts.append(self._hydrate(ScheduledPost, post, projected=bool(fields)))
         return posts
 
-    async def update_post_status(
+    async def claim_pending_posts(
+        self, before_time: datetime, owner: str,
+        lease_seconds: int = 300, limit: int = 50
+    ) -> List[ScheduledPost]:
+        """Réclame jusqu'à `limit` posts dus : chaque post n'est rendu qu'à une seule instance.
+
+        Trois allers-retours quelle que soit la taille du lot : lecture des candidats,
+        update_many conditionnel (un post déjà pris par une autre instance n'est plus
+        SCHEDULED et n'est donc pas modifié), relecture des posts effectivement obtenus.
+        """
+        if limit <= 0:
+            return []
+        query = {
+            "status": PostStatus.SCHEDULED.value,
+            "next_attempt_at": {"$lte": before_time},
+            "attempts": {"$lt": 3},
+        }
+        candidates = await self.db.scheduled_posts.find(query, {"_id": 1}).sort("next_attempt_at", 1).limit(limit).to_list(None)
+        if not candidates:
+            return []
+        ids = [doc["_id"] for doc in candidates]
+        claim_id = ObjectId()  # identifie ce lot pour la relecture
+        await self.db.scheduled_posts.update_many(
+            {**query, "_id": {"$in": ids}},
+            {"$set": {
+                "status": PostStatus.PROCESSING.value,
+                "claimed_by": owner,
+                "claim_id": claim_id,
+                "lease_expires_at": datetime.now(timezone.utc) + timedelta(seconds=lease_seconds),
+            }}
+        )
+        docs = await self.db.scheduled_posts.find(
+            {"_id": {"$in": ids}, "claim_id": claim_id}
+        ).sort("next_attempt_at", 1).to_list(None)
+        return [ScheduledPost(**doc) for doc in docs]
+
+    async def renew_leases(self, post_ids: Iterable[str], owner: str, lease_seconds: int = 300) -> Set[str]:
+        """Prolonge les baux encore détenus par `owner` ; renvoie les ids dont le bail a été perdu."""
+        post_ids = set(post_ids)
+        if not post_ids:
+            return set()
+        query = {
+            "_id": {"$in": [ObjectId(post_id) for post_id in post_ids]},
+            "claimed_by": owner,
+            "status": PostStatus.PROCESSING.value,
+        }
+        await self.db.scheduled_posts.update_many(
+            query, {"$set": {"lease_expires_at": datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)}}
+        )
+        owned = {str(doc["_id"]) async for doc in self.db.scheduled_posts.find(query, {"_id": 1})}
+        return post_ids - owned
+
+    async def confirm_lease(self, post_id: str, owner: str, lease_seconds: int = 300) -> bool:
+        """Juste avant l'appel plateforme : vrai si `owner` détient toujours un bail non expiré
+        (prolongé pour couvrir la publication). Faux : le post a été repris, ne pas publier."""
+        now = datetime.now(timezone.utc)
+        result = await self.db.scheduled_posts.update_one(
+            {
+                "_id": ObjectId(post_id),
+                "claimed_by": owner,
+                "status": PostStatus.PROCESSING.value,
+                "lease_expires_at": {"$gt": now},
+            },
+            {"$set": {"lease_expires_at": now + timedelta(seconds=lease_seconds)}}
+        )
+        return result.matched_count == 1
+
+    async def release_expired_leases(self, now: Optional[datetime] = None) -> int:
+        """Remet en file les posts dont le bail a expiré (instance plantée ou bloquée)
+        et les repousse dans la file des échéances du scheduler."""
+        query = {
+            "status": PostStatus.PROCESSING.value,
+            "lease_expires_at": {"$lt": now or datetime.now(timezone.utc)},
+        }
+        expired = [
+            (doc["_id"], doc.get("next_attempt_at"))
+            async for doc in self.db.scheduled_posts.find(query, {"next_attempt_at": 1})
+        ]
+        if not expired:
+            return 0
+        result = await self.db.scheduled_posts.update_many(
+            {**query, "_id": {"$in": [post_id for post_id, _ in expired]}},
+            {
+                "$set": {"status": PostStatus.SCHEDULED.value},
+                "$unset": {"claimed_by": "", "claim_id": "", "lease_expires_at": ""},
+            }
+        )
+        # un post conclu entre-temps par son instance ne sera simplement pas réclamé
+        for post_id, next_attempt_at in expired:
+            self._notify_schedule(str(post_id), next_attempt_at)
+        return result.modified_count
+
+    def _retry_update(
+        self, post_id: str, next_attempt_at: datetime,
+        error_message: Optional[str], claimed_by: Optional[str]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        query = {"_id": ObjectId(post_id)}
+        if claimed_by:
+            query["claimed_by"] = claimed_by
+        update = {
+            "$set": {
+                "status": PostStatus.SCHEDULED.value,
+                "next_attempt_at": next_attempt_at,
+                "error_message": error_message,
+            },
+            "$inc": {"attempts": 1},
+            "$unset": {"claimed_by": "", "claim_id": "", "lease_expires_at": ""},
+        }
+        return query, update
+
+    def _status_update(
         self, post_id: str, status: PostStatus,
-        error_message: Optional[str] = None
-    ) -> bool:
+        error_message: Optional[str], claimed_by: Optional[str]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         update_data = {"status": status.value}
         if error_message:
             update_data["error_message"] = error_message
         if status == PostStatus.PUBLISHED:
             update_data["published_at"] = datetime.now(timezone.utc)
-        result = await self.db.scheduled_posts.update_one(
-            {"_id": ObjectId(post_id)},
-            {"$set": update_data, "$inc": {"attempts": 1}}
-        )
+        query = {"_id": ObjectId(post_id)}
+        if claimed_by:
+            # seule l'instance qui détient encore le bail peut conclure
+            query["claimed_by"] = claimed_by
+        update = {
+            "$set": update_data,
+            "$inc": {"attempts": 1},
+            "$unset": {"claimed_by": "", "claim_id": "", "lease_expires_at": ""},
+        }
+        return query, update
+
+    async def schedule_retry(
+        self, post_id: str, next_attempt_at: datetime,
+        error_message: Optional[str] = None,
+        claimed_by: Optional[str] = None
+    ) -> bool:
+        """Compte l'échec et replanifie le post à next_attempt_at (backoff)."""
+        query, update = self._retry_update(post_id, next_attempt_at, error_message, claimed_by)
+        result = await self.db.scheduled_posts.update_one(query, update)
+        if result.modified_count > 0:
+            self._notify_schedule(post_id, next_attempt_at)
+            return True
+        return False
+
+    async def update_post_status(
+        self, post_id: str, status: PostStatus,
+        error_message: Optional[str] = None,
+        claimed_by: Optional[str] = None
+    ) -> bool:
+        query, update = self._status_update(post_id, status, error_message, claimed_by)
+        result = await self.db.scheduled_posts.update_one(query, update)
         return result.modified_count > 0
 
+    # Variantes tamponnées (scheduler) : écrites par lots via self.result_sink
+    def record_retry(
+        self, post_id: str, next_attempt_at: datetime,
+        error_message: Optional[str] = None,
+        claimed_by: Optional[str] = None
+    ):
+        self.result_sink.add_status(*self._retry_update(post_id, next_attempt_at, error_message, claimed_by))
+        self._notify_schedule(post_id, next_attempt_at)
+
+    def record_post_status(
+        self, post_id: str, status: PostStatus,
+        error_message: Optional[str] = None,
+        claimed_by: Optional[str] = None
+    ):
+        self.result_sink.add_status(*self._status_update(post_id, status, error_message, claimed_by))
+
     # ************************ Published Posts ************************
     async def create_published_post(self, post: PublishedPost) -> str:
         """Ajoute un post déjà publié."""
         result = await self.db.published_posts.insert_one(post.model_dump(by_alias=True, exclude={"id"}))
+        await self.add_post_refs("published_posts", result.inserted_id, post.platform, post.platform_post_id)
         return str(result.inserted_id)
 
-    async def get_published_posts(self, platform: Optional[PlatformType] = None) -> List[PublishedPost]:
-        """Récupère les posts publiés (optionnellement filtrés par plateforme)."""
+    async def get_published_posts(
+        self, platform: Optional[PlatformType] = None, fields: Optional[Iterable[str]] = None
+    ) -> List[Union[PublishedPost, ModelView]]:
+        """Récupère tous les posts publiés (optionnellement filtrés par plateforme).
+
+        `fields` limite les champs lus (projection MongoDB) ; _id est toujours renvoyé.
+        Pour les gros volumes, préférer iter_published_posts ou get_published_posts_page.
+        """
+        return [p async for p in self.iter_published_posts(platform, fields=fields)]
+
+    async def get_published_post(self, post_id: str) -> Optional[PublishedPost]:
+        """Un post publié par _id ; cherche dans l'archive s'il n'est plus dans published_posts."""
+        doc = await self.db.published_posts.find_one({"_id": ObjectId(post_id)})
+        if doc:
+            return PublishedPost(**doc)
+        doc = await self.db[ARCHIVE_COLLECTION].find_one({"_id": ObjectId(post_id)})
+        return PublishedPost(**expand_post(doc)) if doc else None
+
+    def iter_published_posts(
+        self, platform: Optional[PlatformType] = None, batch_size: int = 100,
+        fields: Optional[Iterable[str]] = None, after: Optional[str] = None
+    ) -> AsyncIterator[Union[PublishedPost, ModelView]]:
+        """Itérateur asynchrone sur les posts publiés, lus par lots de `batch_size`."""
         query = {"platform": platform.value} if platform else {}
-        posts = []
-        async for p in self.db.published_posts.find(query).sort("published_at", -1):
-            posts.append(PublishedPost(**p))
-        return posts
+        return self._iter_newest_first("published_posts", query, "published_at", PublishedPost, batch_size, fields, after)
+
+    async def get_published_posts_page(
+        self, platform: Optional[PlatformType] = None, limit: int = 20,
+        after: Optional[str] = None, fields: Optional[Iterable[str]] = None,
+        since: Optional[datetime] = None
+    ) -> Tuple[List[Union[PublishedPost, ModelView]], Optional[str]]:
+        """Une page de posts publiés (depuis `since` si fourni) et le curseur de la page
+        suivante (None si c'est la dernière)."""
+        query = {"platform": platform.value} if platform else {}
+        if since:
+            query["published_at"] = {"$gte": since}
+        items = self._iter_newest_first(
+            "published_posts", query, "published_at", PublishedPost, limit + 1, fields, after, limit + 1
+        )
+        return await self._page(items, limit, "published_at")
 
     # ************************ Bot Commands ************************
     async def add_bot_command(self, name: str, description: str, args: Optional[List[str]] = None, category: Optional[str] = None) -> str:
@@ -156,10 +809,10 @@ class MongoDBHandler:
         cmd = await self.db.bot_commands.find_one({"name": name})
         return BotCommand(**cmd) if cmd else None
 
-    async def get_all_bot_commands(self) -> List[BotCommand]:
+    async def get_all_bot_commands(self, fields: Optional[Iterable[str]] = None) -> List[Union[BotCommand, ModelView]]:
         commands = []
-        async for c in self.db.bot_commands.find().sort("created_at", 1):
-            commands.append(BotCommand(**c))
+        async for c in self.db.bot_commands.find({}, self._projection(fields)).sort("created_at", 1):
+            commands.append(self._hydrate(BotCommand, c, projected=bool(fields)))
         return commands
 
     # ************************ Reply Actions ************************
@@ -177,47 +830,146 @@ class MongoDBHandler:
         result = await self.db.reply_actions.insert_one(action.model_dump(by_alias=True, exclude={"id"}))
         return str(result.inserted_id)
 
-    async def get_replies_by_post(self, post_id: str) -> List[ReplyAction]:
-        replies = []
-        async for r in self.db.reply_actions.find({"post_id": post_id}).sort("executed_at", -1):
-            replies.append(ReplyAction(**r))
-        return replies
+    async def get_replies_by_post(self, post_id: str, fields: Optional[Iterable[str]] = None) -> List[Union[ReplyAction, ModelView]]:
+        return [r async for r in self.iter_replies_by_post(post_id, fields=fields)]
+
+    def iter_replies_by_post(
+        self, post_id: str, batch_size: int = 100,
+        fields: Optional[Iterable[str]] = None, after: Optional[str] = None
+    ) -> AsyncIterator[Union[ReplyAction, ModelView]]:
+        return self._iter_newest_first("reply_actions", {"post_id": post_id}, "executed_at", ReplyAction, batch_size, fields, after)
+
+    async def get_replies_page(
+        self, post_id: str, limit: int = 20,
+        after: Optional[str] = None, fields: Optional[Iterable[str]] = None
+    ) -> Tuple[List[Union[ReplyAction, ModelView]], Optional[str]]:
+        items = self._iter_newest_first(
+            "reply_actions", {"post_id": post_id}, "executed_at", ReplyAction, limit + 1, fields, after, limit + 1
+        )
+        return await self._page(items, limit, "executed_at")
+
+    # ************************ Références de posts ************************
+    async def add_post_refs(
+        self, collection: str, target_id: ObjectId,
+        platform: PlatformType, platform_post_id: Optional[str] = None
+    ):
+        """Enregistre l'id Discord du post (et son id plateforme s'il est connu) dans post_refs."""
+        platform = PlatformType(platform).value
+        doc = {
+            "platform": platform,
+            "collection": collection,
+            "target_id": target_id,
+        }
+        if platform_post_id:
+            doc["platform_post_id"] = platform_post_id
+        ops = [
+            UpdateOne(
+                {"ref": ref, "platform": platform},
+                {"$set": doc, "$setOnInsert": {"created_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+            for ref in filter(None, (str(target_id), platform_post_id))
+        ]
+        await self.db.post_refs.bulk_write(ops, ordered=False)
+
+    async def resolve_post_ref(self, ref: str, platform: Optional[PlatformType] = None) -> Optional[PostRef]:
+        """Résout un id Discord ou plateforme en (collection, _id) : une seule requête indexée."""
+        query: Dict[str, Any] = {"ref": ref}
+        if platform:
+            query["platform"] = PlatformType(platform).value
+        doc = await self.db.post_refs.find_one(query)
+        return PostRef(**doc) if doc else None
+
+    async def find_post(self, ref: str, platform: Optional[PlatformType] = None) -> Optional[Union[PublishedPost, ScheduledPost]]:
+        post_ref = await self.resolve_post_ref(ref, platform)
+        if not post_ref:
+            return None
+        doc = await self.db[post_ref.collection].find_one({"_id": post_ref.target_id})
+        if not doc:
+            return None
+        if post_ref.collection == ARCHIVE_COLLECTION:
+            return PublishedPost(**expand_post(doc))
+        return PublishedPost(**doc) if post_ref.collection == "published_posts" else ScheduledPost(**doc)
+
+    async def _backfill_post_refs(self, batch_size: int = 1000):
+        # posts créés avant post_refs : on ne le fait qu'une fois, tant que la collection est vide
+        if await self.db.post_refs.estimated_document_count() > 0:
+            return
+        for collection in ("published_posts", "scheduled_posts"):
+            ops = []
+            async for doc in self.db[collection].find({}, {"platform": 1, "platform_post_id": 1}):
+                doc_ops = [
+                    UpdateOne(
+                        {"ref": ref, "platform": doc["platform"]},
+                        {"$setOnInsert": {
+                            "collection": collection,
+                            "target_id": doc["_id"],
+                            "platform_post_id": doc.get("platform_post_id"),
+                            "created_at": datetime.now(timezone.utc),
+                        }},
+                        upsert=True
+                    )
+                    for ref in filter(None, (str(doc["_id"]), doc.get("platform_post_id")))
+                ]
+                ops.extend(doc_ops)
+                if len(ops) >= batch_size:
+                    await self.db.post_refs.bulk_write(ops, ordered=False)
+                    ops = []
+            if ops:
+                await self.db.post_refs.bulk_write(ops, ordered=False)
 
- # ************************ Delete (suppression) ************************
+    # ************************ Delete (suppression) ************************
     async def delete_post(self, post_id: str, deleted_by_discord_id: str, platform: Optional[PlatformType] = None) -> Dict[str, Any]:
-    # 1) tenter suppression dans published_posts
-        query_pub = {"_id": ObjectId(post_id)} if ObjectId.is_valid(post_id) else {"post_id": post_id}
-        deleted = False
-        location = None
-        error = None
+        """Supprime le post désigné par un id Discord ou plateforme (résolu via post_refs)."""
+        post_ref = await self.resolve_post_ref(post_id, platform)
+        if not post_ref:
+            return {"deleted": False, "location": None, "error": f"Unknown post id: {post_id}"}
 
-        try:
-               res = await self.db.published_posts.delete_one(query_pub)
-               if res.deleted_count > 0:
-                   deleted = True
-                   location = "published"
-        except Exception as e:
-               error = str(e)
-
-    # 2) si pas supprimé, tenter dans scheduled_posts
-        if not deleted:
-           try:
-               res2 = await self.db.scheduled_posts.delete_one({"_id": ObjectId(post_id)})
-               if res2.deleted_count > 0:
-                deleted = True
-                location = "scheduled"
-           except Exception:
-            try:
-                res3 = await self.db.scheduled_posts.delete_one({"_id": post_id})  # fallback string id
-                if res3.deleted_count > 0:
-                    deleted = True
-                    location = "scheduled"
-            except Exception as e:
-                error = str(e)
+        res = await self.db[post_ref.collection].delete_one({"_id": post_ref.target_id})
+        await self.db.post_refs.delete_many({"target_id": post_ref.target_id})
+        deleted = res.deleted_count > 0
+        location = {
+            "published_posts": "published",
+            ARCHIVE_COLLECTION: "archived",
+        }.get(post_ref.collection, "scheduled")
+        if deleted and location == "scheduled":
+            self._notify_schedule(str(post_ref.target_id), None)
+        return {"deleted": deleted, "location": location if deleted else None, "error": None}
+
+
+    # ************************ Statistiques ************************
+    async def _aggregate(self, collection: str, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await self.db[collection].aggregate(pipeline).to_list(None)
 
- 
-        return {"deleted": deleted, "location": location, "error": error}
+    async def get_status_histogram(
+        self, platform: Optional[PlatformType] = None,
+        account_id: Optional[str] = None, since: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """Nombre de posts par statut (programmés et publiés directement)."""
+        pipeline = status_histogram_pipeline(platform.value if platform else None, account_id, since)
+        return {row["_id"]: row["count"] for row in await self._aggregate("scheduled_posts", pipeline)}
 
+    async def get_posts_per_day(
+        self, platform: Optional[PlatformType] = None,
+        account_id: Optional[str] = None, since: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """[{day, social_account_id, count}], du jour le plus récent au plus ancien."""
+        pipeline = posts_per_day_pipeline(platform.value if platform else None, account_id, since)
+        return [{**row["_id"], "count": row["count"]} for row in await self._aggregate("scheduled_posts", pipeline)]
+
+    async def get_failure_rates(self, since: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        """{plateforme: {total, failed, failure_rate}}"""
+        rows = await self._aggregate("scheduled_posts", failure_rate_pipeline(since))
+        return {row.pop("_id"): row for row in rows}
+
+    async def get_publish_lateness(self, since: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        """{plateforme: {count, median_seconds}} pour les posts programmés déjà publiés."""
+        try:
+            rows = await self._aggregate("scheduled_posts", publish_lateness_pipeline(since))
+        except OperationFailure:
+            # $median indisponible (MongoDB < 7.0)
+            rows = await self._aggregate("scheduled_posts", publish_lateness_pipeline(since, exact=True))
+        return {row.pop("_id"): row for row in rows}
 
     # ************************ Logs ************************
     async def log_command(
@@ -235,7 +987,7 @@ class MongoDBHandler:
             success=success,
             error_message=error_message
         )
-        await self.db.command_logs.insert_one(log.model_dump(by_alias=True, exclude={"id"}))
+        await self.log_writer.write("command_logs", log.model_dump(by_alias=True, exclude={"id"}))
 
     async def log_activity(
         self,
@@ -250,7 +1002,7 @@ class MongoDBHandler:
             social_account_id=social_account_id,
             details=details or {}
         )
-        await self.db.activity_logs.insert_one(log.model_dump(by_alias=True, exclude={"id"}))
+        await self.log_writer.write("activity_logs", log.model_dump(by_alias=True, exclude={"id"}))
 
 
 db_handler = MongoDBHandler()
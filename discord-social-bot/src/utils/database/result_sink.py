@@ -0,0 +1,83 @@
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+
+class ResultSink:
+    """Tampon des changements de statut produits par le scheduler.
+
+    Les opérations sont regroupées puis envoyées en un seul bulk_write non ordonné
+    dès que `batch_size` est atteint ou toutes les `flush_interval` secondes.
+    Les logs d'activité passent par le LogWriter.
+    """
+
+    def __init__(self, handler, batch_size: Optional[int] = None, flush_interval: Optional[float] = None):
+        self._handler = handler
+        self.batch_size = batch_size or int(os.getenv("RESULT_SINK_BATCH_SIZE", "500"))
+        self.flush_interval = flush_interval or float(os.getenv("RESULT_SINK_FLUSH_SECONDS", "1.0"))
+        self._status_ops: List[UpdateOne] = []
+        self._lock = asyncio.Lock()
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.operations_written = 0
+
+    def __len__(self) -> int:
+        return len(self._status_ops)
+
+    def add_status(self, query: Dict[str, Any], update: Dict[str, Any]):
+        self._status_ops.append(UpdateOne(query, update))
+        self._after_add()
+
+    def _after_add(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        if len(self) >= self.batch_size:
+            self._full.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"ResultSink flush error: {e}")
+
+    async def flush(self):
+        async with self._lock:
+            status_ops, self._status_ops = self._status_ops, []
+            if not status_ops:
+                return
+            try:
+                await self._handler.db.scheduled_posts.bulk_write(status_ops, ordered=False)
+                self._handler.record_success()
+            except BulkWriteError as e:
+                # échecs partiels : les autres opérations du lot sont passées
+                self._handler.record_success()
+                print(f"ResultSink status write errors: {e.details.get('writeErrors', [])[:3]}")
+            except Exception as e:
+                # lot non écrit : on le remet en tête du tampon. Les mises à jour de statut
+                # filtrent sur claimed_by, les rejouer est donc sans effet de bord.
+                self._status_ops[:0] = status_ops
+                self._handler.record_error(e)
+                raise
+            self.flushes += 1
+            self.operations_written += len(status_ops)
+
+    async def close(self):
+        """Arrête la tâche de fond et écrit tout ce qui reste en tampon."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
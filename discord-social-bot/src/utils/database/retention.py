@@ -0,0 +1,125 @@
+"""Rétention des logs : collections time-series (ou index TTL) et agrégats journaliers."""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+
+# collection brute -> (variable d'env de rétention, rétention par défaut en jours, collection d'agrégats)
+LOG_COLLECTIONS: Dict[str, Dict[str, Any]] = {
+    "activity_logs": {
+        "retention_env": "ACTIVITY_LOG_RETENTION_DAYS",
+        "retention_days": 90,
+        "rollup": "activity_stats_daily",
+    },
+    "command_logs": {
+        "retention_env": "COMMAND_LOG_RETENTION_DAYS",
+        "retention_days": 30,
+        "rollup": "command_stats_daily",
+    },
+}
+
+
+def retention_seconds(collection: str) -> int:
+    config = LOG_COLLECTIONS[collection]
+    days = float(os.getenv(config["retention_env"], config["retention_days"]))
+    return int(days * 86400)
+
+
+async def _collection_type(db, name: str) -> Optional[str]:
+    async for info in await db.list_collections(filter={"name": name}):
+        return info.get("type", "collection")
+    return None
+
+
+async def provision_log_collection(db, name: str, storage: Optional[str] = None) -> str:
+    """Crée la collection en time-series si possible, sinon pose un index TTL sur timestamp.
+
+    Renvoie le mode effectivement utilisé ("timeseries" ou "ttl"). Une collection
+    existante n'est jamais convertie : seule sa durée de rétention est mise à jour.
+    """
+    storage = storage or os.getenv("LOG_STORAGE", "timeseries")
+    expire = retention_seconds(name)
+    kind = await _collection_type(db, name)
+
+    if kind is None and storage == "timeseries":
+        try:
+            await db.create_collection(
+                name,
+                timeseries={"timeField": "timestamp", "metaField": "discord_id", "granularity": "minutes"},
+                expireAfterSeconds=expire
+            )
+            return "timeseries"
+        except (CollectionInvalid, OperationFailure) as e:
+            # serveur < 5.0, ou collection créée entre-temps
+            print(f"Time-series collection {name} not created, falling back to TTL index: {e}")
+            kind = await _collection_type(db, name)
+
+    if kind == "timeseries":
+        await db.command("collMod", name, expireAfterSeconds=expire)
+        return "timeseries"
+
+    try:
+        await db[name].create_index("timestamp", expireAfterSeconds=expire)
+    except OperationFailure:
+        # index timestamp déjà présent (sans TTL ou avec une autre durée) : on le modifie
+        await db.command("collMod", name, index={"keyPattern": {"timestamp": 1}, "expireAfterSeconds": expire})
+    return "ttl"
+
+
+async def provision_log_collections(db, storage: Optional[str] = None) -> Dict[str, str]:
+    modes = {}
+    for name in LOG_COLLECTIONS:
+        try:
+            modes[name] = await provision_log_collection(db, name, storage)
+        except OperationFailure as e:
+            print(f"Retention for {name} not configured: {e}")
+    return modes
+
+
+async def rollup_logs(db, name: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Compacte les jours complets pas encore agrégés en compteurs par jour, utilisateur et commande.
+
+    Chaque jour n'est agrégé qu'une fois (point de reprise dans log_rollup_state), avant
+    que le TTL ne supprime les événements bruts.
+    """
+    now = now or datetime.now(timezone.utc)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    state = await db.log_rollup_state.find_one({"_id": name})
+    match: Dict[str, Any] = {"timestamp": {"$lt": today}}
+    if state:
+        match["timestamp"]["$gte"] = state["rolled_up_to"]
+
+    group: Dict[str, Any] = {
+        "_id": {
+            "day": {"$dateTrunc": {"date": "$timestamp", "unit": "day"}},
+            "discord_id": "$discord_id",
+            "bot_command_id": "$bot_command_id",
+        },
+        "count": {"$sum": 1},
+    }
+    if name == "command_logs":
+        group["failures"] = {"$sum": {"$cond": ["$success", 0, 1]}}
+
+    pipeline = [
+        {"$match": match},
+        {"$group": group},
+        {"$merge": {"into": LOG_COLLECTIONS[name]["rollup"], "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+    async for _ in db[name].aggregate(pipeline):
+        pass
+    await db.log_rollup_state.update_one(
+        {"_id": name},
+        {"$set": {"rolled_up_to": today, "updated_at": now}},
+        upsert=True
+    )
+    return today
+
+
+async def rollup_all_logs(db, now: Optional[datetime] = None):
+    for name in LOG_COLLECTIONS:
+        try:
+            await rollup_logs(db, name, now)
+        except OperationFailure as e:
+            print(f"Rollup of {name} failed: {e}")
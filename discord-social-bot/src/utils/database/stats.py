@@ -0,0 +1,120 @@
+"""Pipelines d'agrégation des statistiques de publication (calculées côté serveur).
+
+Les posts publiés viennent de deux collections : scheduled_posts (statut PUBLISHED)
+et published_posts (publications immédiates). Les pipelines partent de
+scheduled_posts et ajoutent published_posts par $unionWith (MongoDB >= 4.4).
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .model import PostStatus
+
+
+def _match(
+    since: Optional[datetime], time_field: str,
+    platform: Optional[str] = None, account_id: Optional[str] = None
+) -> Dict[str, Any]:
+    match: Dict[str, Any] = {}
+    if since:
+        match[time_field] = {"$gte": since}
+    if platform:
+        match["platform"] = platform
+    if account_id:
+        match["social_account_id"] = account_id
+    return match
+
+
+def _published_posts(match: Dict[str, Any], project: Dict[str, Any]) -> Dict[str, Any]:
+    return {"$unionWith": {"coll": "published_posts", "pipeline": [{"$match": match}, {"$project": project}]}}
+
+
+def status_histogram_pipeline(
+    platform: Optional[str] = None, account_id: Optional[str] = None,
+    since: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """Nombre de posts par statut ({_id: statut, count})."""
+    return [
+        {"$match": _match(since, "scheduled_time", platform, account_id)},
+        {"$project": {"status": 1}},
+        _published_posts(
+            _match(since, "published_at", platform, account_id),
+            {"status": {"$literal": PostStatus.PUBLISHED.value}}
+        ),
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+    ]
+
+
+def posts_per_day_pipeline(
+    platform: Optional[str] = None, account_id: Optional[str] = None,
+    since: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """Posts publiés par jour et par compte ({_id: {day, social_account_id}, count})."""
+    match = _match(since, "published_at", platform, account_id)
+    project = {"published_at": 1, "social_account_id": 1}
+    return [
+        {"$match": {**match, "status": PostStatus.PUBLISHED.value}},
+        {"$project": project},
+        _published_posts(match, project),
+        {"$group": {
+            "_id": {
+                "day": {"$dateTrunc": {"date": "$published_at", "unit": "day"}},
+                "social_account_id": "$social_account_id",
+            },
+            "count": {"$sum": 1},
+        }},
+        {"$sort": {"_id.day": -1, "count": -1}},
+    ]
+
+
+def failure_rate_pipeline(since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Taux d'échec par plateforme, sur les posts arrivés à un état final."""
+    match = _match(since, "scheduled_time")
+    match["status"] = {"$in": [PostStatus.PUBLISHED.value, PostStatus.FAILED.value]}
+    return [
+        {"$match": match},
+        {"$project": {"platform": 1, "failed": {"$eq": ["$status", PostStatus.FAILED.value]}}},
+        _published_posts(
+            _match(since, "published_at"),
+            {"platform": 1, "failed": {"$gt": ["$error_message", None]}}
+        ),
+        {"$group": {
+            "_id": "$platform",
+            "total": {"$sum": 1},
+            "failed": {"$sum": {"$cond": ["$failed", 1, 0]}},
+        }},
+        {"$project": {"total": 1, "failed": 1, "failure_rate": {"$divide": ["$failed", "$total"]}}},
+    ]
+
+
+def publish_lateness_pipeline(since: Optional[datetime] = None, exact: bool = False) -> List[Dict[str, Any]]:
+    """Retard médian de publication (published_at - scheduled_time) par plateforme, en secondes.
+
+    Utilise $median (MongoDB >= 7.0) ; avec exact=True, la médiane est prise dans la
+    liste triée des retards, pour les serveurs plus anciens.
+    """
+    match = _match(since, "scheduled_time")
+    match["status"] = PostStatus.PUBLISHED.value
+    match["published_at"] = {"$ne": None}
+    pipeline: List[Dict[str, Any]] = [
+        {"$match": match},
+        {"$project": {
+            "platform": 1,
+            "lateness": {"$divide": [{"$subtract": ["$published_at", "$scheduled_time"]}, 1000]},
+        }},
+    ]
+    if not exact:
+        return pipeline + [{"$group": {
+            "_id": "$platform",
+            "count": {"$sum": 1},
+            "median_seconds": {"$median": {"input": "$lateness", "method": "approximate"}},
+        }}]
+    return pipeline + [
+        {"$sort": {"lateness": 1}},
+        {"$group": {"_id": "$platform", "values": {"$push": "$lateness"}}},
+        {"$project": {
+            "count": {"$size": "$values"},
+            "median_seconds": {"$arrayElemAt": [
+                "$values", {"$floor": {"$divide": [{"$size": "$values"}, 2]}}
+            ]},
+        }},
+    ]
@@ -0,0 +1,43 @@
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from .ttl_cache import TTLCache
+
+
+class TokenCache(TTLCache):
+    """Cache LRU borné des tokens déchiffrés, par id de compte social.
+
+    Uniquement en mémoire (jamais persisté). Une entrée expire après `ttl` secondes,
+    ou plus tôt si le token lui-même expire (expires_at).
+    """
+
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[float] = None):
+        super().__init__(
+            max_size or int(os.getenv("TOKEN_CACHE_SIZE", "1024")),
+            ttl if ttl is not None else float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+        )
+        self.generation = 0  # incrémenté à chaque invalidation
+
+    def get(self, account_id: str) -> Optional[Dict[str, Any]]:
+        tokens = super().get(account_id)
+        return dict(tokens) if tokens is not None else None
+
+    def put(self, account_id: str, tokens: Dict[str, Any], generation: Optional[int] = None):
+        """Ignoré si une invalidation a eu lieu depuis `generation` (lecture devenue périmée)."""
+        if generation is not None and generation != self.generation:
+            return
+        lifetime = None
+        expires_at = tokens.get("expires_at")
+        if expires_at is not None:
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            lifetime = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        self.set(account_id, dict(tokens), lifetime)
+
+    def invalidate(self, account_id: Optional[str] = None):
+        self.generation += 1
+        if account_id is None:
+            self.clear()
+        else:
+            self.pop(account_id)
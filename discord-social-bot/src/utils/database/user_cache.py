@@ -0,0 +1,31 @@
+import os
+from typing import Optional
+
+from .model import User
+from .ttl_cache import TTLCache
+
+
+class UserCache(TTLCache):
+    """Cache LRU borné des utilisateurs, par discord_id.
+
+    Une entrée expire après `ttl` secondes (rôle modifié depuis un autre process).
+    """
+
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[float] = None):
+        super().__init__(
+            max_size or int(os.getenv("USER_CACHE_SIZE", "10000")),
+            ttl if ttl is not None else float(os.getenv("USER_CACHE_TTL_SECONDS", "600"))
+        )
+
+    def get(self, discord_id: str) -> Optional[User]:
+        user = super().get(discord_id)
+        return user.model_copy() if user is not None else None
+
+    def put(self, user: User):
+        self.set(user.discord_id, user.model_copy())
+
+    def invalidate(self, discord_id: Optional[str] = None):
+        if discord_id is None:
+            self.clear()
+        else:
+            self.pop(discord_id)
@@ -3,7 +3,7 @@ import os
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from utils.database.mongodb_handler import db_handler
-from cryptography.fernet import Fernet
+from utils.database.model import PlatformType
 
 load_dotenv()
 
@@ -12,10 +12,6 @@ FACEBOOK_APP_ID = os.getenv("FACEBOOK_APP_ID")
 FACEBOOK_APP_SECRET = os.getenv("FACEBOOK_APP_SECRET")
 REDIRECT_URI = os.getenv("INSTAGRAM_REDIRECT_URI")
 
-# Clé d’encryption locale
-ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY", Fernet.generate_key().decode())
-fernet = Fernet(ENCRYPTION_KEY.encode() if isinstance(ENCRYPTION_KEY, str) else ENCRYPTION_KEY)
-
 class InstagramOAuthHandler:
     def __init__(self):
         pass
@@ -94,18 +90,13 @@ class InstagramOAuthHandler:
                     print("[ERROR] No Instagram Business Account found.")
                     return None
 
-            # --- Étape 5 : stocker en DB (encrypté) ---
-            encrypted_token = fernet.encrypt(access_token.encode()).decode()
-
-            await db_handler.db.social_accounts.update_one(
-                {"platform": "INSTAGRAM", "discord_user_id": discord_user_id},
-                {"$set": {
-                    "account_id": ig_user_id,
-                    "access_token": encrypted_token,
-                    "token_expiry": expires_at,
-                    "is_active": True
-                }},
-                upsert=True
+            # --- Étape 5 : stocker en DB (chiffré par le handler, caches invalidés) ---
+            await db_handler.connect_social_account(
+                PlatformType.INSTAGRAM,
+                account_id=ig_user_id,
+                account_name=f"Instagram {ig_user_id}",
+                access_token=access_token,
+                expires_at=expires_at
             )
 
             print(f"[SUCCESS] Instagram connected for {discord_user_id}")
@@ -116,18 +107,18 @@ class InstagramOAuthHandler:
         """
         Vérifie si le token est encore valide, sinon le refresh automatiquement.
         """
-        account = await db_handler.db.social_accounts.find_one({"account_id": ig_user_id, "platform": "INSTAGRAM"})
+        account = await db_handler.find_social_account(PlatformType.INSTAGRAM, ig_user_id)
         if not account:
             print("[ERROR] No Instagram account found in DB.")
             return None
 
-        encrypted_token = account.get("access_token")
-        if not encrypted_token:
+        tokens = await db_handler.get_tokens(str(account.id))
+        if not tokens or not tokens.get("access_token"):
             print("[ERROR] No token found in DB.")
             return None
 
-        access_token = fernet.decrypt(encrypted_token.encode()).decode()
-        expires_at = account.get("token_expiry")
+        access_token = tokens["access_token"]
+        expires_at = tokens.get("expires_at")
 
         if expires_at and datetime.utcnow() < expires_at:
             # Token encore valide
@@ -147,16 +138,10 @@ class InstagramOAuthHandler:
                     return None
 
             new_token = refresh_data["access_token"]
-            new_expiry = datetime.utcnow() + timedelta(days=60)
-            encrypted_new_token = fernet.encrypt(new_token.encode()).decode()
-
-            await db_handler.db.social_accounts.update_one(
-                {"account_id": ig_user_id},
-                {"$set": {
-                    "access_token": encrypted_new_token,
-                    "token_expiry": new_expiry
-                }}
-            )
+            new_expiry = datetime.utcnow() + timedelta(seconds=refresh_data.get("expires_in", 5184000))
+
+            # via le handler : le token en cache et le registre des comptes sont invalidés
+            await db_handler.update_tokens(str(account.id), new_token, expires_at=new_expiry)
 
             print(f"[REFRESH] Token refreshed for {ig_user_id}")
             return new_token
@@ -0,0 +1,40 @@
+"""Benchmark de l'hydratation : modèles pydantic validés vs ModelView (avec et sans projection).
+
+    python tests/bench_hydration.py --docs 100000
+
+Le chronométrage dépend de la machine : il reste hors de la suite pytest.
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from utils.database.model import ModelView, ScheduledPost
+from test_hydration import make_doc
+
+
+def bench_hydration(n: int = 100_000):
+    docs = [make_doc(i) for i in range(n)]
+    projected = [{"_id": d["_id"], "content": d["content"], "status": d["status"]} for d in docs]
+    results = {}
+    for label, build, source in (
+        ("validated", lambda d: ScheduledPost(**d), docs),
+        ("view", lambda d: ModelView(ScheduledPost, d), docs),
+        ("view+projection", lambda d: ModelView(ScheduledPost, d), projected),
+    ):
+        start = time.perf_counter()
+        items = [build(d) for d in source]
+        for item in items:
+            item.content, item.status
+        results[label] = time.perf_counter() - start
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=100_000)
+    args = parser.parse_args()
+    results = bench_hydration(args.docs)
+    for label, seconds in results.items():
+        print(f"{label}: {seconds:.3f}s")
+    print(f"view / validated: {results['view'] / results['validated']:.2f}")
@@ -0,0 +1,111 @@
+"""Benchmark du scheduler sur le backend en mémoire (aucun mongod nécessaire).
+
+    python tests/bench_scheduler.py --posts 100000 --accounts 500 --publish-latency 0.001
+
+Mesure l'insertion des posts programmés, puis le débit et la latence de
+publication (réclamation par lots, pool de workers, écriture des statuts).
+Les appels aux plateformes sont remplacés par une attente de --publish-latency
+secondes ; la sortie console du scheduler est coupée pendant la mesure.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+from datetime import datetime, timedelta, UTC
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ["MONGODB_BACKEND"] = "memory"
+os.environ.setdefault("LOG_ROLLUP_INTERVAL_SECONDS", "0")
+if not os.getenv("ENCRYPTION_KEY"):
+    from cryptography.fernet import Fernet
+    os.environ["ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+# le scheduler importe via "utils." (comme les cogs) : on partage le même handler
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from utils.database.mongodb_handler import db_handler
+from utils.database.model import PlatformType, PostStatus, ScheduledPost
+from services.schedular_service import SchedulerService
+
+
+PLATFORMS = [PlatformType.FACEBOOK, PlatformType.INSTAGRAM, PlatformType.LINKEDIN, PlatformType.TIKTOK]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+async def create_posts(n_posts: int, n_accounts: int):
+    accounts = [
+        await db_handler.add_social_account(
+            platform=PLATFORMS[i % len(PLATFORMS)],
+            account_name=f"bench {i}",
+            access_token=f"token_{i}",
+            account_id=f"bench_{i}"
+        )
+        for i in range(n_accounts)
+    ]
+    due = datetime.now(UTC) - timedelta(seconds=1)
+    start = time.perf_counter()
+    for i in range(n_posts):
+        account = i % n_accounts
+        await db_handler.create_scheduled_post(ScheduledPost(
+            social_account_id=accounts[account],
+            requested_by_discord_id="bench",
+            platform=PLATFORMS[account % len(PLATFORMS)],
+            content=f"bench post {i}",
+            scheduled_time=due
+        ))
+    return time.perf_counter() - start
+
+
+async def run(n_posts: int, n_accounts: int, publish_latency: float):
+    await db_handler.connect()
+    insert_seconds = await create_posts(n_posts, n_accounts)
+    print(f"insert: {n_posts} posts in {insert_seconds:.2f}s ({n_posts / insert_seconds:,.0f} posts/s)")
+
+    service = SchedulerService()
+    service._db_handler = db_handler
+    published_at = []
+    started = time.perf_counter()
+
+    async def fake_publish(post):
+        await asyncio.sleep(publish_latency)
+        published_at.append(time.perf_counter() - started)
+        return f"bench_{post.id}"
+
+    for platform in ("linkedin", "tiktok", "facebook", "instagram"):
+        setattr(service, f"_publish_to_{platform}", fake_publish)
+
+    service.publish_pool.start()
+    service.is_running = True  # les places libérées relancent la réclamation (_on_pool_slot_free)
+    with contextlib.redirect_stdout(io.StringIO()):
+        await service.process_pending_posts()
+        claimed_seconds = time.perf_counter() - started
+        # la réclamation suit la capacité du pool : on attend que le backlog soit épuisé
+        while True:
+            await service.publish_pool.join()
+            if service._claim_task and not service._claim_task.done():
+                await service._claim_task
+            elif not service._claim_backlog:
+                break
+        await db_handler.result_sink.flush()
+    total_seconds = time.perf_counter() - started
+    service.publish_pool.stop()
+
+    published = await db_handler.db.scheduled_posts.count_documents({"status": PostStatus.PUBLISHED.value})
+    print(f"first claim: {claimed_seconds:.2f}s, publish: {published}/{n_posts} in {total_seconds:.2f}s "
+          f"({published / total_seconds:,.0f} posts/s)")
+    print(f"time to publish: p50 {percentile(published_at, 0.5):.2f}s, "
+          f"p99 {percentile(published_at, 0.99):.2f}s, max {max(published_at, default=0):.2f}s")
+    await db_handler.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--accounts", type=int, default=500)
+    parser.add_argument("--publish-latency", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.posts, args.accounts, args.publish_latency))
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+from cryptography.fernet import Fernet
+
+# une seule racine d'import, celle du bot (src/) : les services importent `utils...`,
+# passer aussi par `src.utils...` chargerait une seconde copie de chaque module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+# clé de test, avant le premier import d'utils.database.encryption
+os.environ.setdefault("ENCRYPTION_KEY", Fernet.generate_key().decode())
+
+from utils.database.memory_backend import MemoryClient
+from utils.database.mongodb_handler import MongoDBHandler
+
+
+@pytest.fixture
+def handler() -> MongoDBHandler:
+    """Handler sur une base en mémoire vide, sans connect() (ni disjoncteur ni tâches de fond)."""
+    handler = MongoDBHandler()
+    handler.db = MemoryClient()["test"]
+    return handler
+
+
+@pytest.fixture
+def memory_backend(monkeypatch):
+    """connect() ouvre le backend mémoire, sans les tâches de rollup et d'archivage."""
+    monkeypatch.setenv("MONGODB_BACKEND", "memory")
+    monkeypatch.setenv("LOG_ROLLUP_INTERVAL_SECONDS", "0")
+    monkeypatch.setenv("PUBLISHED_ARCHIVE_INTERVAL_SECONDS", "0")
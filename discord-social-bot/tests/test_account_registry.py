@@ -0,0 +1,109 @@
+import asyncio
+from utils.database.account_registry import AccountRegistry
+from utils.database.model import PlatformType
+
+
+def count_loads(handler) -> list:
+    """Registre avec expiration ; renvoie la liste des requêtes de chargement sur social_accounts."""
+    handler.account_registry = AccountRegistry(ttl=60)
+    collection = handler.db.social_accounts
+    loads = []
+    find = collection.find
+
+    def counted(query=None, projection=None):
+        loads.append(query)
+        return find(query, projection)
+
+    collection.find = counted
+    return loads
+
+
+def test_registry_hits_and_misses(handler):
+    async def scenario():
+        loads = count_loads(handler)
+        fb = await handler.add_social_account(PlatformType.FACEBOOK, "page", "t1", account_id="fb_1")
+        ig = await handler.add_social_account(PlatformType.INSTAGRAM, "insta", "t2", account_id="ig_1")
+        await handler.deactivate_social_account(ig)
+
+        first = await handler.get_social_account(fb)
+        by_ref = await handler.find_social_account(PlatformType.FACEBOOK, "fb_1")
+        by_platform = await handler.get_social_accounts_by_platform(PlatformType.FACEBOOK)
+        # compte inactif : absent du registre, lu directement en DB
+        inactive = await handler.get_social_account(ig)
+        wrong_platform = await handler.find_social_account(PlatformType.INSTAGRAM, "fb_1")
+        return fb, first, by_ref, by_platform, inactive, wrong_platform, len(loads)
+
+    fb, first, by_ref, by_platform, inactive, wrong_platform, loads = asyncio.run(scenario())
+    assert str(first.id) == str(by_ref.id) == fb
+    assert [str(a.id) for a in by_platform] == [fb]
+    assert inactive is not None and not inactive.is_active
+    assert wrong_platform is None
+    assert loads == 1  # un seul chargement pour toutes les lectures
+
+
+def test_registry_is_invalidated_by_writes(handler):
+    async def scenario():
+        loads = count_loads(handler)
+        first = await handler.connect_social_account(PlatformType.INSTAGRAM, "ig_1", "insta", "t1")
+        assert len(await handler.get_social_accounts_by_platform(PlatformType.INSTAGRAM)) == 1
+
+        # reconnexion du même compte : mise à jour, pas de doublon
+        again = await handler.connect_social_account(PlatformType.INSTAGRAM, "ig_1", "insta", "t2")
+        accounts = await handler.get_social_accounts_by_platform(PlatformType.INSTAGRAM)
+
+        # écriture directe (script d'initialisation, serveur OAuth) puis hook d'invalidation
+        await handler.db.social_accounts.update_one({"account_id": "ig_1"}, {"$set": {"account_name": "renamed"}})
+        stale = (await handler.find_social_account(PlatformType.INSTAGRAM, "ig_1")).account_name
+        handler.invalidate_account_caches()
+        fresh = (await handler.find_social_account(PlatformType.INSTAGRAM, "ig_1")).account_name
+        return first, again, len(accounts), stale, fresh, len(loads)
+
+    first, again, count, stale, fresh, loads = asyncio.run(scenario())
+    assert first == again and count == 1
+    assert (stale, fresh) == ("insta", "renamed")
+    assert loads == 3
+
+
+def test_load_started_before_invalidation_is_discarded():
+    registry = AccountRegistry(ttl=60)
+    generation = registry.generation
+    registry.invalidate()  # écriture pendant la lecture en DB
+    registry.load([], generation)
+    assert not registry.loaded
+
+
+def test_lost_resume_token_resyncs_account_caches(handler):
+    from pymongo.errors import OperationFailure
+
+    async def scenario():
+        count_loads(handler)
+        handler.watch_retry_seconds = 0
+        handler._resume_tokens["social_accounts"] = {"_data": "expired"}
+        account_id = await handler.add_social_account(PlatformType.FACEBOOK, "page", "t1", account_id="fb_1")
+        opened = []
+        reopened = asyncio.Event()
+
+        def watch(pipeline, **options):
+            opened.append(options.get("resume_after"))
+            if "resume_after" in options:
+                raise OperationFailure("resume point no longer in the oplog", code=286)
+            # resynchronisation faite avant de rouvrir le stream
+            opened.append(len(handler.token_cache))
+            reopened.set()
+            raise asyncio.CancelledError()
+
+        handler.db.social_accounts.watch = watch
+        await handler.get_tokens(account_id)
+        cached = len(handler.token_cache)
+        task = asyncio.create_task(handler._watch_social_accounts())
+        await asyncio.wait_for(reopened.wait(), 5)
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return cached, opened, handler._resume_tokens
+
+    cached, opened, tokens = asyncio.run(scenario())
+    assert cached == 1
+    assert opened == [{"_data": "expired"}, None, 0]
+    assert tokens == {}
@@ -0,0 +1,34 @@
+import asyncio
+from datetime import datetime, timedelta
+from utils.database.archive import ARCHIVE_COLLECTION, archive_published_posts, compact_post, expand_post
+from utils.database.model import PlatformType, PublishedPost
+
+
+def test_compact_round_trip_drops_nonessential_fields():
+    doc = {"_id": 1, "content": "hello " * 50, "platform": "facebook", "error_message": None, "media_urls": []}
+    compact = compact_post(doc)
+
+    assert "content" not in compact and "error_message" not in compact
+    assert expand_post(compact)["content"] == doc["content"]
+
+
+def test_archived_posts_are_found_through_fallthrough_lookups(handler):
+    async def scenario():
+        old, recent = [
+            await handler.create_published_post(PublishedPost(
+                social_account_id="acc", requested_by_discord_id="1", platform=PlatformType.FACEBOOK,
+                content=f"post {age}", platform_post_id=f"fb_{age}",
+                published_at=datetime.utcnow() - timedelta(days=age)
+            ))
+            for age in (200, 1)
+        ]
+        moved = await archive_published_posts(handler.db, timedelta(days=90))
+        hot = [p.content for p in await handler.get_published_posts()]
+        by_id = await handler.get_published_post(old)
+        by_ref = await handler.find_post("fb_200")
+        return moved, hot, by_id, by_ref, await handler.db[ARCHIVE_COLLECTION].count_documents({})
+
+    moved, hot, by_id, by_ref, archived = asyncio.run(scenario())
+    assert (moved, archived) == (1, 1)
+    assert hot == ["post 1"]
+    assert by_id.content == "post 200" and by_ref.id == by_id.id
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from pymongo.errors import AutoReconnect, DuplicateKeyError
+from utils.database.connection import CircuitBreaker, ConnectionManager
+from utils.database.memory_backend import MemoryClient
+from utils.database.mongodb_handler import MongoDBHandler
+from services.schedular_service import SchedulerService
+
+
+def test_breaker_opens_after_threshold_with_exponential_backoff():
+    breaker = CircuitBreaker(threshold=2, base_delay=1, max_delay=4)
+    breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert not breaker.allow()
+    assert breaker.next_delay() == 1
+
+    breaker.failures = 5
+    assert breaker.next_delay() == 4  # plafonné à max_delay
+
+
+def test_half_open_probe_closes_breaker():
+    breaker = CircuitBreaker(threshold=1, base_delay=1, max_delay=1)
+    breaker.record_failure()
+    breaker.retry_at = time.monotonic() - 1
+
+    # lire la disponibilité ne change pas l'état
+    assert breaker.available and breaker.available
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # une seule sonde à la fois
+    assert not breaker.allow() and not breaker.available
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker(threshold=1, base_delay=1, max_delay=4)
+    breaker.record_failure()
+    breaker.retry_at = time.monotonic() - 1
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.available and breaker.seconds_until_retry() > 0
+
+
+def test_only_connection_errors_trip_the_breaker():
+    manager = ConnectionManager(MemoryClient)
+    manager.create_client()
+
+    assert not manager.record_error(DuplicateKeyError("dup"))
+    assert manager.record_error(AutoReconnect("down"))
+    assert asyncio.run(manager.ping())
+    assert manager.stats()["consecutive_failures"] == 0
+
+
+def test_real_operations_report_to_the_breaker(monkeypatch, memory_backend):
+    monkeypatch.setenv("MONGODB_HEALTH_INTERVAL_SECONDS", "0")  # pas de sonde ping : seules les opérations comptent
+
+    async def scenario():
+        handler = MongoDBHandler()
+        await handler.connect()
+        breaker = handler.connection.breaker
+        scheduler = SchedulerService()
+        scheduler._db_handler = handler
+        try:
+            breaker.threshold = 1
+            handler.record_error(AutoReconnect("down"))
+            breaker.retry_at = time.monotonic() - 1
+
+            # la réclamation des posts sert de sonde et referme le circuit
+            await scheduler.process_pending_posts()
+            closed = breaker.state
+
+            # une erreur serveur (clé dupliquée) libère aussi la sonde : le serveur a répondu
+            handler.record_error(AutoReconnect("down"))
+            breaker.retry_at = time.monotonic() - 1
+            assert handler.allow_request() and not handler.allow_request()
+            handler.record_error(DuplicateKeyError("dup"))
+            return closed, breaker.state
+        finally:
+            await handler.close()
+
+    assert asyncio.run(scenario()) == (CircuitBreaker.CLOSED, CircuitBreaker.CLOSED)
@@ -0,0 +1,46 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from services.due_queue import DueQueue
+
+
+def test_pop_due_returns_posts_in_time_order():
+    now = datetime.now(timezone.utc)
+    queue = DueQueue()
+    queue.push("b", now - timedelta(seconds=1))
+    queue.push("a", now - timedelta(seconds=5))
+    queue.push("c", now + timedelta(minutes=1))
+
+    assert queue.pop_due(now) == ["a", "b"]
+    assert queue.next_due() == now + timedelta(minutes=1)
+    assert len(queue) == 1
+
+
+def test_reschedule_and_discard_skip_stale_entries():
+    now = datetime.now(timezone.utc)
+    queue = DueQueue()
+    queue.push("a", now - timedelta(seconds=1))
+    queue.push("a", now + timedelta(minutes=5))
+    queue.push("b", now - timedelta(seconds=1))
+    queue.discard("b")
+
+    assert queue.pop_due(now) == []
+    assert queue.next_due() == now + timedelta(minutes=5)
+
+
+def test_naive_datetimes_are_treated_as_utc():
+    queue = DueQueue()
+    naive = datetime.utcnow() - timedelta(seconds=1)
+    queue.push("a", naive)
+
+    assert queue.pop_due(datetime.now(timezone.utc)) == ["a"]
+
+
+def test_push_wakes_up_waiter():
+    async def scenario():
+        queue = DueQueue()
+        waiter = asyncio.create_task(queue.wait_for_change(5))
+        await asyncio.sleep(0)
+        queue.push("a", datetime.now(timezone.utc))
+        return await waiter
+
+    assert asyncio.run(scenario()) is True
@@ -0,0 +1,29 @@
+import asyncio
+from cryptography.fernet import Fernet
+from utils.database.encryption import EncryptionHandler, map_in_pool
+from utils.database.model import PlatformType
+
+
+def test_batches_keep_order_and_fallbacks():
+    old = EncryptionHandler("fernet", key=Fernet.generate_key().decode())
+    handler = EncryptionHandler("aes-gcm", key="secret", salt="salt", fallbacks=[old])
+    values = [f"token{i}" for i in range(600)]
+    encrypted = handler.encrypt_many(values)
+    encrypted[5] = old.encrypt("legacy")
+
+    assert handler.decrypt_many(encrypted[:5]) == values[:5]
+    decrypted = asyncio.run(handler.decrypt_many_async(encrypted + [None]))
+    assert decrypted[5] == "legacy" and decrypted[599] == "token599" and decrypted[-1] is None
+    assert map_in_pool(len, values, chunk_size=7) == [len(v) for v in values]
+
+
+def test_get_tokens_many_decrypts_missing_accounts_in_one_batch(handler):
+    async def scenario():
+        ids = [await handler.add_social_account(PlatformType.FACEBOOK, f"page{i}", f"access{i}") for i in range(3)]
+        await handler.get_tokens(ids[0])
+        return ids, await handler.get_tokens_many(ids + ["000000000000000000000000"]), handler.token_cache.hits
+
+    ids, tokens, hits = asyncio.run(scenario())
+    assert [tokens[i]["access_token"] for i in ids] == ["access0", "access1", "access2"]
+    assert tokens["000000000000000000000000"] is None
+    assert hits == 1
@@ -0,0 +1,29 @@
+from utils.database.encryption import EncryptionHandler
+
+
+def test_aes_gcm_key_is_derived_on_first_use():
+    handler = EncryptionHandler("aes-gcm", key="secret", salt="salt")
+    assert handler.diagnostics()["derive_ms"] is None
+
+    token = handler.encrypt("hello")
+    assert handler.key_source == "pbkdf2" and handler.derive_ms is not None
+    assert handler.decrypt(token) == "hello"
+
+
+def test_derived_key_cache_file(tmp_path, monkeypatch):
+    cache_file = tmp_path / "keys.json"
+    monkeypatch.setenv("ENCRYPTION_KEY_CACHE_FILE", str(cache_file))
+    token = EncryptionHandler("aes-gcm", key="secret", salt="salt").encrypt("hello")
+    assert oct(cache_file.stat().st_mode & 0o777) == "0o600"
+
+    cached = EncryptionHandler("aes-gcm", key="secret", salt="salt")
+    assert cached.decrypt(token) == "hello" and cached.key_source == "cache-file"
+
+    other_salt = EncryptionHandler("aes-gcm", key="secret", salt="other")
+    other_salt.key
+    assert other_salt.key_source == "pbkdf2"
+
+    cache_file.chmod(0o644)  # lisible par d'autres : ignoré
+    loose = EncryptionHandler("aes-gcm", key="secret", salt="salt")
+    loose.key
+    assert loose.key_source == "pbkdf2"
@@ -0,0 +1,47 @@
+import asyncio
+from cryptography.fernet import Fernet
+from bson import ObjectId
+from utils.database.encryption import EncryptionHandler, encryption_handler
+from utils.database.envelope import DataKeyCache, EnvelopeEncryption, is_envelope
+from utils.database.model import PlatformType
+
+
+def test_data_key_cipher_is_cached():
+    envelope = EnvelopeEncryption(EncryptionHandler("fernet", key=Fernet.generate_key().decode()))
+    data_key = envelope.new_data_key()
+    values = [envelope.encrypt(f"token{i}", data_key) for i in range(3)]
+
+    assert all(is_envelope(v) for v in values)
+    assert [envelope.decrypt(v, data_key) for v in values] == ["token0", "token1", "token2"]
+    assert (envelope.cache.misses, envelope.cache.hits) == (1, 5)
+
+
+def test_data_key_cache_can_be_disabled():
+    envelope = EnvelopeEncryption(
+        EncryptionHandler("fernet", key=Fernet.generate_key().decode()), DataKeyCache(ttl=0)
+    )
+    data_key = envelope.new_data_key()
+    value = envelope.encrypt("token", data_key)
+
+    assert envelope.decrypt(value, data_key) == "token"
+    assert len(envelope.cache) == 0 and envelope.cache.hits == 0
+
+
+def test_master_rotation_only_rewraps_data_keys(handler):
+    async def scenario():
+        handler.envelope_writes = True
+        account_id = await handler.add_social_account(PlatformType.FACEBOOK, "page", "access", "refresh")
+        await handler.update_tokens(account_id, "access2")
+        before = await handler.db.social_accounts.find_one({"_id": ObjectId(account_id)})
+
+        new = EncryptionHandler("aes-gcm", key="next-master", salt="salt")
+        result = await handler.rotate_encryption_key(encryption_handler, new)
+        after = await handler.db.social_accounts.find_one({"_id": ObjectId(account_id)})
+        handler.envelope = EnvelopeEncryption(new)  # bot redémarré avec la nouvelle clé maître
+        return before, after, result, await handler.get_tokens(account_id)
+
+    before, after, result, tokens = asyncio.run(scenario())
+    assert after["tokens"]["access_token"] == before["tokens"]["access_token"]
+    assert after["tokens"]["data_key"] != before["tokens"]["data_key"]
+    assert result["rotated"] == 1
+    assert (tokens["access_token"], tokens["refresh_token"]) == ("access2", "refresh")
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from aiohttp import web
+from services.facebook_async import AsyncFacebookAPI, FacebookAPIError, close_session, get_session
+from services.retry_policy import ErrorClass, classify_error
+from services.schedular_service import SchedulerService
+from utils.database.model import PlatformType, ScheduledPost
+
+
+async def graph_server():
+    calls = {"flaky": 0, "bad": 0}
+
+    async def slow(request):
+        await asyncio.sleep(0.5)
+        return web.json_response({"id": "slow"})
+
+    async def fast(request):
+        return web.json_response({"id": request.query["access_token"]})
+
+    async def flaky(request):
+        calls["flaky"] += 1
+        if calls["flaky"] == 1:
+            return web.Response(status=503)
+        return web.json_response({"id": "ok"})
+
+    async def bad(request):
+        calls["bad"] += 1
+        return web.json_response({"error": {"message": "Application request limit reached", "code": 4}}, status=400)
+
+    async def batch(request):
+        calls["batch"] = calls.get("batch", 0) + 1
+        items = json.loads((await request.post())["batch"])
+        responses = []
+        for item in items:
+            target = item["relative_url"].split("?")[0]
+            if target == "missing":
+                responses.append({"code": 400, "body": json.dumps({"error": {"message": "Unsupported get request", "code": 100}})})
+            elif target == "slowpost":
+                responses.append(None)
+            else:
+                responses.append({"code": 200, "body": json.dumps({"id": target, "likes": {"summary": {"total_count": 2}}})})
+        return web.json_response(responses)
+
+    async def photos(request):
+        form = await request.post()
+        calls.setdefault("photos", []).append(dict(form))
+        return web.json_response({"id": f"photo{len(calls['photos'])}", "post_id": "page_single"})
+
+    async def feed(request):
+        calls["feed"] = dict(await request.post())
+        return web.json_response({"id": "page_multi"})
+
+    app = web.Application()
+    app.router.add_post("/", batch)
+    app.router.add_post("/page/photos", photos)
+    app.router.add_post("/page/feed", feed)
+    app.router.add_get("/slow", slow)
+    app.router.add_get("/fast", fast)
+    app.router.add_get("/flaky", flaky)
+    app.router.add_get("/bad", bad)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/", calls
+
+
+def api(token: str, base_url: str) -> AsyncFacebookAPI:
+    fb_api = AsyncFacebookAPI(token)
+    fb_api.BASE_URL = base_url
+    return fb_api
+
+
+def test_slow_call_does_not_block_others_and_session_is_shared():
+    async def scenario():
+        runner, base_url, _ = await graph_server()
+        try:
+            slow = asyncio.create_task(api("a", base_url)._make_request("GET", "slow"))
+            await asyncio.sleep(0.05)
+            started = time.perf_counter()
+            fast = await api("b", base_url)._make_request("GET", "fast")
+            fast_seconds = time.perf_counter() - started
+            session = get_session()
+            await slow
+            return fast, fast_seconds, session is get_session()
+        finally:
+            await close_session()
+            await runner.cleanup()
+
+    fast, fast_seconds, shared = asyncio.run(scenario())
+    assert fast == {"success": True, "data": {"id": "b"}}
+    assert fast_seconds < 0.3
+    assert shared
+
+
+def test_retries_5xx_but_not_graph_errors():
+    async def scenario():
+        runner, base_url, calls = await graph_server()
+        try:
+            flaky = await api("t", base_url)._make_request("GET", "flaky")
+            bad = await api("t", base_url)._make_request("GET", "bad")
+            return flaky, bad, calls
+        finally:
+            await close_session()
+            await runner.cleanup()
+
+    flaky, bad, calls = asyncio.run(scenario())
+    assert flaky["success"] and calls["flaky"] == 2
+    assert (bad["success"], bad["status"], bad["code"], calls["bad"]) == (False, 400, 4, 1)
+    assert classify_error(FacebookAPIError.from_result(bad)) == ErrorClass.RATE_LIMIT
+
+
+def test_batch_splits_results_and_isolates_failures():
+    async def scenario():
+        runner, base_url, calls = await graph_server()
+        try:
+            fb_api = api("t", base_url)
+            post_ids = [f"post{i}" for i in range(120)] + ["missing", "slowpost"]
+            stats = await fb_api.get_post_stats_many(post_ids)
+            async with fb_api.batch() as batch:
+                hidden = batch.hide_comment("c1")
+            return stats, hidden.result(), calls["batch"]
+        finally:
+            await close_session()
+            await runner.cleanup()
+
+    stats, hidden, requests = asyncio.run(scenario())
+    assert requests == 3 + 1  # 122 appels en 3 batchs, puis le hide_comment
+    assert stats["post7"] == {"success": True, "data": {"id": "post7", "likes": {"summary": {"total_count": 2}}}}
+    assert (stats["missing"]["success"], stats["missing"]["code"], stats["missing"]["status"]) == (False, 100, 400)
+    assert not stats["slowpost"]["success"]
+    assert hidden["success"]
+
+
+def test_live_publish_keeps_caption_and_attaches_every_image(monkeypatch):
+    class Accounts:
+        async def get_tokens(self, account_id):
+            return {"access_token": "t"}
+
+        async def get_social_account(self, account_id):
+            return type("Account", (), {"account_id": "page"})()
+
+    def post(*urls):
+        return ScheduledPost(
+            platform=PlatformType.FACEBOOK, social_account_id="acc", content="Hello",
+            media_urls=list(urls), scheduled_time=datetime.now(timezone.utc), requested_by_discord_id="u",
+        )
+
+    async def scenario():
+        runner, base_url, calls = await graph_server()
+        service = SchedulerService()
+        service._db_handler = Accounts()
+        monkeypatch.setattr(AsyncFacebookAPI, "BASE_URL", base_url)
+        try:
+            single = await service._publish_to_facebook_live(post("https://img/1.jpg"))
+            single_upload = calls.pop("photos")[0]
+            multi = await service._publish_to_facebook_live(post("https://img/1.jpg", "https://img/2.jpg"))
+            return single, single_upload, multi, calls
+        finally:
+            await close_session()
+            await runner.cleanup()
+
+    single, single_upload, multi, calls = asyncio.run(scenario())
+    assert single == "page_single"
+    assert (single_upload["caption"], single_upload["published"]) == ("Hello", "true")
+    assert multi == "page_multi"
+    assert {upload["published"] for upload in calls["photos"]} == {"false"}
+    feed = calls["feed"]
+    assert feed["message"] == "Hello"
+    attached = sorted(json.loads(feed[f"attached_media[{i}]"])["media_fbid"] for i in range(2))
+    assert attached == ["photo1", "photo2"]
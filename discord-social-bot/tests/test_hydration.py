@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from bson import ObjectId
+from utils.database.model import ModelView, ScheduledPost, PlatformType, PostStatus
+
+
+def make_doc(i: int = 0):
+    now = datetime.now(timezone.utc)
+    return {
+        "_id": ObjectId(),
+        "social_account_id": "acc",
+        "requested_by_discord_id": "123",
+        "platform": "facebook",
+        "content": f"post {i}",
+        "media_urls": ["https://example.com/a.jpg"],
+        "scheduled_time": now,
+        "status": "scheduled",
+        "attempts": 0,
+        "next_attempt_at": now,
+    }
+
+
+def test_view_matches_validated_model():
+    doc = make_doc()
+    model = ScheduledPost(**doc)
+    view = ModelView(ScheduledPost, doc)
+
+    for name in ScheduledPost.model_fields:
+        assert getattr(view, name) == getattr(model, name)
+    assert view.platform is PlatformType.FACEBOOK
+    assert view.status is PostStatus.SCHEDULED
+    assert view.to_model() == model
+
+
+def test_projected_view_defaults_and_missing_fields():
+    view = ModelView(ScheduledPost, {"_id": ObjectId(), "content": "hello"})
+
+    assert view.content == "hello"
+    assert view.attempts == 0
+    with pytest.raises(AttributeError):
+        view.scheduled_time  # obligatoire mais exclu par la projection
+    with pytest.raises(AttributeError):
+        view.content = "changed"
+
+
+def test_list_reads_validate_unless_projected(handler):
+    async def scenario():
+        await handler.db.scheduled_posts.insert_one(make_doc())
+        before = datetime.now(timezone.utc)
+        full = await handler.get_pending_posts(before)
+        projected = await handler.get_pending_posts(before, fields=("content",))
+        handler.fast_reads = True
+        fast = await handler.get_pending_posts(before)
+        return full, projected, fast
+
+    full, projected, fast = asyncio.run(scenario())
+    assert type(full[0]) is ScheduledPost
+    assert isinstance(projected[0], ModelView) and projected[0].content == "post 0"
+    assert isinstance(fast[0], ModelView)
+
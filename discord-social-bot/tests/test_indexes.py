@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from utils.database.indexes import INDEX_PLAN, IndexPlanError, ensure_indexes, hot_queries, verify_query_plans
+from utils.database.memory_backend import MemoryClient
+
+
+def test_every_hot_query_is_served_by_an_index():
+    async def scenario():
+        db = MemoryClient()["test"]
+        await ensure_indexes(db)
+        return await verify_query_plans(db)
+
+    plans = asyncio.run(scenario())
+    names = [query["name"] for query in hot_queries()]
+    assert sorted(plans) == sorted(names)
+    for name, stages in plans.items():
+        assert "IXSCAN" in stages, name
+        assert "COLLSCAN" not in stages and "SORT" not in stages, name
+    assert all(query["collection"] in INDEX_PLAN for query in hot_queries())
+
+
+def test_missing_index_is_reported():
+    async def scenario():
+        db = MemoryClient()["test"]
+        # plan sans l'index partiel des posts dus
+        plan = {name: models for name, models in INDEX_PLAN.items()}
+        plan["scheduled_posts"] = [m for m in INDEX_PLAN["scheduled_posts"] if m.document["name"] != "due_posts"]
+        await ensure_indexes(db, plan)
+        await verify_query_plans(db)
+
+    with pytest.raises(IndexPlanError, match="due_posts"):
+        asyncio.run(scenario())
+
+
+def test_in_memory_sort_in_a_server_plan_is_reported():
+    """Plan au format d'un vrai serveur : le SORT est imbriqué sous d'autres étapes."""
+    class Cursor:
+        def sort(self, *args):
+            return self
+
+        async def explain(self):
+            return {"queryPlanner": {"winningPlan": {
+                "stage": "PROJECTION_SIMPLE",
+                "inputStage": {"stage": "SORT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}},
+            }}}
+
+    class Collection:
+        def find(self, query):
+            return Cursor()
+
+    class Database:
+        def __getitem__(self, name):
+            return Collection()
+
+    query = {"name": "published_all", "collection": "published_posts", "filter": {}, "sort": [("published_at", -1)]}
+    with pytest.raises(IndexPlanError, match="published_all .*SORT"):
+        asyncio.run(verify_query_plans(Database(), [query]))
@@ -0,0 +1,46 @@
+import asyncio
+from cryptography.fernet import Fernet
+from utils.database.encryption import EncryptionHandler
+from utils.database.key_rotation import STATE_COLLECTION, rotate_account_tokens
+from utils.database.memory_backend import MemoryClient
+
+
+OLD_KEY = Fernet.generate_key().decode()
+OLD = EncryptionHandler("fernet", key=OLD_KEY)
+NEW = EncryptionHandler("aes-gcm", key="new-secret", salt="new-salt")
+
+
+def test_dual_key_reads_during_rotation():
+    reader = EncryptionHandler("aes-gcm", key="new-secret", salt="new-salt", fallbacks=[OLD])
+
+    assert reader.decrypt(OLD.encrypt("old")) == "old"
+    assert reader.decrypt(NEW.encrypt("new")) == "new"
+    assert NEW.decrypt_raw(NEW.rotate_key(OLD_KEY, None, OLD.encrypt("one"))) == "one"
+
+
+def test_rotation_resumes_from_checkpoint_and_is_idempotent():
+    async def scenario():
+        db = MemoryClient()["test"]
+        await db.social_accounts.insert_many([
+            {"_id": i, "tokens": {"access_token": OLD.encrypt(f"a{i}"), "refresh_token": OLD.encrypt(f"r{i}") if i % 2 else None}}
+            for i in range(10)
+        ])
+        # arrêt simulé après les 4 premiers comptes (déjà rechiffrés)
+        for i in range(4):
+            doc = await db.social_accounts.find_one({"_id": i})
+            update = {"tokens.access_token": NEW.encrypt(OLD.decrypt(doc["tokens"]["access_token"]))}
+            if doc["tokens"]["refresh_token"]:
+                update["tokens.refresh_token"] = NEW.encrypt(OLD.decrypt(doc["tokens"]["refresh_token"]))
+            await db.social_accounts.update_one({"_id": i}, {"$set": update})
+        await db[STATE_COLLECTION].insert_one({"_id": "social_accounts", "last_id": 2, "accounts": 3, "rotated": 4, "already": 0, "failed": 0})
+
+        result = await rotate_account_tokens(db, OLD, NEW, batch_size=3)
+        docs = await db.social_accounts.find({}).sort("_id", 1).to_list(None)
+        again = await rotate_account_tokens(db, OLD, NEW, batch_size=3)
+        return result, docs, again
+
+    result, docs, again = asyncio.run(scenario())
+    assert (result["accounts"], result["rotated"], result["already"], result["failed"]) == (10, 4 + 9, 2, 0)
+    assert [NEW.decrypt_raw(d["tokens"]["access_token"]) for d in docs] == [f"a{i}" for i in range(10)]
+    assert NEW.decrypt_raw(docs[3]["tokens"]["refresh_token"]) == "r3"
+    assert (again["accounts"], again["rotated"], again["already"]) == (10, 0, 15)
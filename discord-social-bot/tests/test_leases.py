@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime, timedelta, UTC
+from services.publish_pool import PublishWorkerPool
+from services.schedular_service import SchedulerService
+from utils.database.model import PlatformType, PostStatus, ScheduledPost
+from utils.database.mongodb_handler import MongoDBHandler
+
+
+async def add_due_posts(handler: MongoDBHandler, n_posts: int):
+    due = datetime.now(UTC) - timedelta(minutes=1)
+    for i in range(n_posts):
+        await handler.create_scheduled_post(ScheduledPost(
+            social_account_id=f"acc{i}", requested_by_discord_id="1",
+            platform=PlatformType.FACEBOOK, content="x", scheduled_time=due
+        ))
+
+
+def test_batched_claim_is_disjoint_and_limited(handler):
+    async def scenario():
+        await add_due_posts(handler, 5)
+        now = datetime.now(UTC)
+        first = await handler.claim_pending_posts(now, "a", limit=3)
+        second = await handler.claim_pending_posts(now, "b", limit=3)
+        third = await handler.claim_pending_posts(now, "c", limit=3)
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert (len(first), len(second), third) == (3, 2, [])
+    assert not {p.id for p in first} & {p.id for p in second}
+    assert all(p.claimed_by == "a" and p.status == PostStatus.PROCESSING for p in first)
+
+
+def test_expired_lease_is_reaped_and_reclaimed(handler):
+    async def scenario():
+        await add_due_posts(handler, 1)
+        [post] = await handler.claim_pending_posts(datetime.now(UTC), "a", lease_seconds=60)
+        post_id = str(post.id)
+        assert await handler.confirm_lease(post_id, "a", lease_seconds=60)
+
+        # "a" est bloqué : le bail expire, le reaper remet le post en file
+        released = await handler.release_expired_leases(datetime.now(UTC) + timedelta(minutes=2))
+        after_reap = await handler.db.scheduled_posts.find_one({"_id": post.id})
+        [reclaimed] = await handler.claim_pending_posts(datetime.now(UTC), "b", lease_seconds=60)
+
+        lost = await handler.renew_leases([post_id], "a", lease_seconds=60)
+        still_owned = await handler.renew_leases([post_id], "b", lease_seconds=60)
+        return released, after_reap, reclaimed, lost, still_owned, await handler.confirm_lease(post_id, "a")
+
+    released, after_reap, reclaimed, lost, still_owned, a_confirms = asyncio.run(scenario())
+    assert released == 1
+    assert after_reap["status"] == PostStatus.SCHEDULED and "claimed_by" not in after_reap
+    assert reclaimed.claimed_by == "b"
+    assert lost == {str(reclaimed.id)} and still_owned == set()
+    assert not a_confirms  # "a" ne doit plus publier ce post
+
+
+def test_scheduler_claims_only_free_pool_capacity(handler):
+    async def scenario():
+        await add_due_posts(handler, 20)
+        scheduler = SchedulerService()
+        # 1 worker par plateforme, 1 post d'avance par worker
+        workers = len(PlatformType)
+        scheduler.publish_pool = PublishWorkerPool(
+            lambda post: asyncio.Event().wait(), platform_limits={}, default_limit=1, prefetch=workers
+        )
+        scheduler.publish_pool.start()
+        queued = await scheduler._claim_into_pool(handler)
+        scheduler.publish_pool.stop()
+        processing = await handler.db.scheduled_posts.count_documents({"status": PostStatus.PROCESSING})
+        return queued, processing, scheduler._claim_backlog, 2 * workers
+
+    queued, processing, backlog, capacity = asyncio.run(scenario())
+    assert queued == processing == capacity
+    assert backlog  # les autres restent SCHEDULED, réclamés quand un worker se libère
@@ -0,0 +1,64 @@
+import asyncio
+from types import SimpleNamespace
+from utils.database.log_writer import LogWriter
+from utils.database.memory_backend import MemoryClient
+
+
+def make_writer(**options):
+    handler = SimpleNamespace(db=MemoryClient()["test"])
+    calls = []
+    for name in ("command_logs", "activity_logs"):
+        collection = handler.db[name]
+        insert_many = collection.insert_many
+
+        async def recorded(docs, ordered=True, _insert=insert_many, _name=name):
+            calls.append((_name, len(docs), ordered))
+            return await _insert(docs, ordered=ordered)
+
+        collection.insert_many = recorded
+    return LogWriter(handler, **options), handler, calls
+
+
+def test_logs_are_batched_per_collection():
+    async def scenario():
+        writer, handler, calls = make_writer(batch_size=50, flush_interval=0.01)
+        for i in range(120):
+            await writer.write("command_logs", {"i": i})
+        await writer.write("activity_logs", {"i": 0})
+        await asyncio.sleep(0.1)
+        stored = await handler.db.command_logs.count_documents({})
+        await writer.close()
+        return calls, stored, writer.stats()
+
+    calls, stored, stats = asyncio.run(scenario())
+    assert stored == 120
+    assert all(size <= 50 and not ordered for _, size, ordered in calls)
+    assert len(calls) <= 4  # 121 logs en lots de 50, pas un insert par log
+    assert stats == {"buffered": 0, "written": 121, "dropped": 0}
+
+
+def test_full_buffer_drops_logs():
+    async def scenario():
+        writer, handler, _ = make_writer(max_buffer=10, batch_size=100, flush_interval=0.05)
+        # la tâche de fond ne tourne pas pendant ces écritures : le tampon déborde
+        for i in range(25):
+            await writer.write("command_logs", {"i": i})
+        await writer.close()
+        return writer.stats(), await handler.db.command_logs.count_documents({})
+
+    stats, stored = asyncio.run(scenario())
+    assert stats["dropped"] == 15
+    assert stored == stats["written"] == 10
+
+
+def test_close_flushes_pending_logs():
+    async def scenario():
+        writer, handler, _ = make_writer(batch_size=500, flush_interval=60)
+        for i in range(30):
+            await writer.write("activity_logs", {"i": i})
+        await writer.close()
+        return await handler.db.activity_logs.count_documents({}), writer.stats()
+
+    stored, stats = asyncio.run(scenario())
+    assert stored == 30
+    assert stats["buffered"] == 0
@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from utils.database.memory_backend import MemoryClient
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_find_filters_sorts_and_projects():
+    async def scenario():
+        posts = MemoryClient()["test"].posts
+        now = datetime.now(timezone.utc)
+        await posts.insert_many([
+            {"n": i, "status": "scheduled" if i % 2 else "failed", "due": now + timedelta(minutes=i)}
+            for i in range(6)
+        ])
+        cursor = posts.find({"status": "scheduled", "due": {"$lte": now + timedelta(minutes=4)}}, {"n": 1})
+        docs = await cursor.sort("due", -1).to_list(None)
+        return docs
+
+    docs = run(scenario())
+    assert [d["n"] for d in docs] == [3, 1]
+    assert set(docs[0]) == {"_id", "n"}
+
+
+def test_claims_follow_partial_index_order():
+    async def scenario():
+        posts = MemoryClient()["test"].posts
+        await posts.create_indexes([IndexModel(
+            [("status", ASCENDING), ("due", ASCENDING)], name="due",
+            partialFilterExpression={"status": "scheduled"}
+        )])
+        await posts.insert_many([{"n": i, "status": "scheduled", "due": 10 - i} for i in range(5)])
+        query = {"status": "scheduled", "due": {"$lte": 8}}
+        claimed = []
+        while True:
+            doc = await posts.find_one_and_update(
+                query, {"$set": {"status": "processing"}, "$inc": {"attempts": 1}},
+                sort=[("due", 1)], return_document=ReturnDocument.AFTER
+            )
+            if not doc:
+                break
+            claimed.append((doc["n"], doc["status"], doc["attempts"]))
+        plan = await posts.find(query).sort("due", 1).explain()
+        return claimed, plan
+
+    claimed, plan = run(scenario())
+    assert claimed == [(4, "processing", 1), (3, "processing", 1), (2, "processing", 1)]
+    assert plan["queryPlanner"]["winningPlan"]["inputStage"]["indexName"] == "due"
+
+
+def test_unique_index_and_bulk_upserts():
+    async def scenario():
+        refs = MemoryClient()["test"].refs
+        await refs.create_indexes([IndexModel([("ref", ASCENDING), ("platform", DESCENDING)], unique=True)])
+        result = await refs.bulk_write([
+            UpdateOne({"ref": "a", "platform": "fb"}, {"$set": {"n": 1}, "$setOnInsert": {"created": True}}, upsert=True),
+            UpdateOne({"ref": "a", "platform": "fb"}, {"$set": {"n": 2}, "$setOnInsert": {"created": False}}, upsert=True),
+        ], ordered=False)
+        doc = await refs.find_one({"ref": "a"})
+        with pytest.raises(DuplicateKeyError):
+            await refs.insert_one({"ref": "a", "platform": "fb"})
+        return result, doc
+
+    result, doc = run(scenario())
+    assert (result.upserted_count, result.modified_count) == (1, 1)
+    assert (doc["n"], doc["created"]) == (2, True)
@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime, timedelta
+from aiohttp import web
+from utils import oauth
+from utils.database.model import PlatformType
+
+
+async def graph_server():
+    async def refresh(request):
+        assert request.query["grant_type"] == "ig_refresh_token"
+        return web.json_response({"access_token": f"refreshed-{request.query['access_token']}", "expires_in": 3600})
+
+    app = web.Application()
+    app.router.add_get("/oauth/access_token", refresh)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+
+def test_refreshed_token_replaces_cached_one(handler, monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(oauth, "db_handler", handler)
+        runner, base_url = await graph_server()
+        monkeypatch.setattr(oauth, "GRAPH_BASE", base_url)
+        try:
+            account_id = await handler.connect_social_account(
+                PlatformType.INSTAGRAM, "ig_1", "insta", "old",
+                expires_at=datetime.utcnow() - timedelta(minutes=1)
+            )
+            cached = await handler.get_tokens(account_id)
+            # l'ancien token est encore en cache (lu par une autre tâche avant son expiration)
+            handler.token_cache.put(account_id, {**cached, "expires_at": None})
+
+            token = await oauth.instagram_oauth_handler.get_valid_token("ig_1")
+            after = await handler.get_tokens(account_id)
+            valid = await oauth.instagram_oauth_handler.get_valid_token("ig_1")
+            return cached["access_token"], token, after, valid
+        finally:
+            await runner.cleanup()
+
+    cached, token, after, valid = asyncio.run(scenario())
+    assert cached == "old"
+    assert token == after["access_token"] == "refreshed-old"
+    assert after["expires_at"] > datetime.utcnow()
+    assert valid == "refreshed-old"  # encore valide : pas de second refresh
@@ -0,0 +1,33 @@
+import asyncio
+from datetime import datetime, timedelta
+from bson import ObjectId
+from utils.database.mongodb_handler import MongoDBHandler
+from utils.database.model import ModelView, PublishedPost
+
+
+def test_cursor_round_trip():
+    published_at = datetime(2025, 1, 2, 3, 4, 5, 678000)
+    doc_id = ObjectId()
+    cursor = MongoDBHandler.encode_cursor(published_at, doc_id)
+
+    assert MongoDBHandler.decode_cursor(cursor) == (published_at, doc_id)
+
+
+def test_page_returns_next_cursor_only_when_more_items():
+    start = datetime(2025, 1, 1)
+    posts = [
+        ModelView(PublishedPost, {"_id": ObjectId(), "published_at": start - timedelta(minutes=i)})
+        for i in range(3)
+    ]
+
+    async def items(n):
+        for post in posts[:n]:
+            yield post
+
+    handler = MongoDBHandler()
+    page, cursor = asyncio.run(handler._page(items(3), 2, "published_at"))
+    assert page == posts[:2]
+    assert cursor == MongoDBHandler.encode_cursor(posts[1].published_at, posts[1].id)
+
+    page, cursor = asyncio.run(handler._page(items(2), 2, "published_at"))
+    assert cursor is None
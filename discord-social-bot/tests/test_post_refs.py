@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime, timedelta, UTC
+from utils.database.archive import ARCHIVE_COLLECTION, archive_published_posts
+from utils.database.model import PlatformType, PublishedPost, ScheduledPost
+
+
+async def publish(handler, platform_post_id: str, age_days: int = 1) -> str:
+    return await handler.create_published_post(PublishedPost(
+        social_account_id="acc", requested_by_discord_id="1", platform=PlatformType.FACEBOOK,
+        content="hello", platform_post_id=platform_post_id,
+        published_at=datetime.now(UTC) - timedelta(days=age_days)
+    ))
+
+
+def test_resolve_by_discord_or_platform_id(handler):
+    async def scenario():
+        post_id = await publish(handler, "fb_1")
+        return (
+            post_id,
+            await handler.resolve_post_ref(post_id),
+            await handler.resolve_post_ref("fb_1", PlatformType.FACEBOOK),
+            await handler.resolve_post_ref("fb_1", PlatformType.INSTAGRAM),
+            await handler.resolve_post_ref("unknown"),
+        )
+
+    post_id, by_id, by_platform_id, wrong_platform, unknown = asyncio.run(scenario())
+    assert by_id.collection == by_platform_id.collection == "published_posts"
+    assert str(by_id.target_id) == str(by_platform_id.target_id) == post_id
+    assert wrong_platform is None and unknown is None
+
+
+def test_delete_removes_post_and_all_its_refs(handler):
+    async def scenario():
+        removed = []
+        handler.add_schedule_listener(lambda post_id, when: when is None and removed.append(post_id))
+        published = await publish(handler, "fb_1")
+        scheduled = await handler.create_scheduled_post(ScheduledPost(
+            social_account_id="acc", requested_by_discord_id="1", platform=PlatformType.FACEBOOK,
+            content="later", scheduled_time=datetime.now(UTC) + timedelta(hours=1)
+        ))
+
+        by_platform_id = await handler.delete_post("fb_1", "1")
+        by_id = await handler.delete_post(scheduled, "1")
+        again = await handler.delete_post("fb_1", "1")
+        refs = await handler.db.post_refs.count_documents({})
+        posts = await handler.db.published_posts.count_documents({}) + await handler.db.scheduled_posts.count_documents({})
+        return published, scheduled, by_platform_id, by_id, again, refs, posts, removed, await handler.resolve_post_ref(published)
+
+    published, scheduled, by_platform_id, by_id, again, refs, posts, removed, ref = asyncio.run(scenario())
+    assert by_platform_id == {"deleted": True, "location": "published", "error": None}
+    assert by_id == {"deleted": True, "location": "scheduled", "error": None}
+    assert not again["deleted"] and again["error"]
+    assert refs == posts == 0 and ref is None
+    assert removed == [scheduled]  # le scheduler retire le post programmé de sa file
+
+
+def test_refs_follow_archived_posts(handler):
+    async def scenario():
+        old = await publish(handler, "fb_old", age_days=200)
+        await archive_published_posts(handler.db, timedelta(days=90))
+        ref = await handler.resolve_post_ref("fb_old", PlatformType.FACEBOOK)
+        post = await handler.find_post(old)
+        deleted = await handler.delete_post("fb_old", "1")
+        return old, ref, post, deleted, await handler.db.post_refs.count_documents({})
+
+    old, ref, post, deleted, refs = asyncio.run(scenario())
+    assert ref.collection == ARCHIVE_COLLECTION and str(ref.target_id) == old
+    assert post.content == "hello" and post.platform_post_id == "fb_old"
+    assert deleted == {"deleted": True, "location": "archived", "error": None}
+    assert refs == 0
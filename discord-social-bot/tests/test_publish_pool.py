@@ -0,0 +1,67 @@
+import asyncio
+from datetime import datetime, UTC
+from bson import ObjectId
+from services.publish_pool import PublishWorkerPool
+from utils.database.model import PlatformType, ScheduledPost
+
+
+def make_post(account: str, platform: PlatformType = PlatformType.FACEBOOK) -> ScheduledPost:
+    return ScheduledPost(
+        _id=ObjectId(), social_account_id=account, requested_by_discord_id="1",
+        platform=platform, content="x", scheduled_time=datetime.now(UTC)
+    )
+
+
+async def run_pool(posts, **limits):
+    running = {}
+    peak = {}
+    order = []
+
+    async def publish(post):
+        for key in (post.platform.value, post.social_account_id):
+            running[key] = running.get(key, 0) + 1
+            peak[key] = max(peak.get(key, 0), running[key])
+        order.append(post.social_account_id)
+        await asyncio.sleep(0.01)
+        for key in (post.platform.value, post.social_account_id):
+            running[key] -= 1
+
+    pool = PublishWorkerPool(publish, **limits)
+    pool.start()
+    for post in posts:
+        await pool.submit(post)
+    await pool.join()
+    pool.stop()
+    return peak, order
+
+
+def test_platform_and_account_limits():
+    posts = [make_post(f"acc{i % 4}") for i in range(16)] + [make_post("li", PlatformType.LINKEDIN) for _ in range(3)]
+    peak, _ = asyncio.run(run_pool(posts, platform_limits={"facebook": 3}, default_limit=2, account_limit=1))
+
+    assert peak["facebook"] == 3
+    assert peak["linkedin"] == 1  # un seul compte LinkedIn, limité à 1
+    assert all(peak[f"acc{i}"] == 1 for i in range(4))
+
+
+def test_busy_account_does_not_stall_other_accounts():
+    # 10 posts du même compte en tête de file, puis 3 autres comptes
+    posts = [make_post("busy") for _ in range(10)] + [make_post(f"other{i}") for i in range(3)]
+    peak, order = asyncio.run(run_pool(posts, platform_limits={"facebook": 4}, account_limit=1))
+
+    assert peak["busy"] == 1
+    # les autres comptes passent pendant le premier post de "busy", pas après les 10
+    assert set(order[:4]) == {"busy", "other0", "other1", "other2"}
+
+
+def test_duplicate_submit_is_ignored():
+    async def scenario():
+        pool = PublishWorkerPool(lambda post: asyncio.sleep(0), default_limit=1)
+        pool.start()
+        post = make_post("acc")
+        first, second = await pool.submit(post), await pool.submit(post)
+        await pool.join()
+        pool.stop()
+        return first, second
+
+    assert asyncio.run(scenario()) == (True, False)
@@ -0,0 +1,114 @@
+import asyncio
+from datetime import datetime, UTC
+from pymongo.errors import AutoReconnect
+from utils.database.model import PlatformType, PostStatus, ScheduledPost
+from utils.database.mongodb_handler import MongoDBHandler
+from utils.database.result_sink import ResultSink
+from services.schedular_service import SchedulerService
+
+
+async def add_posts(handler: MongoDBHandler, n_posts: int) -> list:
+    return [
+        await handler.create_scheduled_post(ScheduledPost(
+            social_account_id="acc", requested_by_discord_id="1",
+            platform=PlatformType.FACEBOOK, content="x", scheduled_time=datetime.now(UTC)
+        ))
+        for _ in range(n_posts)
+    ]
+
+
+async def published(handler) -> int:
+    return await handler.db.scheduled_posts.count_documents({"status": PostStatus.PUBLISHED.value})
+
+
+def test_flush_when_batch_is_full(handler):
+    async def scenario():
+        ids = await add_posts(handler, 3)
+        handler.result_sink = ResultSink(handler, batch_size=3, flush_interval=60)
+        for post_id in ids[:2]:
+            handler.record_post_status(post_id, PostStatus.PUBLISHED)
+        await asyncio.sleep(0.01)
+        before = await published(handler)
+        handler.record_post_status(ids[2], PostStatus.PUBLISHED)
+        await asyncio.sleep(0.01)
+        after = await published(handler)
+        await handler.result_sink.close()
+        return before, after, handler.result_sink.flushes
+
+    assert asyncio.run(scenario()) == (0, 3, 1)
+
+
+def test_flush_after_interval(handler):
+    async def scenario():
+        ids = await add_posts(handler, 1)
+        handler.result_sink = ResultSink(handler, batch_size=100, flush_interval=0.05)
+        handler.record_post_status(ids[0], PostStatus.PUBLISHED)
+        before = await published(handler)
+        await asyncio.sleep(0.15)
+        after = await published(handler)
+        await handler.result_sink.close()
+        return before, after
+
+    assert asyncio.run(scenario()) == (0, 1)
+
+
+def test_close_flushes_and_releases_everything_even_if_flush_fails(monkeypatch, memory_backend):
+    async def connected():
+        handler = MongoDBHandler()
+        await handler.connect()
+        closed = []
+        monkeypatch.setattr(handler.client, "close", lambda: closed.append(True))
+        return handler, closed
+
+    async def scenario():
+        # flush à la fermeture
+        handler, closed = await connected()
+        [post_id] = await add_posts(handler, 1)
+        handler.record_post_status(post_id, PostStatus.PUBLISHED)
+        await handler.close()
+        flushed = await published(handler)
+
+        # flush en échec : le LogWriter est tout de même vidé et le client fermé
+        handler, failing_closed = await connected()
+        [post_id] = await add_posts(handler, 1)
+        handler.record_post_status(post_id, PostStatus.PUBLISHED)
+        await handler.log_writer.write("command_logs", {"command_name": "ping"})
+
+        async def fail(*args, **kwargs):
+            raise AutoReconnect("connection lost")
+
+        monkeypatch.setattr(handler.db.scheduled_posts, "bulk_write", fail)
+        await handler.close()
+        logs = await handler.db.command_logs.count_documents({})
+        return flushed, closed, failing_closed, logs, len(handler.result_sink)
+
+    flushed, closed, failing_closed, logs, unwritten = asyncio.run(scenario())
+    assert flushed == 1 and closed == [True]
+    assert failing_closed == [True] and logs == 1
+    assert unwritten == 1  # le statut reste en tampon, le reaper reprendra le post
+
+
+def test_scheduler_stop_waits_for_publishes_then_flushes_statuses(monkeypatch, memory_backend):
+    async def scenario():
+        handler = MongoDBHandler()
+        await handler.connect()
+        handler.result_sink = ResultSink(handler, batch_size=100, flush_interval=60)
+        await add_posts(handler, 2)
+        scheduler = SchedulerService()
+        started = asyncio.Event()
+
+        async def slow_publish(post):
+            started.set()
+            await asyncio.sleep(0.2)
+            return "fb_id"
+
+        monkeypatch.setattr(scheduler, "_publish_to_facebook", slow_publish)
+        scheduler.start(handler)
+        await asyncio.wait_for(started.wait(), 5)
+        await scheduler.stop()
+        # pas de flush périodique (60 s) : seul stop() a pu écrire les statuts
+        written = await published(handler), len(handler.result_sink)
+        await handler.close()
+        return written
+
+    assert asyncio.run(scenario()) == (2, 0)
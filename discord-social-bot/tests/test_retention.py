@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from pymongo.errors import OperationFailure
+from utils.database.memory_backend import MemoryClient
+from utils.database.retention import provision_log_collection, retention_seconds, rollup_logs
+
+
+class RetentionDB:
+    """Base simulée : enregistre les créations de collections, d'index et les collMod."""
+
+    def __init__(self, kinds=None, timeseries=True, timestamp_index=None):
+        self.kinds = dict(kinds or {})
+        self.timeseries = timeseries
+        # options de l'index timestamp existant ({} : sans TTL, None : pas d'index)
+        self.timestamp_index = timestamp_index
+        self.calls = []
+
+    async def list_collections(self, filter):
+        infos = [{"name": name, "type": kind} for name, kind in self.kinds.items() if name == filter["name"]]
+
+        async def cursor():
+            for info in infos:
+                yield info
+        return cursor()
+
+    async def create_collection(self, name, **options):
+        self.calls.append(("create_collection", name, options.get("expireAfterSeconds")))
+        if options.get("timeseries") and not self.timeseries:
+            raise OperationFailure("time-series collections require MongoDB 5.0")
+        self.kinds[name] = "timeseries" if options.get("timeseries") else "collection"
+
+    async def command(self, name, collection, **options):
+        self.calls.append((name, collection, options))
+
+    def __getitem__(self, name):
+        db = self
+
+        class Collection:
+            async def create_index(self, keys, expireAfterSeconds=None):
+                db.calls.append(("create_index", name, expireAfterSeconds))
+                existing = db.timestamp_index
+                if existing is not None and existing.get("expireAfterSeconds") != expireAfterSeconds:
+                    raise OperationFailure("An equivalent index already exists with different options", 85)
+                db.timestamp_index = {"expireAfterSeconds": expireAfterSeconds}
+        return Collection()
+
+
+def test_timeseries_when_supported_otherwise_ttl_index():
+    expire = retention_seconds("command_logs")
+    modern = RetentionDB()
+    legacy = RetentionDB(timeseries=False)
+
+    assert asyncio.run(provision_log_collection(modern, "command_logs")) == "timeseries"
+    assert modern.calls == [("create_collection", "command_logs", expire)]
+
+    assert asyncio.run(provision_log_collection(legacy, "command_logs")) == "ttl"
+    assert legacy.calls[-1] == ("create_index", "command_logs", expire)
+    assert legacy.timestamp_index == {"expireAfterSeconds": expire}
+
+
+def test_existing_collections_get_retention_through_collmod(monkeypatch):
+    monkeypatch.setenv("COMMAND_LOG_RETENTION_DAYS", "7")
+    expire = 7 * 86400
+
+    # time-series existante : la rétention passe par collMod, jamais de recréation
+    timeseries = RetentionDB(kinds={"command_logs": "timeseries"})
+    assert asyncio.run(provision_log_collection(timeseries, "command_logs")) == "timeseries"
+    assert timeseries.calls == [("collMod", "command_logs", {"expireAfterSeconds": expire})]
+
+    # collection classique avec un index timestamp sans TTL, ou avec l'ancienne durée : collMod de l'index
+    coll_mod = ("collMod", "command_logs", {"index": {"keyPattern": {"timestamp": 1}, "expireAfterSeconds": expire}})
+    for existing in ({}, {"expireAfterSeconds": 30 * 86400}):
+        classic = RetentionDB(kinds={"command_logs": "collection"}, timestamp_index=existing)
+        assert asyncio.run(provision_log_collection(classic, "command_logs")) == "ttl"
+        assert classic.calls[-1] == coll_mod
+
+
+def test_rollup_resumes_from_checkpoint():
+    db = MemoryClient()["test"]
+    pipelines = []
+
+    def aggregate(pipeline):
+        pipelines.append(pipeline)
+
+        async def results():
+            return
+            yield
+        return results()
+
+    db.activity_logs.aggregate = aggregate
+    day1 = datetime(2026, 3, 2, 8, 30, tzinfo=timezone.utc)
+    day3 = day1 + timedelta(days=2)
+
+    first = asyncio.run(rollup_logs(db, "activity_logs", day1))
+    second = asyncio.run(rollup_logs(db, "activity_logs", day3))
+    state = asyncio.run(db.log_rollup_state.find_one({"_id": "activity_logs"}))
+
+    midnight1 = day1.replace(hour=0, minute=0)
+    assert first == midnight1
+    assert pipelines[0][0] == {"$match": {"timestamp": {"$lt": midnight1}}}
+    # seuls les jours complets depuis le dernier point de reprise sont agrégés
+    assert pipelines[1][0] == {"$match": {"timestamp": {"$lt": second, "$gte": midnight1.replace(tzinfo=None)}}}
+    assert pipelines[1][-1]["$merge"]["into"] == "activity_stats_daily"
+    assert state["rolled_up_to"] == second.replace(tzinfo=None)
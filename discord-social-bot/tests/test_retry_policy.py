@@ -0,0 +1,30 @@
+import random
+from services.retry_policy import ErrorClass, RetryPolicy, classify_error
+
+
+class FakeHTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_classify_error():
+    assert classify_error(FakeHTTPError(429)) == ErrorClass.RATE_LIMIT
+    assert classify_error(FakeHTTPError(503)) == ErrorClass.SERVER
+    assert classify_error(FakeHTTPError(401)) == ErrorClass.AUTH
+    assert classify_error("Error validating access token") == ErrorClass.AUTH
+    assert classify_error("Échec de publication") == ErrorClass.UNKNOWN
+
+
+def test_backoff_grows_with_jitter_and_is_capped():
+    policy = RetryPolicy(rng=random.Random(42))
+    delays = [policy.delay(ErrorClass.SERVER, attempts) for attempts in (1, 2, 3, 10)]
+
+    assert 5 <= delays[0] <= 10
+    assert 10 <= delays[1] <= 20
+    assert 20 <= delays[2] <= 40
+    assert 450 <= delays[3] <= 900
+
+
+def test_auth_errors_are_not_retried():
+    assert RetryPolicy().delay(ErrorClass.AUTH, 1) is None
@@ -0,0 +1,150 @@
+import asyncio
+from datetime import datetime, timedelta, UTC
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, OperationFailure
+from services.schedular_service import SchedulerService
+from utils.database.model import PlatformType, PostStatus, ScheduledPost
+from utils.database.mongodb_handler import MongoDBHandler
+
+
+def make_post(scheduled_time: datetime) -> ScheduledPost:
+    return ScheduledPost(
+        social_account_id="acc", requested_by_discord_id="1",
+        platform=PlatformType.FACEBOOK, content="x", scheduled_time=scheduled_time
+    )
+
+
+class FakeChangeStream:
+    """Change stream rejoué à partir d'une liste d'événements (le backend mémoire n'en a pas)."""
+
+    def __init__(self, events, error=None):
+        self.events = events
+        self.error = error
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        for i, event in enumerate(self.events):
+            self.resume_token = {"_data": str(i)}
+            yield event
+        if self.error:
+            raise self.error
+
+
+def test_reaped_posts_are_pushed_back_to_due_queue(handler):
+    async def scenario():
+        scheduler = SchedulerService()
+        handler.add_schedule_listener(scheduler._on_schedule_change)
+        now = datetime.now(UTC)
+        post_id = await handler.create_scheduled_post(make_post(now - timedelta(seconds=1)))
+
+        await handler.claim_pending_posts(now, "crashed", lease_seconds=60)
+        assert scheduler.due_queue.pop_due(now) == [post_id]
+
+        released = await handler.release_expired_leases(now + timedelta(minutes=2))
+        return post_id, released, scheduler.due_queue.pop_due(now)
+
+    post_id, released, due = asyncio.run(scenario())
+    assert released == 1
+    assert due == [post_id]
+
+
+def test_change_stream_updates_due_queue(handler):
+    async def scenario():
+        scheduler = SchedulerService()
+        now = datetime.now(UTC)
+        inserted, claimed, deleted = ObjectId(), ObjectId(), ObjectId()
+        scheduler.due_queue.push(str(claimed), now)
+        scheduler.due_queue.push(str(deleted), now)
+        events = [
+            {"operationType": "insert", "documentKey": {"_id": inserted},
+             "fullDocument": {"status": PostStatus.SCHEDULED.value, "scheduled_time": now,
+                              "next_attempt_at": now - timedelta(seconds=1)}},
+            {"operationType": "update", "documentKey": {"_id": claimed},
+             "fullDocument": {"status": PostStatus.PROCESSING.value, "scheduled_time": now}},
+            {"operationType": "delete", "documentKey": {"_id": deleted}},
+        ]
+        stream = FakeChangeStream(events)
+        handler.db.scheduled_posts.watch = lambda pipeline, **options: stream
+        await handler.watch_scheduled_posts(scheduler._on_schedule_change)
+        return str(inserted), scheduler.due_queue.pop_due(now), handler._resume_tokens["scheduled_posts"]
+
+    inserted, due, resume_token = asyncio.run(scenario())
+    assert due == [inserted]  # le post réclamé et le post supprimé ont quitté la file
+    assert resume_token == {"_data": "2"}
+
+
+def test_polling_fallback_without_change_streams(memory_backend):
+    async def scenario():
+        handler = MongoDBHandler()
+        await handler.connect()
+        try:
+            scheduler = SchedulerService()
+            scheduler._db_handler = handler
+            # standalone : _watch_schedule rend la main, la resynchronisation périodique reste active
+            await scheduler._watch_schedule()
+            # post créé par un autre process : aucun listener local n'a été prévenu
+            now = datetime.now(UTC)
+            doc = make_post(now - timedelta(seconds=1))
+            doc.next_attempt_at = doc.scheduled_time
+            result = await handler.db.scheduled_posts.insert_one(doc.model_dump(by_alias=True, exclude={"id"}))
+            before = scheduler.due_queue.pop_due(now)
+            await scheduler.refresh_schedule()
+            return str(result.inserted_id), before, scheduler.due_queue.pop_due(now)
+        finally:
+            await handler.close()
+
+    post_id, before, after = asyncio.run(scenario())
+    assert before == []
+    assert after == [post_id]
+
+
+def test_lost_resume_token_forces_resync_and_fresh_stream(monkeypatch, memory_backend):
+    monkeypatch.setenv("MONGODB_WATCH_RETRY_SECONDS", "0")
+
+    async def scenario():
+        handler = MongoDBHandler()
+        await handler.connect()
+        scheduler = SchedulerService()
+        scheduler._db_handler = handler
+        scheduler.is_running = True
+        scheduler.scheduler.add_job(scheduler.refresh_schedule, "interval", seconds=300, id="refresh_schedule")
+        scheduler.scheduler.start()
+        calls = []
+
+        async def supports_change_streams():
+            return True
+
+        async def refresh_schedule():
+            calls.append("resync")
+
+        def watch(pipeline, **options):
+            calls.append(options.get("resume_after"))
+            if len(calls) == 1:
+                # coupure réseau : le jeton reste valable
+                event = {"operationType": "delete", "documentKey": {"_id": ObjectId()}}
+                return FakeChangeStream([event], AutoReconnect("connection reset"))
+            if "resume_after" in options:
+                raise OperationFailure("resume point no longer in the oplog", code=286)
+            scheduler.is_running = False
+            return FakeChangeStream([])
+
+        handler.supports_change_streams = supports_change_streams
+        scheduler.refresh_schedule = refresh_schedule
+        handler.db.scheduled_posts.watch = watch
+        try:
+            await asyncio.wait_for(scheduler._watch_schedule(), 5)
+            return calls, handler._resume_tokens
+        finally:
+            scheduler.scheduler.shutdown()
+            await handler.close()
+
+    calls, tokens = asyncio.run(scenario())
+    # reprise sur le jeton, perte du jeton -> resynchronisation puis stream neuf
+    assert calls == [None, "resync", {"_data": "0"}, "resync", None, "resync"]
+    assert tokens == {}
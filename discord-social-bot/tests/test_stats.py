@@ -0,0 +1,188 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from pymongo.errors import OperationFailure
+from cogs import stats_commands
+from cogs.stats_commands import StatsCommands
+from utils.database.model import PlatformType, PublishedPost
+from utils.database.stats import failure_rate_pipeline, publish_lateness_pipeline, status_histogram_pipeline
+
+
+SINCE = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+class AggregateCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def to_list(self, length=None):
+        return self.rows
+
+
+def stub_aggregate(handler, answer):
+    """aggregate() renvoie answer(pipeline) ; les pipelines reçus sont conservés."""
+    pipelines = []
+
+    def aggregate(pipeline):
+        pipelines.append(pipeline)
+        return AggregateCursor(answer(pipeline))
+
+    handler.db.scheduled_posts.aggregate = aggregate
+    return pipelines
+
+
+def test_pipelines_filter_both_collections_on_the_period():
+    histogram = status_histogram_pipeline("facebook", None, SINCE)
+    assert histogram[0] == {"$match": {"scheduled_time": {"$gte": SINCE}, "platform": "facebook"}}
+    union = histogram[2]["$unionWith"]
+    assert union["coll"] == "published_posts"
+    assert union["pipeline"][0] == {"$match": {"published_at": {"$gte": SINCE}, "platform": "facebook"}}
+
+    failures = failure_rate_pipeline(SINCE)
+    assert failures[0]["$match"]["status"] == {"$in": ["published", "failed"]}
+    assert failures[-1]["$project"]["failure_rate"] == {"$divide": ["$failed", "$total"]}
+
+    exact = publish_lateness_pipeline(SINCE, exact=True)
+    assert {"$sort": {"lateness": 1}} in exact
+    assert "$median" not in str(exact)
+
+
+def test_handler_maps_rows_and_falls_back_without_median(handler):
+    async def scenario():
+
+        def answer(pipeline):
+            group = pipeline[-1].get("$group", {})
+            if "median_seconds" in group:
+                raise OperationFailure("Unrecognized accumulator '$median'")
+            if "values" in str(pipeline):
+                return [{"_id": "facebook", "count": 3, "median_seconds": 12.0}]
+            if "failure_rate" in str(pipeline):
+                return [{"_id": "facebook", "total": 4, "failed": 1, "failure_rate": 0.25}]
+            return [{"_id": "published", "count": 3}, {"_id": "failed", "count": 1}]
+
+        pipelines = stub_aggregate(handler, answer)
+        return (
+            await handler.get_status_histogram(PlatformType.FACEBOOK, since=SINCE),
+            await handler.get_failure_rates(SINCE),
+            await handler.get_publish_lateness(SINCE),
+            len(pipelines),
+        )
+
+    histogram, failures, lateness, calls = asyncio.run(scenario())
+    assert histogram == {"published": 3, "failed": 1}
+    assert failures == {"facebook": {"total": 4, "failed": 1, "failure_rate": 0.25}}
+    assert lateness == {"facebook": {"count": 3, "median_seconds": 12.0}}
+    assert calls == 4  # $median refusé, puis la variante exacte
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    def is_done(self):
+        return bool(self.interaction.messages)
+
+    async def send_message(self, message):
+        assert not self.is_done(), "interaction already responded"
+        self.interaction.messages.append(message)
+
+
+class FakeInteraction:
+    def __init__(self):
+        self.messages = []
+        self.response = FakeResponse(self)
+
+    async def edit_original_response(self, content):
+        assert self.messages, "no original response"
+        self.messages[-1] = content
+
+
+class FakeStatsDB:
+    def __init__(self, histogram=None, fail=None):
+        self.histogram = {"published": 2} if histogram is None else histogram
+        self.fail = fail
+
+    async def get_status_histogram(self, platform=None, since=None):
+        if self.fail == "aggregate":
+            raise OperationFailure("$unionWith requires MongoDB 4.4")
+        return self.histogram
+
+    async def get_failure_rates(self, since=None):
+        return {"facebook": {"total": 2, "failed": 0, "failure_rate": 0.0}}
+
+    async def get_publish_lateness(self, since=None):
+        return {"facebook": {"count": 2, "median_seconds": 4.0}}
+
+    async def get_posts_per_day(self, platform=None, since=None):
+        return [{"day": datetime(2026, 3, 2), "social_account_id": "acc", "count": 2}]
+
+
+def run_command(db, engagement_error=False, platform=None, days=7):
+    async def scenario():
+        cog = StatsCommands(bot=None)
+        cog.db = db
+
+        async def engagement(since):
+            if engagement_error:
+                raise RuntimeError("Graph API unreachable")
+            return None
+
+        cog._facebook_engagement = engagement
+        interaction = FakeInteraction()
+        await cog.execute(interaction, platform=platform, days=days)
+        return interaction.messages
+
+    return asyncio.run(scenario())
+
+
+def test_command_defers_then_edits_the_loading_message():
+    [message] = run_command(FakeStatsDB())
+    assert message.startswith("**Stats (all platforms, last 7 days)**")
+    assert "- Facebook: 0.0% failed (0/2), median delay 4s" in message
+    assert "- 2026-03-02 | `acc` | 2" in message
+
+
+def test_command_reports_errors_in_the_loading_message():
+    [failed] = run_command(FakeStatsDB(fail="aggregate"))
+    [empty] = run_command(FakeStatsDB(histogram={}))
+    [partial] = run_command(FakeStatsDB(), engagement_error=True, platform="facebook")
+
+    assert failed.startswith("Error computing statistics")
+    assert empty == "No posts in the last 7 days."
+    # l'échec Graph n'empêche pas d'afficher les statistiques MongoDB
+    assert "Facebook engagement unavailable." in partial and "Posts: published: 2" in partial
+
+
+def test_engagement_only_fetches_posts_of_the_period(handler, monkeypatch):
+    requested = []
+
+    async def stats_many(api, post_ids):
+        requested.extend(post_ids)
+        return {post_id: {"success": True, "data": {"likes": {"summary": {"total_count": 1}}}} for post_id in post_ids}
+
+    monkeypatch.setattr(stats_commands.AsyncFacebookAPI, "get_post_stats_many", stats_many)
+    monkeypatch.setattr(stats_commands, "FACEBOOK_STATS_MAX_POSTS", 3)
+
+    async def scenario():
+        account_id = await handler.add_social_account(PlatformType.FACEBOOK, "page", "access", "refresh")
+        for i, days in enumerate([1, 2, 30, 40, 50]):
+            await handler.create_published_post(PublishedPost(
+                social_account_id=account_id, requested_by_discord_id="u", platform=PlatformType.FACEBOOK,
+                content="x", platform_post_id=f"fb{i}",
+                published_at=datetime.now(timezone.utc) - timedelta(days=days),
+            ))
+        since = datetime.now(timezone.utc) - timedelta(days=7)
+        page, cursor = await handler.get_published_posts_page(PlatformType.FACEBOOK, limit=3, since=since)
+        cog = StatsCommands(bot=None)
+        cog.db = handler
+        return [post.platform_post_id for post in page], cursor, await cog._facebook_engagement(since)
+
+    page, cursor, engagement = asyncio.run(scenario())
+    # les posts hors période sont exclus par la requête, pas après coup
+    assert (page, cursor) == (["fb0", "fb1"], None)
+    assert sorted(requested) == ["fb0", "fb1"]
+    assert (engagement["posts"], engagement["likes"], engagement["unavailable"]) == (2, 2, 0)
+
+
+def test_period_is_clamped_before_computing_since():
+    [message] = run_command(FakeStatsDB(histogram={}), days=10**9)
+    assert message == "No posts in the last 3650 days."
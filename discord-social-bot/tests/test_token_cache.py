@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta, timezone
+from utils.database.token_cache import TokenCache
+
+
+def test_hits_misses_and_lru_bound():
+    cache = TokenCache(max_size=2, ttl=60)
+    cache.put("a", {"access_token": "a"})
+    cache.put("b", {"access_token": "b"})
+    assert cache.get("a") == {"access_token": "a"}
+    cache.put("c", {"access_token": "c"})  # évince "b", le moins récemment utilisé
+
+    assert cache.get("b") is None
+    assert cache.stats() == {"size": 2, "hits": 1, "misses": 1}
+
+
+def test_expired_tokens_are_not_cached():
+    cache = TokenCache(ttl=60)
+    expired = datetime.now(timezone.utc) - timedelta(seconds=1)
+    cache.put("a", {"access_token": "a", "expires_at": expired})
+
+    assert cache.get("a") is None
+
+
+def test_stale_load_is_dropped_after_invalidation():
+    cache = TokenCache(ttl=60)
+    generation = cache.generation
+    cache.invalidate("a")
+    cache.put("a", {"access_token": "old"}, generation)
+
+    assert cache.get("a") is None
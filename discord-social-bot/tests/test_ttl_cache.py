@@ -0,0 +1,20 @@
+from utils.database import ttl_cache
+from utils.database.ttl_cache import TTLCache
+
+
+def test_entries_expire_and_least_recently_used_is_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=10)  # durée propre, plus courte que celle du cache
+    cache.set("never", 3, ttl=0)
+
+    assert cache.get("a") == 1 and cache.get("never") is None
+    now[0] += 30
+    assert cache.get("b") is None  # expirée
+    cache.set("c", 3)
+    cache.set("d", 4)  # évince "a", le moins récemment utilisé
+
+    assert cache.get("a") is None
+    assert cache.stats() == {"size": 2, "hits": 1, "misses": 3}
@@ -0,0 +1,27 @@
+import asyncio
+from utils.database.model import User
+from utils.database.user_cache import UserCache
+
+
+def test_lru_bound():
+    cache = UserCache(max_size=1, ttl=60)
+    cache.put(User(discord_id="1", discord_username="a"))
+    cache.put(User(discord_id="2", discord_username="b"))
+
+    assert cache.get("1") is None
+    assert cache.get("2").discord_username == "b"
+
+
+def test_get_or_create_user_upserts_once_then_hits_cache(handler):
+    async def scenario():
+        await handler.db.users.create_index("discord_id", unique=True)
+        users = await asyncio.gather(*(handler.get_or_create_user("42", "alice") for _ in range(3)))
+        cached = await handler.get_or_create_user("42", "alice")
+        renamed = await handler.get_or_create_user("42", "alice2")
+        return users, cached, renamed, await handler.db.users.count_documents({})
+
+    users, cached, renamed, count = asyncio.run(scenario())
+    assert len({u.id for u in users}) == 1
+    assert cached.id == users[0].id and cached.role == "member"
+    assert renamed.discord_username == "alice2" and renamed.created_at == users[0].created_at
+    assert count == 1
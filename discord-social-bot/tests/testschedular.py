@@ -189,7 +189,7 @@ async def main():
     finally:
         # Arrêter le scheduler
         print("\nArrêt du scheduler...")
-        scheduler_service.stop()
+        await scheduler_service.stop()
         
         # Fermer la connexion MongoDB
         await db_handler.close()